@@ -0,0 +1,254 @@
+# benchmarks/load.py
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from benchmarks.report import finish, latency_summary
+from benchmarks.stub_server import add_arguments, stub_command
+
+
+def read_payloads(path: str) -> List[Dict[str, Any]]:
+    """
+    Summary: Читает тела запросов /process из JSONL.
+
+    Строка — объект запроса ({"question": ..., "index": ..., "main_category": ...})
+    или просто строка-вопрос.
+    Input:
+        path (str): Путь к JSONL.
+    Output:
+        List[Dict[str, Any]]: Тела запросов в порядке файла.
+    """
+    payloads = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            if not isinstance(item, dict) or "question" not in item:
+                raise ValueError(f"{path}:{number}: нет поля question")
+            payloads.append(item)
+    return payloads
+
+
+def faq_payloads(questions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Summary: Запросы по умолчанию: вопросы FAQ и их укороченные варианты.
+
+    Точные вопросы FAQ отвечаются лексическим поиском без эмбеддинга;
+    варианты без последней трети слов проходят весь путь с эмбеддингом.
+    Input:
+        questions (List[str]): Вопросы FAQ.
+    Output:
+        List[Dict[str, Any]]: Тела запросов /process.
+    """
+    payloads = []
+    for question in questions:
+        words = str(question).split()
+        payloads.append({"question": str(question)})
+        payloads.append({"question": " ".join(words[: max(2, len(words) * 2 // 3)])})
+    return payloads
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    """Ждет, пока заглушка начнет отвечать."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Заглушка API завершилась с кодом {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Заглушка API не ответила за {timeout} с")
+
+
+async def run_load(
+    client,
+    payloads: List[Dict[str, Any]],
+    rps: float,
+    total: int,
+    warmup: int = 0,
+) -> Dict[str, Any]:
+    """
+    Summary: Отправляет total запросов /process с постоянной частотой rps.
+
+    Нагрузка открытая: запрос i уходит в момент start + i / rps, даже если
+    предыдущие еще не завершились, а задержка считается от этого момента.
+    Поэтому очередь в перегруженном сервисе попадает в перцентили, а не
+    снижает частоту запросов.
+    Input:
+        client: httpx.AsyncClient для приложения.
+        payloads (List[Dict[str, Any]]): Тела запросов; используются по кругу.
+        rps (float): Целевая частота запросов в секунду.
+        total (int): Число запросов.
+        warmup (int): Запросы перед замером (последовательно, не учитываются).
+    Output:
+        Dict[str, Any]: Задержки успешных запросов, коды ответов и время серии.
+    """
+    for i in range(warmup):
+        await client.post("/process", json=payloads[i % len(payloads)])
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(payload: Dict[str, Any], scheduled: float):
+        try:
+            response = await client.post("/process", json=payload)
+            status = str(response.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        statuses[status] += 1
+        if status == "200":
+            latencies.append(time.perf_counter() - scheduled)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(payloads[i % len(payloads)], scheduled)))
+    await asyncio.gather(*tasks)
+    return {
+        "latencies": latencies,
+        "statuses": dict(statuses),
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+async def _run_against_app(args, payloads: List[Dict[str, Any]], total: int):
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            result = await run_load(client, payloads, args.rps, total, args.warmup)
+            stats = (await client.get("/stats")).json()
+        return result, stats
+
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=args.timeout
+        ) as client:
+            result = await run_load(client, payloads, args.rps, total, args.warmup)
+            stats = (await client.get("/stats")).json()
+    return result, stats
+
+
+def _print_service_stats(stats: Dict[str, Any], stub_counts: Optional[Dict[str, int]]):
+    batcher = stats.get("micro_batcher", {})
+    router = stats.get("llm_router", {})
+    cache = stats.get("answer_cache", {})
+    print(
+        f"📊 Микробатчинг: средний батч {batcher.get('mean_batch_size', 0):.1f}; "
+        f"кэш ответов: попаданий {cache.get('hit_ratio', 0):.0%}; "
+        f"LLM: вызовов {router.get('calls', 0)}, пропущено по бюджету {router.get('skipped_budget', 0)}"
+    )
+    if stub_counts:
+        print(
+            f"📊 Заглушка API: запросов эмбеддингов {stub_counts['embedding_requests']} "
+            f"({stub_counts['embedded_texts']} текстов), запросов к LLM {stub_counts['chat_requests']}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный тест /process: повтор вопросов из JSONL с заданной частотой"
+    )
+    parser.add_argument(
+        "--questions",
+        default=None,
+        help="JSONL с телами запросов; по умолчанию вопросы FAQ и их варианты",
+    )
+    parser.add_argument("--rps", type=float, default=20.0, help="целевая частота запросов")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность, с")
+    parser.add_argument("--requests", type=int, default=None, help="число запросов вместо --duration")
+    parser.add_argument("--warmup", type=int, default=5, help="запросов на прогрев (не учитываются)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="таймаут запроса клиента, с")
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="адрес запущенного сервиса; по умолчанию main:app в этом процессе",
+    )
+    parser.add_argument(
+        "--no-stub",
+        action="store_true",
+        help="не запускать заглушку API (использовать BASE_URL из окружения)",
+    )
+    parser.add_argument("--output", default=None, help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stub, stub_url, stub_counts = None, None, None
+    if not args.no_stub and not args.url:
+        port = _free_port()
+        stub_url = f"http://127.0.0.1:{port}/"
+        # Клиенты API создаются при импорте utils.config, поэтому окружение задается до него
+        os.environ["BASE_URL"] = f"{stub_url}v1"
+        os.environ.setdefault("API_KEY", "stub")
+        # Свежий кэш эмбеддингов: результаты не зависят от прошлых прогонов
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(
+            tempfile.mkdtemp(prefix="bench-"), "embedding_cache.sqlite"
+        )
+        from utils.config import VECTOR_DB_PATH
+
+        # Векторы базы для ее вопросов: запросы, совпадающие с FAQ, находят свою строку
+        args.vector_db = args.vector_db or VECTOR_DB_PATH
+        # Отдельный процесс, чтобы заглушка не делила GIL с замеряемым сервисом
+        stub = subprocess.Popen(stub_command(args, port))
+        _wait_ready(stub_url, stub)
+
+    try:
+        if args.questions:
+            payloads = read_payloads(args.questions)
+        else:
+            from data.faq_store import load_faq
+            from data.knowledge_base import QUESTION_COLUMN
+            from utils.config import FAQ_PATH
+
+            payloads = faq_payloads(load_faq(FAQ_PATH).column(QUESTION_COLUMN))
+        if not payloads:
+            raise ValueError("Нет вопросов для нагрузки")
+        total = args.requests or max(1, int(args.rps * args.duration))
+
+        print(f"🚀 {total} запросов /process с частотой {args.rps:g}/с ({len(payloads)} разных)")
+        result, stats = asyncio.run(_run_against_app(args, payloads, total))
+        if stub is not None:
+            stub_counts = json.loads(urllib.request.urlopen(stub_url, timeout=5).read())
+    finally:
+        if stub is not None:
+            stub.terminate()
+
+    summary = latency_summary(result["latencies"], result["elapsed"])
+    rows = [{"name": "/process", "size": f"{args.rps:g} rps", "unit": "запр", **summary}]
+    print(f"📨 Коды ответов: {result['statuses']}")
+    _print_service_stats(stats, stub_counts)
+    return finish(rows, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    # Нагрузочный тест: python -m benchmarks.load --rps 20 --duration 30
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# benchmarks/micro.py
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Микробенчмарки меряют работу процесса, а не сеть: запросы эмбеддятся локальной
+# моделью (сеть и API — забота benchmarks.load). Окружение задается до импорта
+# utils.config, который читает его и создает клиентов API
+os.environ.setdefault("API_KEY", "stub")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashed")
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.report import finish, latency_summary  # noqa: E402
+from data.faq_store import FaqStore, load_faq  # noqa: E402
+from data.knowledge_base import QUESTION_COLUMN, KnowledgeBase  # noqa: E402
+from utils.config import FAQ_PATH  # noqa: E402
+from vector_db.vector_db import VectorDB  # noqa: E402
+from vectorization.registry import get_embedder  # noqa: E402
+
+
+def _measure(
+    name: str,
+    size: int,
+    operation: Callable[[int], Any],
+    repeats: int,
+    unit: str = "оп",
+    items: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Вызывает operation(i) repeats раз и сводит задержки в строку отчета (items — единиц всего)."""
+    samples = []
+    start = time.perf_counter()
+    for i in range(repeats):
+        began = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    summary = latency_summary(samples, elapsed, items)
+    print(f"⏱️ {name} ({size}): p50 {summary['p50_ms']:.2f} мс")
+    return {"name": name, "size": size, "unit": unit, **summary}
+
+
+def _random_vectors(rng: np.random.Generator, count: int, dimension: int) -> np.ndarray:
+    return rng.standard_normal((count, dimension), dtype="float32")
+
+
+def bench_vector_db(
+    size: int, dimension: int, queries: int, top_k: int, batch_size: int, workdir: str
+) -> List[Dict[str, Any]]:
+    """
+    Summary: VectorDB.add_batch, search, save и load на случайных векторах.
+    Input:
+        size (int): Число векторов в базе.
+        dimension (int): Размерность.
+        queries (int): Число поисковых запросов.
+        top_k (int): Количество результатов поиска.
+        batch_size (int): Размер батча add_batch.
+        workdir (str): Каталог для save/load.
+    Output:
+        List[Dict[str, Any]]: Строки отчета.
+    """
+    rng = np.random.default_rng(size)
+    embedder = get_embedder()
+    vectors = _random_vectors(rng, size, dimension)
+    texts = [f"вопрос {i}" for i in range(size)]
+    rows = []
+
+    db = VectorDB(dimension, embedder)
+    batches = range(0, size, batch_size)
+    rows.append(
+        _measure(
+            "VectorDB.add_batch",
+            size,
+            lambda i: db.add_batch(
+                vectors[i * batch_size : (i + 1) * batch_size],
+                texts[i * batch_size : (i + 1) * batch_size],
+                [{"row": row} for row in range(i * batch_size, min(size, (i + 1) * batch_size))],
+            ),
+            len(batches),
+            unit="вект",
+            items=size,
+        )
+    )
+
+    query_vectors = _random_vectors(rng, queries, dimension)
+    rows.append(
+        _measure("VectorDB.search", size, lambda i: db.search(query_vectors[i], top_k), queries)
+    )
+
+    base_path = os.path.join(workdir, f"db_{size}")
+    rows.append(_measure("VectorDB.save", size, lambda i: db.save(base_path), 3))
+    rows.append(
+        _measure("VectorDB.load mmap", size, lambda i: VectorDB.load(base_path, True, embedder), 5)
+    )
+    rows.append(
+        _measure("VectorDB.load", size, lambda i: VectorDB.load(base_path, False, embedder), 3)
+    )
+    return rows
+
+
+def build_knowledge_base(size: int, workdir: str, rng: np.random.Generator) -> KnowledgeBase:
+    """
+    Summary: Синтетическая база знаний из size строк на основе настоящего FAQ.
+
+    Строка копирует категории и ответ случайной строки FAQ, вопрос — случайный
+    набор слов из словаря вопросов FAQ. Векторы считает эмбеддер процесса.
+    Input:
+        size (int): Число строк.
+        workdir (str): Каталог для скомпилированного FAQ и векторной базы.
+        rng (np.random.Generator): Генератор случайных чисел.
+    Output:
+        KnowledgeBase: Незагруженная база знаний над этими файлами.
+    """
+    faq = load_faq(FAQ_PATH)
+    records = pd.DataFrame([faq.record(row) for row in range(len(faq))])
+    vocabulary = sorted({word for q in records[QUESTION_COLUMN] for word in str(q).split()})
+
+    frame = records.iloc[rng.integers(0, len(records), size)].reset_index(drop=True)
+    frame[QUESTION_COLUMN] = [
+        " ".join(rng.choice(vocabulary, size=int(rng.integers(5, 11))))
+        for _ in range(size)
+    ]
+    store_path = os.path.join(workdir, f"faq_{size}.faq")
+    FaqStore.from_frame(frame).save(store_path)
+
+    embedder = get_embedder()
+    db = VectorDB(embedder.get_embedding_dimension(), embedder)
+    questions = list(frame[QUESTION_COLUMN])
+    # Частями: полный список векторов в виде списков float занял бы гигабайты
+    for start in range(0, size, 1000):
+        chunk = questions[start : start + 1000]
+        db.add_batch(
+            embedder.backend.embed(chunk),
+            chunk,
+            [{"row": row} for row in range(start, start + len(chunk))],
+        )
+    db_path = os.path.join(workdir, f"kb_{size}")
+    db.save(db_path)
+    return KnowledgeBase(f"{store_path}.json", db_path)
+
+
+def bench_find_solve_pattern(
+    size: int, queries: int, top_k: int, workdir: str
+) -> List[Dict[str, Any]]:
+    """
+    Summary: find_solve_pattern на синтетической базе знаний из size строк.
+
+    Запрос — вопрос базы без последней трети слов, поэтому проходит весь путь:
+    BM25, эмбеддинг, векторный поиск и слияние RRF (если лексическое совпадение
+    недостаточно уверенное).
+    Input:
+        size (int): Число строк базы.
+        queries (int): Число запросов.
+        top_k (int): Количество кандидатов.
+        workdir (str): Каталог для файлов базы.
+    Output:
+        List[Dict[str, Any]]: Строки отчета.
+    """
+    from classification.classify import find_solve_pattern
+    from data.index_registry import index_registry
+
+    rng = np.random.default_rng(size + 1)
+    name = f"bench-{size}"
+    base = build_knowledge_base(size, workdir, rng)
+    index_registry.register(name, base)
+    rows = [_measure("KnowledgeBase.load", size, lambda i: base.load(), 3)]
+
+    snapshot = index_registry.snapshot(name)
+    questions = snapshot.faq.column(QUESTION_COLUMN)
+    texts = []
+    for row in rng.integers(0, size, queries):
+        words = questions[row].split()
+        texts.append(" ".join(words[: max(2, len(words) * 2 // 3)]))
+    rows.append(
+        _measure(
+            "find_solve_pattern",
+            size,
+            lambda i: find_solve_pattern(texts[i], top_k, index=name),
+            queries,
+        )
+    )
+    base.unload()
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Микробенчмарки VectorDB и find_solve_pattern на 1k/10k/100k векторов"
+    )
+    parser.add_argument(
+        "--sizes", default="1000,10000,100000", help="размеры баз через запятую"
+    )
+    parser.add_argument("--dimension", type=int, default=1024, help="размерность векторов")
+    parser.add_argument("--queries", type=int, default=200, help="поисковых запросов на размер")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256, help="размер батча add_batch")
+    parser.add_argument(
+        "--skip-pipeline", action="store_true", help="не мерить find_solve_pattern"
+    )
+    parser.add_argument("--output", default=None, help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение")
+    args = parser.parse_args(argv)
+
+    rows: List[Dict[str, Any]] = []
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    try:
+        for size in (int(value) for value in args.sizes.split(",")):
+            print(f"🚀 База из {size} векторов")
+            rows += bench_vector_db(
+                size, args.dimension, args.queries, args.top_k, args.batch_size, workdir
+            )
+            if not args.skip_pipeline:
+                rows += bench_find_solve_pattern(size, args.queries, args.top_k, workdir)
+            gc.collect()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return finish(rows, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    # Микробенчмарки: python -m benchmarks.micro --sizes 1000,10000,100000
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# benchmarks/report.py
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def latency_summary(
+    samples: Sequence[float], elapsed: float, items: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Summary: Перцентили задержек и пропускная способность серии замеров.
+    Input:
+        samples (Sequence[float]): Задержки операций, с.
+        elapsed (float): Время всей серии, с (для пропускной способности).
+        items (Optional[int]): Число обработанных единиц (векторов, запросов);
+            None — одна единица на операцию.
+    Output:
+        Dict[str, Any]: count, p50/p95/p99/max/mean в мс и throughput в единицах в секунду.
+    """
+    if len(samples) == 0:
+        return {"count": 0}
+    values = np.asarray(samples, dtype="float64") * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    items = len(values) if items is None else items
+    return {
+        "count": len(values),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+        "mean_ms": float(values.mean()),
+        "throughput": items / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def print_report(rows: List[Dict[str, Any]]):
+    """
+    Summary: Печатает таблицу результатов.
+    Input:
+        rows (List[Dict[str, Any]]): Строки {"name", "size", "unit", **latency_summary}.
+    Output:
+        None
+    """
+    print(
+        f"{'бенчмарк':<24}{'размер':>9}{'n':>7}{'p50 мс':>10}{'p95 мс':>10}"
+        f"{'p99 мс':>10}{'max мс':>10}{'пропускная':>14}"
+    )
+    for row in rows:
+        if not row.get("count"):
+            print(f"{row['name']:<24}{row.get('size', ''):>9}{0:>7}")
+            continue
+        print(
+            f"{row['name']:<24}{row.get('size', ''):>9}{row['count']:>7}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+            f"{row['max_ms']:>10.2f}{row['throughput']:>10.4g} {row.get('unit', 'оп')}/с"
+        )
+
+
+def save_report(path: str, rows: List[Dict[str, Any]]):
+    """Сохраняет результаты в JSON, чтобы позже сравнить с ними (--baseline)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    print(f"💾 Результаты сохранены в {path}")
+
+
+def find_regressions(
+    rows: List[Dict[str, Any]], baseline_path: str, tolerance: float = 0.2
+) -> Tuple[List[str], int]:
+    """
+    Summary: Сравнивает результаты с сохраненными ранее.
+
+    Регрессия — p95 выше базового больше чем на tolerance или пропускная
+    способность ниже базовой больше чем на tolerance. Бенчмарки, которых
+    нет в базовом файле, не сравниваются.
+    Input:
+        rows (List[Dict[str, Any]]): Текущие результаты.
+        baseline_path (str): JSON, сохраненный save_report.
+        tolerance (float): Допустимое относительное ухудшение (0.2 — 20%).
+    Output:
+        Tuple[List[str], int]: Описания регрессий (пустой список — регрессий нет)
+            и число сравненных бенчмарков.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(row["name"], row.get("size")): row for row in json.load(f)}
+
+    regressions, compared = [], 0
+    for row in rows:
+        base = baseline.get((row["name"], row.get("size")))
+        if not base or not base.get("count") or not row.get("count"):
+            continue
+        compared += 1
+        label = f"{row['name']} ({row.get('size')})"
+        if row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: p95 {row['p95_ms']:.2f} мс против {base['p95_ms']:.2f} мс"
+            )
+        if row["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: пропускная способность {row['throughput']:.1f} против {base['throughput']:.1f}"
+            )
+    return regressions, compared
+
+
+def finish(
+    rows: List[Dict[str, Any]],
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+) -> int:
+    """
+    Summary: Печатает, сохраняет и сравнивает результаты; код выхода для CI.
+    Input:
+        rows (List[Dict[str, Any]]): Результаты бенчмарков.
+        output (Optional[str]): Куда сохранить JSON (None — не сохранять).
+        baseline (Optional[str]): JSON прошлого прогона для сравнения (None — не сравнивать).
+        tolerance (float): Допустимое относительное ухудшение.
+    Output:
+        int: 1, если найдены регрессии, иначе 0.
+    """
+    print_report(rows)
+    if output:
+        save_report(output, rows)
+    if not baseline:
+        return 0
+    regressions, compared = find_regressions(rows, baseline, tolerance)
+    for regression in regressions:
+        print(f"❌ Регрессия: {regression}")
+    if not compared:
+        print(f"⚠️ В {baseline} нет бенчмарков с теми же именами и размерами")
+    elif not regressions:
+        print(
+            f"✅ Регрессий относительно {baseline} нет "
+            f"({compared} бенчмарков, допуск {tolerance:.0%})"
+        )
+    return 1 if regressions else 0
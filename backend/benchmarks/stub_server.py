@@ -0,0 +1,267 @@
+# benchmarks/stub_server.py
+import argparse
+import html
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class StubState:
+    """
+    Поведение заглушки: эмбеддинги, задержки и счетчики запросов.
+
+    Эмбеддинг текста детерминирован: хэшированные n-граммы (как у локального
+    бэкенда), а для текстов из векторной базы (vector_db_path) — ее векторы,
+    чтобы запросы, совпадающие с вопросами FAQ, находили свою строку.
+    LLM всегда выбирает первого кандидата.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 1024,
+        embed_latency_ms: float = 20.0,
+        embed_item_ms: float = 0.5,
+        llm_ttft_ms: float = 150.0,
+        llm_token_ms: float = 20.0,
+        vector_db_path: Optional[str] = None,
+    ):
+        """
+        Summary: Инициализирует заглушку.
+        Input:
+            dimension (int): Размерность эмбеддингов.
+            embed_latency_ms (float): Задержка запроса эмбеддингов, мс.
+            embed_item_ms (float): Дополнительная задержка на каждый текст батча, мс.
+            llm_ttft_ms (float): Задержка LLM до первого токена, мс.
+            llm_token_ms (float): Задержка LLM на каждый следующий токен, мс.
+            vector_db_path (Optional[str]): Векторная база, чьи векторы отдавать для ее текстов.
+        Output:
+            None
+        """
+        self.embed_latency = embed_latency_ms / 1000
+        self.embed_item = embed_item_ms / 1000
+        self.llm_ttft = llm_ttft_ms / 1000
+        self.llm_token = llm_token_ms / 1000
+        # Модули проекта импортируются здесь: load импортирует этот модуль до того,
+        # как задаст BASE_URL, а utils/config.py создает клиентов API при импорте
+        os.environ.setdefault("API_KEY", "stub")
+        from vectorization.backends import HashedNgramBackend
+
+        self.known: Dict[str, np.ndarray] = {}
+        if vector_db_path:
+            from vector_db.vector_db import VectorDB
+
+            db = VectorDB.load(vector_db_path, mmap=False)
+            dimension = db.dimension
+            self.known = {
+                _text_key(text): db.vectors[i] for i, text in enumerate(db.texts)
+            }
+        self.backend = HashedNgramBackend(dimension=dimension)
+        self.dimension = dimension
+        self._lock = threading.Lock()
+        self.counts = {"embedding_requests": 0, "embedded_texts": 0, "chat_requests": 0}
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] += value
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Детерминированные эмбеддинги текстов."""
+        vectors = []
+        for text in texts:
+            vector = self.known.get(_text_key(text))
+            if vector is None:
+                vector = self.backend.embed([text])[0]
+            else:
+                vector = vector.tolist()
+            vectors.append(vector)
+        return vectors
+
+
+def _text_key(text: str) -> str:
+    return html.unescape(str(text)).strip()
+
+
+# Ответ LLM по токенам, как его отдает потоковый API
+_CHOICE_TOKENS = ['{"', "index", '":', " ", "1", "}"]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Обработчик OpenAI-совместимых /v1/embeddings и /v1/chat/completions."""
+
+    state: StubState
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # Счетчики запросов: GET /
+        self._send_json(self.state.counts)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/embeddings"):
+            self._embeddings(body)
+        elif self.path.endswith("/chat/completions"):
+            self._chat(body)
+        else:
+            self._send_json({"error": {"message": f"unknown path {self.path}"}}, status=404)
+
+    def _embeddings(self, body: Dict):
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        self.state.count("embedding_requests")
+        self.state.count("embedded_texts", len(texts))
+        time.sleep(self.state.embed_latency + self.state.embed_item * len(texts))
+        vectors = self.state.embed(texts)
+        self._send_json(
+            {
+                "object": "list",
+                "model": body.get("model", "stub"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vector}
+                    for i, vector in enumerate(vectors)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    def _chat(self, body: Dict):
+        self.state.count("chat_requests")
+        created = int(time.time())
+        base = {"id": "stub", "created": created, "model": body.get("model", "stub")}
+        if not body.get("stream"):
+            time.sleep(self.state.llm_ttft + self.state.llm_token * (len(_CHOICE_TOKENS) - 1))
+            self._send_json(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "".join(_CHOICE_TOKENS)},
+                        }
+                    ],
+                }
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(self.state.llm_ttft)
+        try:
+            for i, token in enumerate(_CHOICE_TOKENS):
+                if i:
+                    time.sleep(self.state.llm_token)
+                chunk = {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент прервал генерацию, как только получил номер кандидата
+            pass
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, state: Optional[StubState] = None):
+    """
+    Summary: Создает сервер заглушки (не запуская его).
+    Input:
+        host (str): Адрес.
+        port (int): Порт; 0 — любой свободный.
+        state (Optional[StubState]): Поведение заглушки; None — параметры по умолчанию.
+    Output:
+        ThreadingHTTPServer: Сервер; адрес — server.server_address.
+    """
+    # Свой подкласс на сервер: состояние не разделяется между серверами процесса
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state or StubState()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Параметры заглушки, общие для stub_server и load."""
+    parser.add_argument("--dimension", type=int, default=1024, help="размерность эмбеддингов")
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-item-ms", type=float, default=0.5)
+    parser.add_argument("--llm-ttft-ms", type=float, default=150.0)
+    parser.add_argument("--llm-token-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--vector-db",
+        default=None,
+        help="векторная база, чьи векторы отдавать для ее текстов (путь без расширения)",
+    )
+
+
+def stub_command(args: argparse.Namespace, port: int) -> List[str]:
+    """Командная строка запуска заглушки отдельным процессом с параметрами из args."""
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.stub_server",
+        "--port",
+        str(port),
+        "--dimension",
+        str(args.dimension),
+        "--embed-latency-ms",
+        str(args.embed_latency_ms),
+        "--embed-item-ms",
+        str(args.embed_item_ms),
+        "--llm-ttft-ms",
+        str(args.llm_ttft_ms),
+        "--llm-token-ms",
+        str(args.llm_token_ms),
+    ]
+    if args.vector_db:
+        command += ["--vector-db", args.vector_db]
+    return command
+
+
+def state_from_args(args: argparse.Namespace) -> StubState:
+    return StubState(
+        dimension=args.dimension,
+        embed_latency_ms=args.embed_latency_ms,
+        embed_item_ms=args.embed_item_ms,
+        llm_ttft_ms=args.llm_ttft_ms,
+        llm_token_ms=args.llm_token_ms,
+        vector_db_path=args.vector_db,
+    )
+
+
+if __name__ == "__main__":
+    # Заглушка OpenAI-совместимого API: python -m benchmarks.stub_server --port 8765
+    parser = argparse.ArgumentParser(description="Заглушка API эмбеддингов и LLM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, state_from_args(args))
+    host, port = server.server_address[:2]
+    print(f"🧪 Заглушка API слушает http://{host}:{port}/v1 (BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,119 @@
+# answer_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from utils.config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL
+
+
+def normalize_question(text: str) -> str:
+    """Приводит вопрос к ключу кэша: нижний регистр, одиночные пробелы, без знаков по краям."""
+    return " ".join(str(text).lower().split()).strip(" .,!?;:…")
+
+
+class AnswerCache:
+    """
+    Потокобезопасный LRU-кэш с ограничением по размеру и времени жизни записей.
+
+    clear() увеличивает generation: значение, вычисленное до сброса,
+    не попадет в кэш, если передать в put() поколение, прочитанное до расчета.
+    """
+
+    def __init__(self, max_size: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        """
+        Summary: Инициализирует кэш.
+        Input:
+            max_size (int): Максимальное число записей.
+            ttl (float): Время жизни записи в секундах.
+        Output:
+            None
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[Any]:
+        """
+        Summary: Возвращает значение по ключу или None.
+        Input:
+            key (Hashable): Ключ записи.
+            count (bool): Учитывать обращение в hits/misses; False — повторная
+                проверка промаха, который уже учтен.
+        Output:
+            Optional[Any]: Сохраненное значение или None при промахе.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                if count:
+                    self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        Summary: Сохраняет значение, вытесняя самые давние записи сверх max_size.
+        Input:
+            key (Hashable): Ключ записи.
+            value (Any): Значение.
+            generation (Optional[int]): Поколение кэша на момент начала расчета.
+        Output:
+            None
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Сбрасывает все записи, например после перезагрузки базы знаний."""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает статистику кэша.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Размер, попадания, промахи, вытеснения и доля попаданий.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
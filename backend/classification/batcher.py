@@ -0,0 +1,109 @@
+# batcher.py
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Объединяет одновременные запросы в пакеты.
+
+    Элементы, пришедшие в течение max_wait_ms после первого элемента пакета
+    (но не больше max_batch_size), обрабатываются одним вызовом process_batch,
+    а результаты раздаются ожидающим вызывающим по их Future.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        """
+        Summary: Инициализирует батчер.
+        Input:
+            process_batch (Callable): Корутина: список элементов -> список результатов того же размера.
+            max_batch_size (int): Максимальный размер пакета.
+            max_wait_ms (float): Сколько ждать попутчиков после первого элемента, мс.
+        Output:
+            None
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.batch_sizes: Counter = Counter()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Summary: Ставит элемент в текущий пакет и ждет его результат.
+        Input:
+            item (Any): Элемент для обработки.
+        Output:
+            Any: Результат process_batch для этого элемента.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Отправляет накопленный пакет на обработку."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Держим ссылку, чтобы задачу не собрал сборщик мусора
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        self.batch_sizes[len(batch)] += 1
+
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Вызывающий мог уже отменить ожидание по таймауту
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает статистику размеров пакетов.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Число пакетов и элементов, средний и максимальный размер, гистограмма.
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_seen_batch_size": self.max_seen_batch,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+        }
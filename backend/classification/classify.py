@@ -1,37 +1,387 @@
 # classify.py
-from classification.llm_solver import figuare_diffficults
-from data.loader import load_questions
-from vector_db.vector_db import VectorDB
-import pandas as pd
-from typing import Tuple, List, Dict, Any
-from vectorization.vectorizer import Embedder
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+from classification.answer_cache import AnswerCache, normalize_question
+from classification.batcher import MicroBatcher
+from classification.llm_router import LLMRouter
+from data.index_registry import index_registry
+from data.knowledge_base import KnowledgeSnapshot
+from typing import AsyncIterator, Hashable, Optional, Tuple, List, Dict, Any
+from utils.config import (
+    BATCH_CHUNK_SIZE,
+    CATEGORY_VOTE_TEMPERATURE,
+    LEXICAL_SKIP_THRESHOLD,
+    MICROBATCH_MAX_SIZE,
+    MICROBATCH_WAIT_MS,
+    RRF_K,
+    SEARCH_THREADS,
+)
+from vector_db.bm25_index import reciprocal_rank_fusion
+from vectorization.registry import get_embedder
 
-# Embedder is used to vectorize text for similarity search.
-embedder = Embedder()
+# Process-wide embedder shared with the vector databases (see vectorization/registry.py).
+embedder = get_embedder()
 
-def find_solve_pattern(question: str, top_k: int = 5) -> List[Dict[str, Any]]:
+# LLM-фолбэк только для неуверенных ответов; его решения кэшируются по базе и ее версии
+# (см. _llm_scope). Бюджет вызовов LLM общий для всех баз знаний
+llm_router = LLMRouter()
+
+class CategoryVote:
+    """
+    Category vote of the search candidates before the answer is picked.
+
+    A candidate weighs exp((Score - best Score) / temperature); the weights are
+    summed per category (main category + subcategory) with np.bincount and the
+    records of the winning category go first. Several close candidates of one
+    category thus outweigh a single slightly closer candidate of another.
+    """
+
+    def __init__(self, temperature: float = CATEGORY_VOTE_TEMPERATURE):
+        """
+        Initializes the vote.
+
+        Args:
+            temperature (float): Softmax temperature of the weights; 0 disables the vote.
+        """
+
+        self.temperature = temperature
+        self._stats_lock = threading.Lock()
+        self.votes = 0
+        self.overrides = 0
+
+    def vote(
+        self, results: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """
+        Reorders the candidates so that the winning category goes first.
+
+        Args:
+            results (List[Dict[str, Any]]): FAQ records ordered by score.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[float]]: The records with the winning
+                category first (the order within groups is kept) and its weight share;
+                None when the vote is disabled.
+        """
+
+        if self.temperature <= 0:
+            return results, None
+        if len(results) < 2:
+            return results, 1.0
+        codes_by_category: Dict[Tuple[str, str], int] = {}
+        codes = np.fromiter(
+            (
+                codes_by_category.setdefault(
+                    (r["Основная категория"], r["Подкатегория"]), len(codes_by_category)
+                )
+                for r in results
+            ),
+            dtype="int64",
+            count=len(results),
+        )
+        scores = np.fromiter((r["Score"] for r in results), dtype="float64", count=len(results))
+        weights = np.exp((scores - scores.max()) / self.temperature)
+        totals = np.bincount(codes, weights=weights)
+        # При равенстве побеждает категория первого кандидата (код 0)
+        winner = int(np.argmax(totals))
+        share = float(totals[winner] / totals.sum())
+        overridden = winner != int(codes[0])
+        with self._stats_lock:
+            self.votes += 1
+            self.overrides += overridden
+        if not overridden:
+            return results, share
+        order = np.argsort(codes != winner, kind="stable")
+        return [results[i] for i in order], share
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns the vote stats.
+
+        Returns:
+            Dict[str, Any]: The temperature, the number of votes and of votes
+                that moved another category first.
+        """
+
+        with self._stats_lock:
+            return {
+                "temperature": self.temperature,
+                "votes": self.votes,
+                "overrides": self.overrides,
+            }
+
+category_vote = CategoryVote()
+
+def _index_cache(name: str) -> AnswerCache:
+    """
+    Creates the answer cache of an index; it is cleared whenever the index reloads.
+
+    Callers take the index snapshot (which checks the knowledge base mtime)
+    before reading the cache, so a reload never serves stale answers.
+    """
+
+    cache = AnswerCache()
+    base = index_registry.get(name)
+    base.add_reload_listener(lambda snapshot: cache.clear())
+    return cache
+
+# Кэш готовых ответов каждой базы знаний; answer_cache — кэш базы по умолчанию
+answer_caches = {name: _index_cache(name) for name in index_registry.names()}
+answer_cache = answer_caches[index_registry.default]
+
+# Bounded pool for CPU-bound work (NumPy search, knowledge base reloads),
+# so it never runs on the event loop.
+search_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_THREADS, thread_name_prefix="search"
+)
+
+def find_solve_pattern(
+    question: str,
+    top_k: int = 5,
+    index: Optional[str] = None,
+    main_category: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     """
     Finds similar questions in the dataset and returns their details.
 
+    A confident lexical (BM25) match is returned without an embedding call;
+    otherwise vector and lexical candidates are fused with RRF.
+
     Args:
         question (str): The input question to search for.
         top_k (int): The number of top similar questions to retrieve.
+        index (Optional[str]): The knowledge base to search; None for the default one.
+        main_category (Optional[str]): Search only the questions of this main category.
 
     Returns:
         List[Dict[str, Any]]: A list of dictionaries containing details of similar questions,
                               including their scores and metadata.
     """
 
-    df = load_questions("smart_support_vtb_belarus_faq_final.xlsx")
-    vec_db = VectorDB.load("my_vector_db")
+    snapshot = index_registry.snapshot(index)
+    label = _category_label(snapshot, main_category)
+    return _find_patterns(snapshot, question, top_k, label)[0]
+
+def _find_patterns(
+    snapshot: KnowledgeSnapshot,
+    question: str,
+    top_k: int = 5,
+    label: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    find_solve_pattern over a snapshot that also tells whether the search was complete.
+
+    Args:
+        snapshot (KnowledgeSnapshot): The knowledge base snapshot to search.
+        question (str): The input question to search for.
+        top_k (int): The number of top similar questions to retrieve.
+        label (Optional[int]): Main category code to restrict the search to (see _category_label).
+
+    Returns:
+        Tuple[List[Dict[str, Any]], bool]: The FAQ records and False when the
+            embedder failed and the records come from the lexical search alone.
+    """
+
+    lexical = _lexical_patterns(snapshot, question, label)
+    if lexical is not None:
+        return lexical, True
+
+    query_vector = embedder.encode(question)
 
-    res = vec_db.search_by_text(query_text=question, top_k=top_k)
+    results = _hybrid_patterns(snapshot, question, query_vector, top_k, label=label)
+    return results, _has_vector(query_vector)
+
+async def afind_solve_pattern(
+    question: str,
+    top_k: int = 5,
+    index: Optional[str] = None,
+    main_category: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Async version of find_solve_pattern.
+
+    The embedding is requested through AsyncOpenAI; the knowledge base check,
+    the lexical lookup and the vector search run in the bounded search_executor
+    thread pool.
+
+    Args:
+        question (str): The input question to search for.
+        top_k (int): The number of top similar questions to retrieve.
+        index (Optional[str]): The knowledge base to search; None for the default one.
+        main_category (Optional[str]): Search only the questions of this main category.
+
+    Returns:
+        List[Dict[str, Any]]: A list of dictionaries containing details of similar questions,
+                              including their scores and metadata.
+    """
+
+    loop = asyncio.get_running_loop()
+    snapshot = await loop.run_in_executor(search_executor, index_registry.snapshot, index)
+    label = _category_label(snapshot, main_category)
+    return (await _afind_patterns(snapshot, question, top_k, label))[0]
+
+async def _afind_patterns(
+    snapshot: KnowledgeSnapshot,
+    question: str,
+    top_k: int = 5,
+    label: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Async version of _find_patterns."""
+
+    loop = asyncio.get_running_loop()
+    lexical = await loop.run_in_executor(
+        search_executor, _lexical_patterns, snapshot, question, label
+    )
+    if lexical is not None:
+        return lexical, True
+
+    query_vector = await embedder.aencode(question)
+
+    results = await loop.run_in_executor(
+        search_executor,
+        partial(_hybrid_patterns, snapshot, question, query_vector, top_k, label=label),
+    )
+    return results, _has_vector(query_vector)
+
+def _has_vector(vector: Optional[List[float]]) -> bool:
+    """False when the embedding failed (None, or zeros from a failed batch item)."""
+
+    return vector is not None and any(vector)
+
+def _category_label(snapshot: KnowledgeSnapshot, main_category: Optional[str]) -> Optional[int]:
+    """
+    Validates the main category filter once per request and returns its code in this snapshot.
+
+    Returns None when there is no filter; raises UnknownCategoryError for an unknown category.
+    """
+
+    if main_category is None:
+        return None
+    return snapshot.category_label(main_category)
+
+def _lexical_patterns(
+    snapshot: KnowledgeSnapshot, question: str, label: Optional[int] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns the FAQ record of a high-confidence lexical match, if there is one.
+
+    Args:
+        snapshot (KnowledgeSnapshot): The knowledge base snapshot to search.
+        question (str): The input question.
+        label (Optional[int]): Main category code to restrict the match to (see _category_label).
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: A single record scored with the lexical
+            confidence, or None when the embedding search is needed.
+    """
+
+    if snapshot.lexical_index is None:
+        return None
+    mask = snapshot.category_mask(label) if label is not None else None
+    match = snapshot.lexical_index.best_match(question, mask)
+    if match is None or match[0] < LEXICAL_SKIP_THRESHOLD:
+        return None
+    confidence, row = match
+    return [_row_pattern(snapshot, row, confidence, Lexical=confidence)]
+
+def _hybrid_patterns(
+    snapshot: KnowledgeSnapshot,
+    question: str,
+    query_vector: Optional[List[float]],
+    top_k: int = 5,
+    res: Optional[List[Tuple[float, str, Dict]]] = None,
+    label: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fuses vector and BM25 candidates with reciprocal rank fusion.
+
+    "Score" stays the exact cosine similarity of every returned record, so
+    confidence checks keep their meaning; the RRF score and the lexical
+    confidence (None when BM25 did not find the row) go to "Fused" and
+    "Lexical". Lexical candidates without a stored vector cannot get a cosine
+    and are left out. Without a query vector (the embedder is down) the
+    lexical candidates are returned alone, scored with the lexical confidence.
+    With a label both searches only look at the rows of that main category.
+
+    Args:
+        snapshot (KnowledgeSnapshot): The knowledge base snapshot to search.
+        question (str): The input question.
+        query_vector (Optional[List[float]]): The question embedding; None or zeros if unavailable.
+        top_k (int): The number of candidates to return.
+        res (Optional[List[Tuple[float, str, Dict]]]): Precomputed vector hits, e.g. from search_many.
+        label (Optional[int]): Main category code to restrict the search to.
+
+    Returns:
+        List[Dict[str, Any]]: FAQ records in fused order.
+    """
+
+    labels = [label] if label is not None else None
+    has_vector = _has_vector(query_vector)
+    if has_vector and res is None:
+        res = snapshot.vector_db.search(query_vector, top_k, labels=labels)
+
+    index = snapshot.lexical_index
+    if index is None:
+        return _build_patterns(snapshot, res or [])
+
+    mask = snapshot.category_mask(label) if label is not None else None
+    lexical_rows = [row for _, row in index.search(question, top_k, mask)]
+    if not has_vector:
+        confidences = index.confidences(question, lexical_rows)
+        return [
+            _row_pattern(snapshot, row, float(confidence), Lexical=float(confidence))
+            for row, confidence in zip(lexical_rows, confidences)
+        ]
+
+    cosines: Dict[int, float] = {}
+    for score, text, metadata in res:
+        row = metadata.get("row")
+        if row is None:
+            print(f"⚠️ Вопрос не найден в базе: {text}")
+        elif row not in cosines:
+            cosines[row] = score
+
+    fused = [
+        (fused_score, row)
+        for fused_score, row in reciprocal_rank_fusion([list(cosines), lexical_rows], RRF_K)
+        if row in cosines or snapshot.row_vectors[row] >= 0
+    ][:top_k]
+    missing = [row for _, row in fused if row not in cosines]
+    if missing:
+        similarities = snapshot.vector_db.similarities(
+            query_vector, snapshot.row_vectors[missing]
+        )
+        cosines.update(zip(missing, similarities.tolist()))
+    lexical = dict(zip(lexical_rows, index.confidences(question, lexical_rows).tolist()))
+
+    return [
+        _row_pattern(
+            snapshot, row, cosines[row], Fused=fused_score, Lexical=lexical.get(row)
+        )
+        for fused_score, row in fused
+    ]
+
+def _build_patterns(
+    snapshot: KnowledgeSnapshot, res: List[Tuple[float, str, Dict]]
+) -> List[Dict[str, Any]]:
+    """
+    Turns vector search hits into FAQ records with a "Score" field.
+
+    Args:
+        snapshot (KnowledgeSnapshot): The snapshot the search was run against.
+        res (List[Tuple[float, str, Dict]]): Search hits (score, text, metadata).
+
+    Returns:
+        List[Dict[str, Any]]: FAQ records of the hits that map to a row.
+    """
 
     res_d = []
     for data in res:
-        matching_rows = df[df["Пример вопроса"] == data[1]]
-        if not matching_rows.empty:
-            pattern = matching_rows.iloc[0].to_dict()
+        pattern = snapshot.get_record(data[2])
+        if pattern is not None:
             pattern["Score"] = data[0]
             res_d.append(pattern)
         else:
@@ -39,28 +389,397 @@ def find_solve_pattern(question: str, top_k: int = 5) -> List[Dict[str, Any]]:
 
     return res_d
 
-def classify_text(text: str) -> Tuple[str, str, str, float]:
+def _row_pattern(
+    snapshot: KnowledgeSnapshot, row: int, score: float, **scores: Optional[float]
+) -> Dict[str, Any]:
+    """Copy of the FAQ record at row with a "Score" field and the extra scores, e.g. "Lexical"."""
+
+    pattern = snapshot.get_record({"row": row})
+    pattern["Score"] = score
+    pattern.update(scores)
+    return pattern
+
+def classify_text(
+    text: str, index: Optional[str] = None, main_category: Optional[str] = None
+) -> Tuple[str, str, str, float]:
     """
     Classifies the input text into categories and returns the most relevant answer.
 
     Args:
         text (str): The input text to classify.
+        index (Optional[str]): The knowledge base to use; None for the default one.
+        main_category (Optional[str]): Answer only from this main category.
+
+    Returns:
+        Tuple[str, str, str, float]: A tuple containing the main category, subcategory,
+                                      pattern answer, and similarity score.
+    """
+
+    index = index_registry.resolve(index)
+    snapshot = index_registry.snapshot(index)
+    label = _category_label(snapshot, main_category)
+    cache = answer_caches[index]
+
+    key = _answer_key(text, main_category)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    generation = cache.generation
+
+    results, complete = _find_patterns(snapshot, text, label=label)
+
+    answer, final = _pick_answer(text, results, _llm_scope(index, snapshot))
+    # Ответ без эмбеддинга или без LLM (сбой, бюджет) не кэшируем: следующий запрос уточнит его
+    if complete and final:
+        cache.put(key, answer, generation)
+    return answer
+
+async def aclassify_text(
+    text: str, index: Optional[str] = None, main_category: Optional[str] = None
+) -> Tuple[str, str, str, float]:
+    """
+    Async version of classify_text; questions to the same index without a category
+    filter are coalesced by its micro-batcher into one embedding call and one search.
+
+    Args:
+        text (str): The input text to classify.
+        index (Optional[str]): The knowledge base to use; None for the default one.
+        main_category (Optional[str]): Answer only from this main category.
 
     Returns:
         Tuple[str, str, str, float]: A tuple containing the main category, subcategory,
                                       pattern answer, and similarity score.
     """
 
-    results = find_solve_pattern(text)
+    loop = asyncio.get_running_loop()
+    index = index_registry.resolve(index)
+    snapshot = await loop.run_in_executor(search_executor, index_registry.snapshot, index)
+    label = _category_label(snapshot, main_category)
+    cache = answer_caches[index]
+
+    key = _answer_key(text, main_category)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    generation = cache.generation
+
+    # Батчер ищет без фильтра: вопросы с фильтром по категории идут отдельно
+    if MICROBATCH_WAIT_MS <= 0 or main_category is not None:
+        results, complete = await _afind_patterns(snapshot, text, label=label)
+        answer, final = await _apick_answer(text, results, _llm_scope(index, snapshot))
+        if complete and final:
+            cache.put(key, answer, generation)
+        return answer
+
+    # Одновременные запросы к одной базе делят один вызов эмбеддингов и один матричный поиск
+    answer = await question_batchers[index].submit(text)
+    if answer is None:
+        raise ValueError("Не найдено похожих вопросов")
+    return answer
+
+async def aclassify_batch_iter(
+    texts: List[str],
+    top_k: int = 5,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    index: Optional[str] = None,
+    main_category: Optional[str] = None,
+) -> AsyncIterator[List[Tuple[int, Optional[Tuple[str, str, str, float]]]]]:
+    """
+    Classifies many texts, yielding results chunk by chunk.
+
+    Each chunk makes one batched embedding call for its cache misses and one
+    matrix-matrix search (VectorDB.search_many). Repeated questions inside
+    the batch are embedded once.
+
+    Args:
+        texts (List[str]): The input texts to classify.
+        top_k (int): The number of top similar questions to retrieve per text.
+        chunk_size (int): How many texts are embedded and searched together.
+        index (Optional[str]): The knowledge base to use; None for the default one.
+        main_category (Optional[str]): Answer only from this main category.
+
+    Yields:
+        List[Tuple[int, Optional[Tuple[str, str, str, float]]]]: (position in texts, answer)
+            pairs; the answer is None when no similar question was found.
+    """
+
+    loop = asyncio.get_running_loop()
+    index = index_registry.resolve(index)
+    snapshot = await loop.run_in_executor(search_executor, index_registry.snapshot, index)
+    label = _category_label(snapshot, main_category)
+    cache = answer_caches[index]
+
+    for start in range(0, len(texts), chunk_size):
+        answers = await _aclassify_chunk(
+            index, snapshot, texts[start : start + chunk_size], top_k, main_category, label
+        )
+        yield [(start + i, answer) for i, answer in enumerate(answers)]
+
+async def _aclassify_chunk(
+    index: str,
+    snapshot: KnowledgeSnapshot,
+    chunk: List[str],
+    top_k: int = 5,
+    main_category: Optional[str] = None,
+    label: Optional[int] = None,
+    count_lookups: bool = True,
+) -> List[Optional[Tuple[str, str, str, float]]]:
+    """
+    Classifies a block of texts with one batched embedding call and one matrix search.
+
+    Args:
+        index (str): The knowledge base name (selects its answer cache).
+        snapshot (KnowledgeSnapshot): The knowledge base snapshot to search.
+        chunk (List[str]): The input texts.
+        top_k (int): The number of top similar questions to retrieve per text.
+        main_category (Optional[str]): The main category filter (part of the cache key).
+        label (Optional[int]): Its code in snapshot.
+        count_lookups (bool): Count the answer cache lookups in its stats; False when
+            the caller has already counted the miss (questions from the micro-batcher).
+
+    Returns:
+        List[Optional[Tuple[str, str, str, float]]]: Answers in the order of chunk;
+            None where no similar question was found.
+    """
+
+    loop = asyncio.get_running_loop()
+    answers: List[Optional[Tuple[str, str, str, float]]] = [None] * len(chunk)
+    cache = answer_caches[index]
+    generation = cache.generation
+    scope = _llm_scope(index, snapshot)
+
+    # Уникальные вопросы блока, которых нет в кэше ответов
+    pending: Dict[str, List[int]] = {}
+    pending_texts: List[str] = []
+    for i, text in enumerate(chunk):
+        key = _answer_key(text, main_category)
+        if key in pending:
+            pending[key].append(i)
+            continue
+        cached = cache.get(key, count=count_lookups)
+        if cached is not None:
+            answers[i] = cached
+        else:
+            pending[key] = [i]
+            pending_texts.append(text)
+
+    if pending_texts:
+        # Уверенные лексические совпадения не требуют эмбеддинга
+        patterns = await loop.run_in_executor(
+            search_executor,
+            lambda: [_lexical_patterns(snapshot, text, label) for text in pending_texts],
+        )
+        remaining = [i for i, found in enumerate(patterns) if found is None]
+        # Вопросы, найденные только лексически из-за сбоя эмбеддингов
+        degraded = set()
+        if remaining:
+            remaining_texts = [pending_texts[i] for i in remaining]
+            try:
+                vectors = await embedder.aencode_batch(remaining_texts)
+            except Exception as e:
+                # Сервис эмбеддингов недоступен: отвечаем по лексическому поиску
+                print(f"⚠️ Эмбеддинги недоступны, только лексический поиск: {e}")
+                vectors = [None] * len(remaining_texts)
+            found = await loop.run_in_executor(
+                search_executor,
+                _search_hybrid_many,
+                snapshot,
+                remaining_texts,
+                vectors,
+                top_k,
+                label,
+            )
+            for i, vector, results in zip(remaining, vectors, found):
+                patterns[i] = results
+                if not _has_vector(vector):
+                    degraded.add(i)
+
+        # Неуверенные ответы уточняются у LLM параллельно, в пределах бюджета llm_router
+        picked = await asyncio.gather(
+            *[
+                _apick_answer(text, results, scope, required=False)
+                for text, results in zip(pending_texts, patterns)
+            ]
+        )
+        for n, ((key, positions), (answer, final)) in enumerate(zip(pending.items(), picked)):
+            if answer is None:
+                continue
+            # Фолбэки (без эмбеддинга, без LLM) отдаем, но не кэшируем
+            if final and n not in degraded:
+                cache.put(key, answer, generation)
+            for i in positions:
+                answers[i] = answer
+
+    return answers
+
+def _search_hybrid_many(
+    snapshot: KnowledgeSnapshot,
+    texts: List[str],
+    vectors: List[Optional[List[float]]],
+    top_k: int = 5,
+    label: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    One matrix search for all texts, then per-text lexical fusion.
+
+    Args:
+        snapshot (KnowledgeSnapshot): The knowledge base snapshot to search.
+        texts (List[str]): The input texts.
+        vectors (List[Optional[List[float]]]): Their embeddings (None or zeros where embedding failed).
+        top_k (int): The number of candidates per text.
+        label (Optional[int]): Main category code to restrict the search to.
+
+    Returns:
+        List[List[Dict[str, Any]]]: Ranked FAQ records for each text.
+    """
+
+    labels = [label] if label is not None else None
+    valid = [i for i, vector in enumerate(vectors) if _has_vector(vector)]
+    hits: List[Optional[List[Tuple[float, str, Dict]]]] = [None] * len(texts)
+    found = snapshot.vector_db.search_many([vectors[i] for i in valid], top_k, labels=labels)
+    for i, res in zip(valid, found):
+        hits[i] = res
+    return [
+        _hybrid_patterns(snapshot, text, vector, top_k, res, label)
+        for text, vector, res in zip(texts, vectors, hits)
+    ]
+
+async def _aclassify_coalesced(
+    index: str, texts: List[str]
+) -> List[Optional[Tuple[str, str, str, float]]]:
+    """
+    Batch function of the index micro-batcher: classifies the coalesced /process questions.
+
+    Args:
+        index (str): The knowledge base the questions were sent to.
+        texts (List[str]): Questions collected within the wait window.
+
+    Returns:
+        List[Optional[Tuple[str, str, str, float]]]: Answers in the order of texts.
+    """
+
+    loop = asyncio.get_running_loop()
+    snapshot = await loop.run_in_executor(search_executor, index_registry.snapshot, index)
+    # aclassify_text уже учел промах кэша; повторная проверка ловит ответы соседних батчей
+    return await _aclassify_chunk(index, snapshot, texts, count_lookups=False)
+
+# Coalesces concurrent /process questions to the same index into one embedding call
+# and one search; question_batcher is the batcher of the default index
+question_batchers = {
+    name: MicroBatcher(
+        partial(_aclassify_coalesced, name),
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        max_wait_ms=MICROBATCH_WAIT_MS,
+    )
+    for name in index_registry.names()
+}
+question_batcher = question_batchers[index_registry.default]
+
+async def aclassify_batch(
+    texts: List[str],
+    top_k: int = 5,
+    index: Optional[str] = None,
+    main_category: Optional[str] = None,
+) -> List[Optional[Tuple[str, str, str, float]]]:
+    """
+    Classifies many texts with batched embeddings and matrix search.
+
+    Args:
+        texts (List[str]): The input texts to classify.
+        top_k (int): The number of top similar questions to retrieve per text.
+        index (Optional[str]): The knowledge base to use; None for the default one.
+        main_category (Optional[str]): Answer only from this main category.
+
+    Returns:
+        List[Optional[Tuple[str, str, str, float]]]: Answers in the order of texts;
+            None where no similar question was found.
+    """
+
+    answers: List[Optional[Tuple[str, str, str, float]]] = []
+    async for chunk in aclassify_batch_iter(
+        texts, top_k, index=index, main_category=main_category
+    ):
+        answers.extend(answer for _, answer in chunk)
+    return answers
+
+def _answer_key(text: str, main_category: Optional[str]) -> Hashable:
+    """Answer cache key: answers filtered by category are cached apart from unfiltered ones."""
+
+    key = normalize_question(text)
+    if main_category is None:
+        return key
+    return key, main_category
+
+def _llm_scope(index: str, snapshot: KnowledgeSnapshot) -> Hashable:
+    """LLM decision cache scope: decisions of one index version never leak into another."""
+
+    return index, snapshot.version
+
+def _pick_answer(
+    text: str, results: List[Dict[str, Any]], scope: Hashable = None
+) -> Tuple[Tuple[str, str, str, float], bool]:
+    """
+    Picks the answer from the ranked FAQ records.
+
+    The candidates first vote for a category (category_vote); the top record
+    of the winning category is used as is unless llm_router finds it uncertain
+    and asks the LLM to choose among the candidates.
+
+    Args:
+        text (str): The input text.
+        results (List[Dict[str, Any]]): FAQ records ordered by score.
+        scope (Hashable): The index and its version (see _llm_scope).
+
+    Returns:
+        Tuple[Tuple[str, str, str, float], bool]: Main category, subcategory, pattern answer
+            and score, and False when the LLM was needed but skipped or failed, so the
+            answer must not be cached.
+    """
 
     if not results:
         raise ValueError("Не найдено похожих вопросов")
 
-    # If the top result has a low score, use a fallback classification method.
-    
-    main_cat = results[0]["Основная категория"]
-    sub_cat = results[0]["Подкатегория"]
-    pattern = results[0]["Шаблонный ответ"]
-    score = results[0]["Score"]
+    results, share = category_vote.vote(results)
+    return llm_router.decide(text, results, scope, share)
+
+async def _apick_answer(
+    text: str,
+    results: List[Dict[str, Any]],
+    scope: Hashable = None,
+    required: bool = True,
+) -> Tuple[Optional[Tuple[str, str, str, float]], bool]:
+    """
+    Async version of _pick_answer; the LLM call is bounded by the router timeout.
+
+    Args:
+        text (str): The input text.
+        results (List[Dict[str, Any]]): FAQ records ordered by score.
+        scope (Hashable): The index and its version (see _llm_scope).
+        required (bool): Raise ValueError on empty results instead of returning None.
+
+    Returns:
+        Tuple[Optional[Tuple[str, str, str, float]], bool]: The answer as in _pick_answer;
+            (None, False) when there are no results and required is False.
+    """
+
+    if not results:
+        if required:
+            raise ValueError("Не найдено похожих вопросов")
+        return None, False
+
+    results, share = category_vote.vote(results)
+    return await llm_router.adecide(text, results, scope, share)
+
+def get_index_stats() -> Dict[str, Any]:
+    """
+    Collects the registry stats with the answer cache and micro-batcher of each index.
+
+    Returns:
+        Dict[str, Any]: IndexRegistry.get_stats() extended per index.
+    """
 
-    return main_cat, sub_cat, pattern, score
+    stats = index_registry.get_stats()
+    for name, index_stats in stats["indexes"].items():
+        index_stats["answer_cache"] = answer_caches[name].get_stats()
+        index_stats["micro_batcher"] = question_batchers[name].get_stats()
+    return stats
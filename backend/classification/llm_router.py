@@ -0,0 +1,214 @@
+# llm_router.py
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from classification.answer_cache import AnswerCache, normalize_question
+from classification.llm_solver import (
+    afiguare_diffficults,
+    fallback_answer,
+    figuare_diffficults,
+    llm_metrics,
+)
+from utils.config import (
+    CATEGORY_VOTE_SHARE,
+    LLM_CACHE_SIZE,
+    LLM_CONCURRENCY,
+    LLM_MARGIN_THRESHOLD,
+    LLM_ROUTING,
+    LLM_SCORE_THRESHOLD,
+    LLM_TIMEOUT,
+)
+
+
+class LLMRouter:
+    """
+    Решает, когда векторного ответа недостаточно и нужен LLM.
+
+    LLM вызывается, если косинус первого кандидата ниже score_threshold или
+    если его отрыв от лучшего кандидата другой категории меньше
+    margin_threshold и голосование категорий (см. classify.CategoryVote)
+    не набрало за категорию первого кандидата долю веса vote_share.
+    Решения LLM кэшируются по области (база знаний и ее версия), вопросу
+    и набору кандидатов.
+    Одновременных вызовов не больше concurrency: сверх бюджета, по таймауту
+    и при ошибке возвращается векторный ответ (первый кандидат); он помечается
+    как неокончательный и не кэшируется ни здесь, ни в кэше ответов.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = LLM_ROUTING,
+        score_threshold: float = LLM_SCORE_THRESHOLD,
+        margin_threshold: float = LLM_MARGIN_THRESHOLD,
+        concurrency: int = LLM_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        cache_size: int = LLM_CACHE_SIZE,
+        vote_share: float = CATEGORY_VOTE_SHARE,
+    ):
+        """
+        Summary: Инициализирует маршрутизатор.
+        Input:
+            enabled (bool): Включен ли LLM-фолбэк.
+            score_threshold (float): Порог косинуса лучшего кандидата.
+            margin_threshold (float): Порог отрыва от кандидата другой категории.
+            concurrency (int): Максимум одновременных вызовов LLM.
+            timeout (float): Бюджет времени на один вызов LLM, с.
+            cache_size (int): Максимум закэшированных решений LLM.
+            vote_share (float): Доля веса, при которой категория выбирается без LLM
+                даже при малом отрыве.
+        Output:
+            None
+        """
+        self.enabled = enabled
+        self.score_threshold = score_threshold
+        self.margin_threshold = margin_threshold
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.vote_share = vote_share
+        self.cache = AnswerCache(max_size=cache_size)
+        # Неблокирующий счетчик слотов: общий для потоков и event loop
+        self._slots = threading.BoundedSemaphore(max(concurrency, 1))
+        self._stats_lock = threading.Lock()
+        self.routed = 0
+        self.calls = 0
+        self.skipped_budget = 0
+
+    def needs_llm(self, results: List[Dict[str, Any]], share: Optional[float] = None) -> bool:
+        """
+        Summary: Проверяет, уверен ли поиск в первом кандидате.
+        Input:
+            results (List[Dict[str, Any]]): Кандидаты; первым идет выбранный.
+            share (Optional[float]): Доля веса категории первого кандидата в голосовании;
+                None — голосования не было, решает только отрыв.
+        Output:
+            bool: True, если ответ стоит уточнить у LLM.
+        """
+        if not self.enabled or len(results) < 2:
+            return False
+        top = results[0]
+        if top["Score"] < self.score_threshold:
+            return True
+        # Близкие кандидаты той же категории дают тот же ответ и не мешают выбору
+        top_category = (top["Основная категория"], top["Подкатегория"])
+        for other in results[1:]:
+            if (other["Основная категория"], other["Подкатегория"]) != top_category:
+                if top["Score"] - other["Score"] >= self.margin_threshold:
+                    return False
+                return share is None or share < self.vote_share
+        return False
+
+    def decide(
+        self,
+        question: str,
+        results: List[Dict[str, Any]],
+        scope: Hashable = None,
+        share: Optional[float] = None,
+    ) -> Tuple[Tuple[str, str, str, float], bool]:
+        """
+        Summary: Выбирает ответ, при необходимости через LLM (синхронно).
+        Input:
+            question (str): Вопрос пользователя.
+            results (List[Dict[str, Any]]): Кандидаты; первым идет выбранный.
+            scope (Hashable): Область кэша решений, например (база знаний, версия);
+                после перезагрузки базы старые решения не используются.
+            share (Optional[float]): Доля веса категории первого кандидата (см. needs_llm).
+        Output:
+            Tuple[Tuple[str, str, str, float], bool]: Ответ (основная категория, подкатегория,
+                шаблонный ответ и оценка) и признак окончательного ответа. False — фолбэк
+                на первого кандидата из-за бюджета или сбоя LLM: его нельзя кэшировать.
+        """
+        if not self.needs_llm(results, share):
+            return fallback_answer(results), True
+        key, cached = self._lookup(scope, question, results)
+        if cached is not None:
+            return cached, True
+        if not self._acquire():
+            return fallback_answer(results), False
+        try:
+            generation = self.cache.generation
+            answer, answered = figuare_diffficults(question, results, timeout=self.timeout)
+        finally:
+            self._slots.release()
+        if answered:
+            self.cache.put(key, answer, generation)
+        return answer, answered
+
+    async def adecide(
+        self,
+        question: str,
+        results: List[Dict[str, Any]],
+        scope: Hashable = None,
+        share: Optional[float] = None,
+    ) -> Tuple[Tuple[str, str, str, float], bool]:
+        """
+        Summary: Асинхронная версия decide.
+        Input:
+            question (str): Вопрос пользователя.
+            results (List[Dict[str, Any]]): Кандидаты; первым идет выбранный.
+            scope (Hashable): Область кэша решений (см. decide).
+            share (Optional[float]): Доля веса категории первого кандидата (см. needs_llm).
+        Output:
+            Tuple[Tuple[str, str, str, float], bool]: Ответ и признак окончательного ответа (см. decide).
+        """
+        if not self.needs_llm(results, share):
+            return fallback_answer(results), True
+        key, cached = self._lookup(scope, question, results)
+        if cached is not None:
+            return cached, True
+        if not self._acquire():
+            return fallback_answer(results), False
+        try:
+            generation = self.cache.generation
+            answer, answered = await afiguare_diffficults(question, results, timeout=self.timeout)
+        finally:
+            self._slots.release()
+        if answered:
+            self.cache.put(key, answer, generation)
+        return answer, answered
+
+    def _lookup(
+        self, scope: Hashable, question: str, results: List[Dict[str, Any]]
+    ) -> Tuple[Tuple, Optional[Tuple[str, str, str, float]]]:
+        """Ключ решения (область + вопрос + кандидаты) и закэшированный ответ по нему."""
+        with self._stats_lock:
+            self.routed += 1
+        candidates = tuple(
+            (r["Основная категория"], r["Подкатегория"], r["Шаблонный ответ"])
+            for r in results
+        )
+        key = (scope, normalize_question(question), candidates)
+        return key, self.cache.get(key)
+
+    def _acquire(self) -> bool:
+        """Занимает слот бюджета без ожидания; False, если все слоты заняты."""
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.skipped_budget += 1
+            return False
+        with self._stats_lock:
+            self.calls += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает статистику маршрутизации.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Пороги, счетчики маршрутизации, кэш и метрики вызовов LLM.
+        """
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "score_threshold": self.score_threshold,
+                "margin_threshold": self.margin_threshold,
+                "vote_share": self.vote_share,
+                "concurrency": self.concurrency,
+                "timeout": self.timeout,
+                "routed": self.routed,
+                "calls": self.calls,
+                "skipped_budget": self.skipped_budget,
+                "cache": self.cache.get_stats(),
+                "llm": llm_metrics.get_stats(),
+            }
+
@@ -1,73 +1,375 @@
 # llm_solver.py
-from utils.config import client
-from typing import Dict, List, Tuple, Any
+from openai import APITimeoutError
+from utils.config import (
+    client,
+    async_client,
+    LLM_MAX_TOKENS,
+    LLM_STREAM,
+    LLM_STRUCTURED_OUTPUT,
+    LLM_TIMEOUT,
+)
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Any
+import asyncio
 import json
+import queue
+import re
+import threading
+import time
 
-def figuare_diffficults(question: str, data: List[Dict[str, Any]]) -> Tuple[str, str, str, float]:
-    """Использует LLM для классификации сложных случаев."""
+LLM_MODEL = "Qwen2.5-72B-Instruct-AWQ"
 
-    system_prompt = """
+# Повтор после таймаута вышел бы за срок вызова, поэтому клиенты LLM без повторов
+_llm_client = client.with_options(max_retries=0)
+_allm_client = async_client.with_options(max_retries=0)
+
+# Поле index в частичном JSON завершено, когда за цифрами идет разделитель
+_INDEX_DONE = re.compile(r'"index"\s*:\s*"?(\d+)"?\s*[,}\s]')
+
+SYSTEM_PROMPT = """
     Ты помощник сотрудника, который помогает классифицировать вопросы пользователя.
-    На вход тебе подается вопрос пользователя и список похожих вопросов с их характеристиками.
-    Выбери наиболее подходящую категорию из предоставленных вариантов.
-
-    Формат вывода: ТОЛЬКО JSON в формате:
-    {
-        "Основная категория": "название",
-        "Подкатегория": "название",
-        "Шаблонный ответ": "текст",
-        "Score": 0.95
-    }
+    На вход тебе подается вопрос пользователя и пронумерованный список кандидатов
+    в формате "номер. Основная категория / Подкатегория: пример вопроса".
+    Выбери номер наиболее подходящего кандидата.
+
+    Формат вывода: ТОЛЬКО JSON в формате {"index": номер}
     """
 
-    user_prompt = f"""
-    Вопрос пользователя: {question}
 
-    Похожие вопросы и их категории:
-    {json.dumps(data, ensure_ascii=False, indent=2)}
+def _response_format(count: int) -> Dict[str, Any]:
+    """JSON-схема ответа: только номер кандидата от 1 до count."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "candidate_choice",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer", "minimum": 1, "maximum": count}
+                },
+                "required": ["index"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def _completion_params(data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Детерминированное короткое декодирование: ответ — несколько токенов JSON."""
+    params = {
+        "model": LLM_MODEL,
+        "temperature": 0,
+        "max_tokens": LLM_MAX_TOKENS,
+    }
+    if LLM_STRUCTURED_OUTPUT:
+        params["response_format"] = _response_format(len(data))
+    return params
+
+
+def _build_messages(question: str, data: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Собирает сообщения для чата из вопроса и найденных кандидатов.
 
-    Выбери наиболее подходящую категорию из списка выше.
+    Кандидаты кодируются компактно — номер, категории и пример вопроса;
+    шаблонные ответы в промпт не попадают и подставляются локально по номеру.
     """
+    candidates = "\n".join(
+        f"{i}. {row['Основная категория']} / {row['Подкатегория']}: {row['Пример вопроса']}"
+        for i, row in enumerate(data, start=1)
+    )
+    user_prompt = f"Вопрос пользователя: {question}\n\nКандидаты:\n{candidates}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def fallback_answer(data: List[Dict[str, Any]]) -> Tuple[str, str, str, float]:
+    """Первый (лучший по вектору) кандидат."""
+    return _candidate(data, 0)
+
 
+def _candidate(data: List[Dict[str, Any]], position: int) -> Tuple[str, str, str, float]:
+    """Ответ кандидата по позиции: категории, шаблонный ответ и его косинус."""
+    return (
+        data[position]["Основная категория"],
+        data[position]["Подкатегория"],
+        data[position]["Шаблонный ответ"],
+        data[position]["Score"]
+    )
+
+
+def _parse_response(
+    response_content: str, data: List[Dict[str, Any]]
+) -> Tuple[Tuple[str, str, str, float], bool]:
+    """Разбирает номер кандидата из JSON ответа LLM; при ошибке — первый результат и False."""
     try:
-        resp = client.chat.completions.create(
-            model="Qwen2.5-72B-Instruct-AWQ",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            top_p=0.9,
-            max_tokens=512,
-        )
-
-        response_content = resp.choices[0].message.content.strip()
-
-        # Парсим JSON ответ
+        index = json.loads(response_content)["index"]
+    except (json.JSONDecodeError, TypeError, KeyError):
+        # Без структурированного вывода модель может обернуть JSON текстом
+        match = re.search(r"\d+", response_content)
+        if match is None:
+            print("⚠️ LLM не вернул номер кандидата, использую первый результат")
+            return fallback_answer(data), False
+        index = match.group()
+    try:
+        position = int(index) - 1
+    except (TypeError, ValueError):
+        position = -1
+    if not 0 <= position < len(data):
+        print(f"⚠️ LLM вернул неверный номер кандидата {index!r}, использую первый результат")
+        return fallback_answer(data), False
+    return _candidate(data, position), True
+
+
+class LLMMetrics:
+    """
+    Потокобезопасные метрики вызовов LLM: исходы и задержки последних вызовов.
+
+    ttft — время до первого токена (только в режиме стриминга),
+    total — время от начала вызова до готового решения или фолбэка.
+    """
+
+    def __init__(self, window: int = 1000):
+        """
+        Summary: Инициализирует метрики.
+        Input:
+            window (int): Сколько последних замеров хранить для перцентилей.
+        Output:
+            None
+        """
+        self._lock = threading.Lock()
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self._total: Deque[float] = deque(maxlen=window)
+        self.outcomes: Dict[str, int] = {"ok": 0, "early_stop": 0, "timeout": 0, "error": 0}
+
+    def record(self, outcome: str, total: float, ttft: Optional[float] = None):
+        """
+        Summary: Добавляет замер одного вызова.
+        Input:
+            outcome (str): ok, early_stop, timeout или error.
+            total (float): Полное время вызова, с.
+            ttft (Optional[float]): Время до первого токена, с.
+        Output:
+            None
+        """
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self._total.append(total)
+            if ttft is not None:
+                self._ttft.append(ttft)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает счетчики исходов и перцентили задержек в мс.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Исходы, p50/p95/max для ttft и total.
+        """
+        with self._lock:
+            return {
+                "outcomes": dict(self.outcomes),
+                "ttft_ms": _summary(self._ttft),
+                "total_ms": _summary(self._total),
+            }
+
+
+def _summary(values: Deque[float]) -> Dict[str, float]:
+    """p50, p95 и максимум выборки в миллисекундах."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "max": ordered[-1] * 1000}
+
+
+# Метрики всех вызовов LLM процесса
+llm_metrics = LLMMetrics()
+
+
+def _early_index(content: str) -> Optional[str]:
+    """Номер кандидата, как только поле index в частичном JSON завершено."""
+    match = _INDEX_DONE.search(content)
+    return match.group(1) if match else None
+
+
+def _record_failure(e: Exception, started: float):
+    """Учитывает неудачный вызов: таймаут или другую ошибку."""
+    timed_out = isinstance(e, (TimeoutError, APITimeoutError))
+    llm_metrics.record("timeout" if timed_out else "error", time.monotonic() - started)
+    if timed_out:
+        print("⚠️ LLM не ответил вовремя, использую первый результат")
+    else:
+        print(f"Ошибка в LLM: {e}")
+
+
+def _chunks_until(stream: Iterable[Any], deadline: float) -> Iterator[Any]:
+    """
+    Summary: Отдает чанки потока, ожидая каждый не дольше deadline - now.
+
+    Таймаут чтения httpx задается один раз на весь ответ, поэтому поток
+    читается в фоновом потоке, а срок проверяется при ожидании очереди.
+    Input:
+        stream (Iterable[Any]): Поток чанков LLM.
+        deadline (float): Момент (time.monotonic), после которого ожидание прерывается.
+    Output:
+        Iterator[Any]: Чанки потока; TimeoutError, если очередной чанк не пришел к сроку.
+    """
+    chunks: "queue.Queue[Tuple[Any, Optional[Exception]]]" = queue.Queue()
+    end = object()
+
+    def read():
+        try:
+            for chunk in stream:
+                chunks.put((chunk, None))
+        except Exception as e:
+            chunks.put((end, e))
+        else:
+            chunks.put((end, None))
+
+    threading.Thread(target=read, name="llm-stream", daemon=True).start()
+    while True:
         try:
-            result = json.loads(response_content)
-            return (
-                result["Основная категория"],
-                result["Подкатегория"],
-                result["Шаблонный ответ"],
-                result.get("Score", 0.8)  # дефолтное значение если нет Score
+            chunk, error = chunks.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            raise TimeoutError("LLM deadline exceeded") from None
+        if error is not None:
+            raise error
+        if chunk is end:
+            return
+        yield chunk
+
+
+def _stream_completion(
+    question: str, data: List[Dict[str, Any]], started: float, deadline: float
+) -> Tuple[str, Optional[float], bool]:
+    """
+    Summary: Читает ответ потоком и останавливает генерацию, как только известен номер.
+    Input:
+        question (str): Вопрос пользователя.
+        data (List[Dict[str, Any]]): Кандидаты.
+        started (float): Момент начала вызова (time.monotonic).
+        deadline (float): Момент, после которого генерация прерывается.
+    Output:
+        Tuple[str, Optional[float], bool]: Текст ответа, время до первого токена и признак ранней остановки.
+    """
+    stream = _llm_client.chat.completions.create(
+        messages=_build_messages(question, data),
+        stream=True,
+        # Ограничивает каждое чтение сокета, но не весь ответ; общий срок — в _chunks_until
+        timeout=max(deadline - time.monotonic(), 0.001),
+        **_completion_params(data),
+    )
+    content, ttft = "", None
+    try:
+        for chunk in _chunks_until(stream, deadline):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                content += delta
+                if _early_index(content) is not None:
+                    return content, ttft, True
+    finally:
+        # Закрытие соединения отменяет генерацию на сервере
+        stream.close()
+    return content, ttft, False
+
+
+async def _astream_completion(
+    question: str, data: List[Dict[str, Any]], started: float
+) -> Tuple[str, Optional[float], bool]:
+    """Асинхронная версия _stream_completion; срок задает внешний asyncio.wait_for."""
+    stream = await _allm_client.chat.completions.create(
+        messages=_build_messages(question, data),
+        stream=True,
+        **_completion_params(data),
+    )
+    content, ttft = "", None
+    try:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                content += delta
+                if _early_index(content) is not None:
+                    return content, ttft, True
+    finally:
+        # Выполняется и при отмене по таймауту: соединение закрывается, генерация прерывается
+        await stream.close()
+    return content, ttft, False
+
+
+def figuare_diffficults(
+    question: str, data: List[Dict[str, Any]], timeout: float = LLM_TIMEOUT
+) -> Tuple[Tuple[str, str, str, float], bool]:
+    """
+    Использует LLM для классификации сложных случаев.
+
+    Возвращает ответ и признак того, что его выбрал LLM. При таймауте
+    (timeout секунд), ошибке API или неразборчивом ответе ответ — data[0],
+    а признак False: такой фолбэк нельзя кэшировать как решение LLM.
+    """
+
+    started = time.monotonic()
+    try:
+        if LLM_STREAM:
+            response_content, ttft, early = _stream_completion(
+                question, data, started, started + timeout
             )
-        except json.JSONDecodeError:
-            # Если LLM не вернул JSON, используем первый результат
-            print("⚠️ LLM не вернул JSON, использую первый результат")
-            return (
-                data[0]["Основная категория"],
-                data[0]["Подкатегория"],
-                data[0]["Шаблонный ответ"],
-                data[0]["Score"]
+        else:
+            resp = _llm_client.chat.completions.create(
+                messages=_build_messages(question, data),
+                timeout=timeout,
+                **_completion_params(data),
             )
+            # content бывает None (отказ модели, пустой ответ): это тоже ответ без номера
+            response_content, ttft, early = (resp.choices[0].message.content or ""), None, False
+        response_content = response_content.strip()
 
     except Exception as e:
-        print(f"Ошибка в LLM: {e}")
+        _record_failure(e, started)
         # Возвращаем первый результат как fallback
-        return (
-            data[0]["Основная категория"],
-            data[0]["Подкатегория"],
-            data[0]["Шаблонный ответ"],
-            data[0]["Score"]
-        )
+        return fallback_answer(data), False
+
+    llm_metrics.record("early_stop" if early else "ok", time.monotonic() - started, ttft)
+    # Парсим JSON ответ
+    return _parse_response(response_content, data)
+
+
+async def afiguare_diffficults(
+    question: str, data: List[Dict[str, Any]], timeout: float = LLM_TIMEOUT
+) -> Tuple[Tuple[str, str, str, float], bool]:
+    """Асинхронная версия figuare_diffficults через AsyncOpenAI; срок — asyncio.wait_for."""
+
+    started = time.monotonic()
+    try:
+        if LLM_STREAM:
+            response_content, ttft, early = await asyncio.wait_for(
+                _astream_completion(question, data, started), timeout
+            )
+        else:
+            resp = await asyncio.wait_for(
+                _allm_client.chat.completions.create(
+                    messages=_build_messages(question, data),
+                    **_completion_params(data),
+                ),
+                timeout,
+            )
+            response_content, ttft, early = (resp.choices[0].message.content or ""), None, False
+        response_content = response_content.strip()
+
+    except Exception as e:
+        _record_failure(e, started)
+        # Возвращаем первый результат как fallback
+        return fallback_answer(data), False
+
+    llm_metrics.record("early_stop" if early else "ok", time.monotonic() - started, ttft)
+    # Парсим JSON ответ
+    return _parse_response(response_content, data)
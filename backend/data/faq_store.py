@@ -0,0 +1,332 @@
+# data/faq_store.py
+import json
+import os
+import sys
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data.loader import load_questions
+from data.preprocess_data import encode_categorical_features
+from utils.config import FAQ_STORE_MMAP
+from utils.files import atomic_write
+
+
+# Версия формата скомпилированного FAQ: манифест {store}.json + двоичный файл колонок
+STORE_FORMAT_VERSION = 1
+
+# Колонки с небольшим числом значений хранятся кодами (int32) и словарем значений
+CATEGORY_COLUMNS = ["Основная категория", "Подкатегория", "Приоритет", "Целевая аудитория"]
+
+# Выравнивание массивов в двоичном файле (байт)
+_ALIGNMENT = 64
+
+
+class FaqStore:
+    """
+    Колоночное хранилище FAQ: строка таблицы собирается индексированием массивов.
+
+    Текстовая колонка — UTF-8 байты всех значений подряд и смещения int64
+    (значение строки i — байты offsets[i]:offsets[i + 1]). Категориальная
+    колонка — коды int32 из encode_categorical_features и список значений.
+    На диске все массивы лежат в одном файле и при загрузке отображаются
+    в память, поэтому старт и перезагрузка не разбирают Excel.
+    """
+
+    def __init__(self, columns: List[str], arrays: Dict[str, Dict[str, Any]], rows: int):
+        """
+        Summary: Инициализирует хранилище из готовых массивов колонок.
+        Input:
+            columns (List[str]): Колонки в исходном порядке.
+            arrays (Dict[str, Dict[str, Any]]): Колонка -> {"offsets", "data"} для текста
+                или {"codes", "categories"} для категорий.
+            rows (int): Число строк.
+        Output:
+            None
+        """
+        self.columns = columns
+        self._arrays = arrays
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "FaqStore":
+        """
+        Summary: Строит хранилище в памяти из DataFrame.
+
+        Пустые ячейки становятся пустыми строками.
+        Input:
+            frame (pd.DataFrame): FAQ, например из load_questions.
+        Output:
+            FaqStore: Хранилище с теми же строками и колонками.
+        """
+        frame = frame.fillna("").astype(str)
+        categories = [column for column in CATEGORY_COLUMNS if column in frame.columns]
+        encoded, mappings = encode_categorical_features(frame, categories)
+
+        arrays: Dict[str, Dict[str, Any]] = {}
+        for column in frame.columns:
+            if column in mappings:
+                arrays[column] = {
+                    "codes": encoded[column].to_numpy(dtype="int32"),
+                    # mapping: значение -> код, коды идут подряд с нуля
+                    "categories": list(mappings[column]),
+                }
+            else:
+                encoded_values = [value.encode("utf-8") for value in frame[column]]
+                lengths = np.fromiter(
+                    (len(value) for value in encoded_values),
+                    dtype="int64",
+                    count=len(encoded_values),
+                )
+                arrays[column] = {
+                    "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype("int64"),
+                    "data": np.frombuffer(b"".join(encoded_values), dtype="uint8"),
+                }
+        return cls(list(frame.columns), arrays, len(frame))
+
+    def value(self, column: str, row: int) -> str:
+        """Значение ячейки (row, column)."""
+        array = self._arrays[column]
+        if "codes" in array:
+            return array["categories"][array["codes"][row]]
+        start, end = array["offsets"][row], array["offsets"][row + 1]
+        return array["data"][start:end].tobytes().decode("utf-8")
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """
+        Summary: Собирает строку FAQ в словарь (новый при каждом вызове).
+        Input:
+            row (int): Номер строки.
+        Output:
+            Dict[str, Any]: Колонка -> значение.
+        """
+        return {column: self.value(column, row) for column in self.columns}
+
+    def column(self, column: str) -> List[str]:
+        """
+        Summary: Возвращает все значения колонки.
+        Input:
+            column (str): Имя колонки.
+        Output:
+            List[str]: Значения в порядке строк.
+        """
+        array = self._arrays[column]
+        if "codes" in array:
+            categories = array["categories"]
+            return [categories[code] for code in array["codes"].tolist()]
+        data = array["data"].tobytes()
+        offsets = array["offsets"].tolist()
+        return [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(self._rows)]
+
+    def codes(self, column: str) -> np.ndarray:
+        """Коды категориальной колонки (int32 по строкам)."""
+        return self._arrays[column]["codes"]
+
+    def categories(self, column: str) -> List[str]:
+        """Значения категориальной колонки; позиция — код."""
+        return self._arrays[column]["categories"]
+
+    @property
+    def nbytes(self) -> int:
+        """Память массивов колонок (у отображенного в память хранилища — размер файла)."""
+        return sum(
+            int(value.nbytes)
+            for array in self._arrays.values()
+            for value in array.values()
+            if isinstance(value, np.ndarray)
+        )
+
+    def save(self, store_path: str, source: Optional[Dict[str, Any]] = None):
+        """
+        Summary: Сохраняет хранилище: файл колонок {store}.<id>.bin и манифест {store}.json.
+
+        Как и у VectorDB.save, манифест заменяется атомарно, а файл
+        предыдущей версии удаляется только при следующем сохранении.
+        Input:
+            store_path (str): Путь к хранилищу (без расширения).
+            source (Optional[Dict[str, Any]]): Описание исходного Excel (путь, mtime, size).
+        Output:
+            None
+        """
+        manifest_path = f"{store_path}.json"
+        previous = _read_store_manifest(manifest_path) if os.path.exists(manifest_path) else None
+
+        layout: Dict[str, Dict[str, Any]] = {}
+        chunks: List[bytes] = []
+        position = 0
+        for column in self.columns:
+            spec: Dict[str, Any] = {}
+            for name, value in self._arrays[column].items():
+                if not isinstance(value, np.ndarray):
+                    spec[name] = value
+                    continue
+                padding = -position % _ALIGNMENT
+                chunks.append(b"\0" * padding)
+                position += padding
+                spec[name] = {
+                    "dtype": value.dtype.str,
+                    "offset": position,
+                    "count": int(value.size),
+                }
+                chunks.append(value.tobytes())
+                position += value.nbytes
+            layout[column] = spec
+
+        data_file = f"{os.path.basename(store_path)}.{uuid.uuid4().hex[:12]}.bin"
+        directory = os.path.dirname(store_path)
+        atomic_write(
+            os.path.join(directory, data_file), lambda f: f.writelines(chunks)
+        )
+        manifest = {
+            "format_version": STORE_FORMAT_VERSION,
+            "rows": self._rows,
+            "columns": self.columns,
+            "layout": layout,
+            "data_file": data_file,
+            "previous_file": previous["data_file"] if previous else None,
+            "source": source,
+        }
+        atomic_write(
+            manifest_path,
+            lambda f: f.write(json.dumps(manifest, ensure_ascii=False).encode("utf-8")),
+        )
+
+        if previous and previous.get("previous_file"):
+            try:
+                os.remove(os.path.join(directory, previous["previous_file"]))
+            except OSError:
+                pass
+
+    @classmethod
+    def load(cls, store_path: str, mmap: bool = FAQ_STORE_MMAP) -> "FaqStore":
+        """
+        Summary: Загружает скомпилированное хранилище.
+        Input:
+            store_path (str): Путь к хранилищу (без расширения).
+            mmap (bool): Отображать файл колонок в память вместо чтения.
+        Output:
+            FaqStore: Хранилище; массивы — представления над файлом, без копирования.
+        """
+        manifest = _read_store_manifest(f"{store_path}.json")
+        data_path = os.path.join(os.path.dirname(store_path), manifest["data_file"])
+        if mmap and os.path.getsize(data_path) > 0:
+            buffer = np.memmap(data_path, dtype="uint8", mode="r")
+        else:
+            buffer = np.fromfile(data_path, dtype="uint8")
+
+        arrays: Dict[str, Dict[str, Any]] = {}
+        for column, spec in manifest["layout"].items():
+            arrays[column] = {}
+            for name, value in spec.items():
+                if isinstance(value, dict):
+                    value = np.frombuffer(
+                        buffer,
+                        dtype=np.dtype(value["dtype"]),
+                        count=value["count"],
+                        offset=value["offset"],
+                    )
+                arrays[column][name] = value
+        return cls(manifest["columns"], arrays, manifest["rows"])
+
+
+def store_path_for(faq_path: str) -> str:
+    """
+    Summary: Путь к скомпилированному хранилищу рядом с Excel-файлом FAQ.
+    Input:
+        faq_path (str): Путь к Excel-файлу или к манифесту хранилища.
+    Output:
+        str: Путь к хранилищу без расширения ({имя}.faq).
+    """
+    base, extension = os.path.splitext(faq_path)
+    if extension == ".json":
+        return base
+    return f"{base}.faq"
+
+
+def compile_faq(faq_path: str, store_path: Optional[str] = None) -> FaqStore:
+    """
+    Summary: Разбирает Excel-файл FAQ и сохраняет его в колоночном формате.
+    Input:
+        faq_path (str): Путь к Excel-файлу.
+        store_path (Optional[str]): Путь к хранилищу; None — рядом с Excel (store_path_for).
+    Output:
+        FaqStore: Скомпилированное хранилище (в памяти).
+    """
+    store_path = store_path or store_path_for(faq_path)
+    store = FaqStore.from_frame(load_questions(faq_path))
+    store.save(store_path, _source_info(faq_path))
+    print(f"💾 FAQ {faq_path} скомпилирован в {store_path}.json ({len(store)} строк)")
+    return store
+
+
+def load_faq(faq_path: str, mmap: bool = FAQ_STORE_MMAP) -> FaqStore:
+    """
+    Summary: Загружает FAQ из скомпилированного хранилища, компилируя его при необходимости.
+
+    Путь может указывать на манифест хранилища (.json) — тогда Excel не нужен.
+    Для Excel-файла используется хранилище рядом с ним, если оно собрано из
+    этой же версии файла (mtime и размер); иначе Excel разбирается один раз
+    и хранилище пересобирается.
+    Input:
+        faq_path (str): Путь к Excel-файлу или к манифесту хранилища.
+        mmap (bool): Отображать файл колонок в память вместо чтения.
+    Output:
+        FaqStore: Загруженное хранилище.
+    """
+    store_path = store_path_for(faq_path)
+    if faq_path.endswith(".json"):
+        return FaqStore.load(store_path, mmap)
+
+    manifest_path = f"{store_path}.json"
+    if os.path.exists(manifest_path):
+        try:
+            source = _read_store_manifest(manifest_path).get("source") or {}
+            fresh = source.get("mtime") == os.path.getmtime(faq_path) and source.get(
+                "size"
+            ) == os.path.getsize(faq_path)
+            if fresh:
+                return FaqStore.load(store_path, mmap)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Не удалось прочитать скомпилированный FAQ {manifest_path}: {e}")
+
+    store = FaqStore.from_frame(load_questions(faq_path))
+    try:
+        store.save(store_path, _source_info(faq_path))
+        print(f"💾 FAQ {faq_path} скомпилирован в {store_path}.json ({len(store)} строк)")
+    except OSError as e:
+        # Каталог только для чтения: работаем с разобранным Excel без кэша на диске
+        print(f"⚠️ Не удалось сохранить скомпилированный FAQ: {e}")
+    return store
+
+
+def _source_info(faq_path: str) -> Dict[str, Any]:
+    return {
+        "path": os.path.basename(faq_path),
+        "mtime": os.path.getmtime(faq_path),
+        "size": os.path.getsize(faq_path),
+    }
+
+
+def _read_store_manifest(manifest_path: str) -> Dict[str, Any]:
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != STORE_FORMAT_VERSION:
+        raise ValueError(
+            f"Неподдерживаемая версия формата FAQ: {manifest.get('format_version')}"
+        )
+    return manifest
+
+
+if __name__ == "__main__":
+    # Компиляция FAQ: python -m data.faq_store [faq_path] [store_path]
+    from utils.config import FAQ_PATH
+
+    compile_faq(
+        sys.argv[1] if len(sys.argv) > 1 else FAQ_PATH,
+        sys.argv[2] if len(sys.argv) > 2 else None,
+    )
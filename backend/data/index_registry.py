@@ -0,0 +1,210 @@
+# data/index_registry.py
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from data.knowledge_base import KnowledgeBase, KnowledgeSnapshot, knowledge_base
+from utils.config import DEFAULT_INDEX, KB_INDEXES, KB_MEMORY_BUDGET_MB
+
+
+class UnknownIndexError(KeyError):
+    """Запрошена база знаний, которой нет в реестре."""
+
+
+def parse_index_specs(raw: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Summary: Разбирает описание баз знаний из KB_INDEXES.
+    Input:
+        raw (str): JSON {"имя": {"faq_path": ..., "db_path": ...}}; пустая строка — нет баз.
+    Output:
+        Dict[str, Tuple[str, str]]: Имя базы -> (путь к FAQ, путь к векторной базе).
+    """
+    if not raw.strip():
+        return {}
+    specs = {}
+    for name, spec in json.loads(raw).items():
+        if not isinstance(spec, dict) or "faq_path" not in spec or "db_path" not in spec:
+            raise ValueError(f"База '{name}' в KB_INDEXES должна задавать faq_path и db_path")
+        specs[name] = (spec["faq_path"], spec["db_path"])
+    return specs
+
+
+class IndexRegistry:
+    """
+    Именованные базы знаний одного процесса (линейки продуктов, регионы).
+
+    Базы загружаются лениво, при первом запросе к ним, и дальше живут по
+    правилам KnowledgeBase (перезагрузка по mtime). Когда суммарная оценка
+    памяти загруженных снимков превышает memory_budget, выгружаются давно
+    не использованные базы (LRU); только что запрошенная база не выгружается.
+    Бэкенд эмбеддингов и HTTP-клиенты общие для всех баз.
+    """
+
+    def __init__(
+        self,
+        default: str = DEFAULT_INDEX,
+        memory_budget_mb: float = KB_MEMORY_BUDGET_MB,
+    ):
+        """
+        Summary: Инициализирует пустой реестр.
+        Input:
+            default (str): Имя базы, используемой, когда имя не указано.
+            memory_budget_mb (float): Бюджет памяти загруженных баз в МБ (0 — без ограничения).
+        Output:
+            None
+        """
+        self.default = default
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._indexes: Dict[str, KnowledgeBase] = {}
+        # Загруженные базы в порядке использования: последняя — самая свежая
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self._loads: Dict[str, int] = {}
+        self._evictions: Dict[str, int] = {}
+
+    def register(self, name: str, base: KnowledgeBase):
+        """
+        Summary: Добавляет базу знаний в реестр (без загрузки).
+        Input:
+            name (str): Имя базы.
+            base (KnowledgeBase): Сервис базы знаний.
+        Output:
+            None
+        """
+        if name in self._indexes:
+            raise ValueError(f"База знаний '{name}' уже зарегистрирована")
+        self._indexes[name] = base
+        self._requests[name] = 0
+        self._loads[name] = 0
+        self._evictions[name] = 0
+        base.add_reload_listener(lambda snapshot: self._count_load(name))
+
+    def names(self) -> List[str]:
+        """Имена зарегистрированных баз."""
+        return list(self._indexes)
+
+    def resolve(self, name: Optional[str] = None) -> str:
+        """
+        Summary: Проверяет имя базы; None означает базу по умолчанию.
+        Input:
+            name (Optional[str]): Имя базы из запроса.
+        Output:
+            str: Имя зарегистрированной базы.
+        """
+        name = name or self.default
+        if name not in self._indexes:
+            raise UnknownIndexError(name)
+        return name
+
+    def get(self, name: Optional[str] = None) -> KnowledgeBase:
+        """
+        Summary: Возвращает сервис базы знаний по имени (без загрузки).
+        Input:
+            name (Optional[str]): Имя базы; None — база по умолчанию.
+        Output:
+            KnowledgeBase: Сервис базы знаний.
+        """
+        return self._indexes[self.resolve(name)]
+
+    def snapshot(self, name: Optional[str] = None) -> KnowledgeSnapshot:
+        """
+        Summary: Возвращает актуальный снимок базы, загружая ее при первом обращении.
+
+        Обращение отмечает базу как недавно использованную; после загрузки
+        лишние по бюджету памяти базы выгружаются.
+        Input:
+            name (Optional[str]): Имя базы; None — база по умолчанию.
+        Output:
+            KnowledgeSnapshot: Текущий снимок базы.
+        """
+        name = self.resolve(name)
+        snapshot = self._indexes[name].get()
+        with self._lock:
+            self._lru[name] = None
+            self._lru.move_to_end(name)
+            victims = self._victims(keep=name)
+        with self._stats_lock:
+            self._requests[name] += 1
+        # Выгрузка ждет блокировки базы, поэтому выполняется вне блокировки реестра
+        for victim in victims:
+            self._indexes[victim].unload()
+            with self._stats_lock:
+                self._evictions[victim] += 1
+            print(f"📤 База знаний '{victim}' выгружена: превышен бюджет памяти")
+        return snapshot
+
+    def _victims(self, keep: str) -> List[str]:
+        """Давно не использованные базы, которые нужно выгрузить, чтобы уложиться в бюджет."""
+        if self.memory_budget <= 0:
+            return []
+        total = self.memory_bytes()
+        victims = []
+        for name in list(self._lru):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            del self._lru[name]
+            victims.append(name)
+            snapshot = self._indexes[name].loaded
+            total -= snapshot.memory_bytes if snapshot is not None else 0
+        return victims
+
+    def memory_bytes(self) -> int:
+        """Суммарная оценка памяти загруженных снимков."""
+        total = 0
+        for base in self._indexes.values():
+            snapshot = base.loaded
+            if snapshot is not None:
+                total += snapshot.memory_bytes
+        return total
+
+    def _count_load(self, name: str):
+        with self._stats_lock:
+            self._loads[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает бюджет памяти и статистику каждой базы.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Бюджет, занятая память и по каждой базе — пути,
+                состояние, версия, память, число запросов, загрузок и выгрузок.
+        """
+        indexes = {}
+        with self._stats_lock:
+            for name, base in self._indexes.items():
+                snapshot = base.loaded
+                indexes[name] = {
+                    "faq_path": base.questions_path,
+                    "db_path": base.db_path,
+                    "loaded": snapshot is not None,
+                    "version": snapshot.version if snapshot is not None else None,
+                    "memory_bytes": snapshot.memory_bytes if snapshot is not None else 0,
+                    "requests": self._requests[name],
+                    "loads": self._loads[name],
+                    "evictions": self._evictions[name],
+                }
+        return {
+            "default": self.default,
+            "memory_budget_bytes": self.memory_budget,
+            "memory_bytes": self.memory_bytes(),
+            "indexes": indexes,
+        }
+
+
+def _build_registry() -> IndexRegistry:
+    """Реестр процесса: база по умолчанию (FAQ_PATH, VECTOR_DB_PATH) и базы из KB_INDEXES."""
+    registry = IndexRegistry()
+    registry.register(DEFAULT_INDEX, knowledge_base)
+    for name, (faq_path, db_path) in parse_index_specs(KB_INDEXES).items():
+        registry.register(name, KnowledgeBase(faq_path, db_path))
+    return registry
+
+
+# Общий для процесса реестр баз знаний
+index_registry = _build_registry()
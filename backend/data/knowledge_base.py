@@ -0,0 +1,306 @@
+# data/knowledge_base.py
+import html
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.faq_store import FaqStore, load_faq
+from utils.config import (
+    BM25_B,
+    BM25_K1,
+    FAQ_PATH,
+    HYBRID_SEARCH,
+    KB_RELOAD_INTERVAL,
+    LEXICAL_STEMMING,
+    VECTOR_DB_PATH,
+)
+from vector_db.bm25_index import BM25Index
+from vector_db.vector_db import VectorDB
+
+
+QUESTION_COLUMN = "Пример вопроса"
+MAIN_CATEGORY_COLUMN = "Основная категория"
+
+
+class UnknownCategoryError(KeyError):
+    """Фильтр поиска указывает категорию, которой нет в FAQ."""
+
+
+def _question_key(text: Any) -> str:
+    """Ключ для сопоставления текста вектора с вопросом FAQ, устойчивый к &#xA; и пробелам."""
+    return html.unescape(str(text)).strip()
+
+
+def attach_row_ids(questions: Sequence[Any], vector_db: VectorDB) -> int:
+    """
+    Summary: Проставляет в метаданные векторов номер строки FAQ ("row").
+
+    Сохраненный номер используется, только если вопрос в этой строке совпадает
+    с текстом вектора: после правки Excel (вставка или удаление строк) база
+    перезагружается раньше синхронизации, и старые номера указывают не туда.
+    Иначе строка ищется по тексту; если ее нет, номер удаляется.
+    Input:
+        questions (Sequence[Any]): Колонка "Пример вопроса" FAQ в порядке строк.
+        vector_db (VectorDB): Векторная база, построенная по этому FAQ.
+    Output:
+        int: Количество векторов, для которых строку найти не удалось.
+    """
+    text_to_row: Dict[str, int] = {}
+    for row, text in enumerate(questions):
+        # При дубликатах берем первую строку, как и прежний поиск через iloc[0]
+        text_to_row.setdefault(_question_key(text), row)
+
+    missing = 0
+    for i, (text, metadata) in enumerate(zip(vector_db.texts, vector_db.metadata)):
+        key = _question_key(text)
+        row = metadata.get("row")
+        if row is None or not (
+            0 <= row < len(questions) and _question_key(questions[row]) == key
+        ):
+            row = text_to_row.get(key)
+        if row is None:
+            if "row" in metadata:
+                vector_db.metadata[i] = {k: v for k, v in metadata.items() if k != "row"}
+            if i not in vector_db.tombstones:
+                missing += 1
+                print(f"⚠️ Вопрос не найден в базе: {text}")
+            continue
+        if metadata.get("row") != row:
+            vector_db.metadata[i] = {**metadata, "row": row}
+    return missing
+
+
+class KnowledgeSnapshot:
+    """
+    Неизменяемый снимок базы знаний: FAQ и векторная база, загруженные вместе.
+
+    faq хранит FAQ по колонкам (FaqStore), а metadata["row"] каждого
+    вектора указывает на свою строку, так что ответ собирается за O(1).
+    row_vectors — обратное отображение: строка FAQ -> номер вектора (-1, если нет).
+    lexical_index — BM25 по вопросам FAQ (номер документа = номер строки).
+    Коды основной категории строк (row_labels) передаются векторной базе
+    как метки строк, чтобы поиск с фильтром по категории шел по подмножеству.
+    """
+
+    def __init__(
+        self,
+        faq: FaqStore,
+        vector_db: VectorDB,
+        mtimes: Tuple[float, float],
+        version: int,
+        lexical_index: Optional[BM25Index] = None,
+    ):
+        self.faq = faq
+        self.vector_db = vector_db
+        self.mtimes = mtimes
+        self.version = version
+        self.lexical_index = lexical_index
+        self.row_vectors = np.full(len(faq), -1, dtype="int64")
+        vector_rows = np.full(len(vector_db.metadata), -1, dtype="int64")
+        for i, metadata in enumerate(vector_db.metadata):
+            row = metadata.get("row")
+            if row is not None and i not in vector_db.tombstones:
+                vector_rows[i] = row
+                if self.row_vectors[row] < 0:
+                    self.row_vectors[row] = i
+
+        self.category_names: List[str] = []
+        self.row_labels = np.zeros(len(faq), dtype="int32")
+        self._category_masks: Dict[int, np.ndarray] = {}
+        if MAIN_CATEGORY_COLUMN in faq.columns:
+            self.category_names = faq.categories(MAIN_CATEGORY_COLUMN)
+            self.row_labels = np.asarray(faq.codes(MAIN_CATEGORY_COLUMN))
+            vector_db.set_labels(
+                np.where(vector_rows >= 0, self.row_labels[vector_rows], -1)
+            )
+        self.memory_bytes = self._estimate_memory()
+
+    def category_label(self, name: str) -> int:
+        """
+        Summary: Код основной категории по ее названию.
+        Input:
+            name (str): Значение колонки "Основная категория".
+        Output:
+            int: Код категории (метка строк векторной базы).
+        """
+        try:
+            return self.category_names.index(name)
+        except ValueError:
+            raise UnknownCategoryError(name) from None
+
+    def category_mask(self, label: int) -> np.ndarray:
+        """Булева маска строк FAQ с кодом категории label (для BM25)."""
+        mask = self._category_masks.get(label)
+        if mask is None:
+            mask = self.row_labels == label
+            self._category_masks[label] = mask
+        return mask
+
+    def _estimate_memory(self) -> int:
+        """Оценка памяти снимка: векторы, колонки FAQ и BM25."""
+        total = self.vector_db.nbytes + self.faq.nbytes + int(self.row_vectors.nbytes)
+        if self.lexical_index is not None:
+            total += self.lexical_index.nbytes
+        return total
+
+    def get_record(self, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Summary: Возвращает копию строки FAQ по метаданным найденного вектора.
+        Input:
+            metadata (Dict[str, Any]): Метаданные вектора из результата поиска.
+        Output:
+            Optional[Dict[str, Any]]: Строка FAQ или None, если вектор не сопоставлен.
+        """
+        row = metadata.get("row")
+        if row is None:
+            return None
+        return self.faq.record(row)
+
+
+class KnowledgeBase:
+    """
+    Загружает FAQ и векторную базу один раз на процесс и разделяет их между запросами.
+
+    Если mtime исходных файлов изменился, снимок перестраивается целиком
+    и подменяется одной операцией присваивания, поэтому запросы всегда видят
+    согласованную пару FAQ + векторная база.
+    """
+
+    def __init__(
+        self,
+        questions_path: str = FAQ_PATH,
+        db_path: str = VECTOR_DB_PATH,
+        reload_interval: float = KB_RELOAD_INTERVAL,
+    ):
+        """
+        Summary: Инициализирует сервис базы знаний.
+        Input:
+            questions_path (str): Путь к Excel-файлу с FAQ.
+            db_path (str): Путь к векторной базе (без расширения).
+            reload_interval (float): Минимальный интервал между проверками mtime, в секундах.
+        Output:
+            None
+        """
+        self.questions_path = questions_path
+        self.db_path = db_path
+        self.reload_interval = reload_interval
+        self._snapshot: Optional[KnowledgeSnapshot] = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        # Номер последнего снимка; не сбрасывается при выгрузке
+        self._version = 0
+        self._listeners: List[Callable[[KnowledgeSnapshot], None]] = []
+
+    def add_reload_listener(self, listener: Callable[[KnowledgeSnapshot], None]):
+        """
+        Summary: Регистрирует функцию, вызываемую после публикации каждого нового снимка.
+        Input:
+            listener (Callable[[KnowledgeSnapshot], None]): Обработчик, например сброс кэшей.
+        Output:
+            None
+        """
+        self._listeners.append(listener)
+
+    def _source_mtimes(self) -> Tuple[float, float]:
+        return (
+            os.path.getmtime(self.questions_path),
+            os.path.getmtime(VectorDB.source_path(self.db_path)),
+        )
+
+    def load(self) -> KnowledgeSnapshot:
+        """
+        Summary: Загружает FAQ и векторную базу и публикует новый снимок.
+        Input:
+            None
+        Output:
+            KnowledgeSnapshot: Загруженный снимок.
+        """
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self) -> KnowledgeSnapshot:
+        mtimes = self._source_mtimes()
+        faq = load_faq(self.questions_path)
+        questions = faq.column(QUESTION_COLUMN)
+        vector_db = VectorDB.load(self.db_path)
+        attach_row_ids(questions, vector_db)
+        # Индекс и квантование обучаются при сборке базы (save_database);
+        # здесь — только для баз, сохраненных без них
+        if vector_db.prepare_search():
+            print("⚠️ ANN-индекс или квантование построены при загрузке: пересоберите базу")
+
+        lexical_index = None
+        if HYBRID_SEARCH:
+            lexical_index = BM25Index(k1=BM25_K1, b=BM25_B, stem=LEXICAL_STEMMING)
+            lexical_index.build(questions)
+
+        self._version += 1
+        version = self._version
+        snapshot = KnowledgeSnapshot(faq, vector_db, mtimes, version, lexical_index)
+        self._snapshot = snapshot
+        self._last_check = time.monotonic()
+        print(
+            f"📚 База знаний загружена (версия {version}): "
+            f"{len(questions)} вопросов, {len(vector_db.texts)} векторов"
+        )
+        for listener in self._listeners:
+            listener(snapshot)
+        return snapshot
+
+    @property
+    def loaded(self) -> Optional[KnowledgeSnapshot]:
+        """Текущий снимок без проверки mtime и без загрузки (None, если база не загружена)."""
+        return self._snapshot
+
+    def unload(self):
+        """
+        Summary: Выгружает снимок; следующий get() загрузит базу заново.
+
+        Запросы, уже получившие снимок, дорабатывают с ним: память
+        освобождается, когда на снимок не остается ссылок.
+        Input:
+            None
+        Output:
+            None
+        """
+        with self._lock:
+            self._snapshot = None
+
+    def get(self) -> KnowledgeSnapshot:
+        """
+        Summary: Возвращает актуальный снимок, при необходимости перезагружая его.
+        Input:
+            None
+        Output:
+            KnowledgeSnapshot: Текущий снимок базы знаний.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+
+        if time.monotonic() - self._last_check < self.reload_interval:
+            return snapshot
+
+        with self._lock:
+            # Другой поток мог уже перезагрузить базу, пока мы ждали блокировку
+            # или выгрузить ее (IndexRegistry) — тогда загружаем заново
+            if self._snapshot is None:
+                return self._load_locked()
+            if self._snapshot is not snapshot:
+                return self._snapshot
+            self._last_check = time.monotonic()
+            try:
+                if self._source_mtimes() == snapshot.mtimes:
+                    return snapshot
+                return self._load_locked()
+            except Exception as e:
+                # Оставляем старый снимок, если новые файлы не читаются
+                print(f"⚠️ Не удалось перезагрузить базу знаний: {e}")
+                return snapshot
+
+
+# Общий для процесса экземпляр базы знаний
+knowledge_base = KnowledgeBase()
@@ -1,12 +1,137 @@
+import html
+import re
 import pandas as pd
 from typing import List, Dict, Tuple
 
 
-def preprocess_text(text):
-    """Простейшая предобработка текста перед векторизацией."""
-    # text = str(text).strip().lower()
-    # Здесь можно добавить удаление пунктуации, стоп-слов и т.п.
-    return text
+# Все, что не буква и не цифра, считаем разделителем слов
+_NON_WORD = re.compile(r"[^0-9a-zа-я]+")
+
+# Стеммер Портера для русского языка (алгоритм Snowball), окончания по группам
+_VOWELS = set("аеиоуыэюя")
+_PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+_REFLEXIVE = ((), ("ся", "сь"))
+_ADJECTIVE = (
+    (),
+    (
+        "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым",
+        "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+    ),
+)
+_PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+_VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл",
+        "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены",
+        "ить", "ыть", "ишь", "ую", "ю",
+    ),
+)
+_NOUN = (
+    (),
+    (
+        "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией",
+        "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах",
+        "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+    ),
+)
+_DERIVATIONAL = ((), ("ост", "ость"))
+_SUPERLATIVE = ((), ("ейш", "ейше"))
+
+
+def _strip_ending(word: str, start: int, groups: Tuple[Tuple[str, ...], Tuple[str, ...]]) -> str:
+    """
+    Отрезает самое длинное окончание из groups, лежащее в word[start:].
+
+    Окончания первой группы снимаются, только если перед ними стоит "а" или "я".
+    Если окончание не найдено, возвращает word без изменений.
+    """
+    best = ""
+    for ending in groups[0]:
+        if (
+            len(ending) > len(best)
+            and word.endswith(ending)
+            and len(word) - len(ending) - 1 >= start
+            and word[-len(ending) - 1] in "ая"
+        ):
+            best = ending
+    for ending in groups[1]:
+        if len(ending) > len(best) and word.endswith(ending) and len(word) - len(ending) >= start:
+            best = ending
+    return word[: len(word) - len(best)] if best else word
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Начала областей RV и R2 алгоритма Snowball."""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+
+    def after_consonant_after_vowel(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_consonant_after_vowel(0)
+    return rv, after_consonant_after_vowel(r1)
+
+
+def stem_russian(word: str) -> str:
+    """
+    Summary: Приводит русское слово к основе (Snowball / Портер для русского).
+    Input:
+        word (str): Слово в нижнем регистре, "ё" уже заменена на "е".
+    Output:
+        str: Основа слова; слова без русских гласных не меняются.
+    """
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1: деепричастие, иначе возвратная частица + прилагательное/глагол/существительное
+    stemmed = _strip_ending(word, rv, _PERFECTIVE_GERUND)
+    if stemmed == word:
+        word = _strip_ending(word, rv, _REFLEXIVE)
+        stemmed = _strip_ending(word, rv, _ADJECTIVE)
+        if stemmed != word:
+            stemmed = _strip_ending(stemmed, rv, _PARTICIPLE)
+        else:
+            stemmed = _strip_ending(word, rv, _VERB)
+            if stemmed == word:
+                stemmed = _strip_ending(word, rv, _NOUN)
+    word = stemmed
+
+    # Шаг 2: "и" на конце
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательные окончания в R2
+    word = _strip_ending(word, r2, _DERIVATIONAL)
+
+    # Шаг 4: "нн" -> "н", превосходная степень, мягкий знак
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        return word[:-1]
+    stemmed = _strip_ending(word, rv, _SUPERLATIVE)
+    if stemmed != word:
+        word = stemmed
+        return word[:-1] if word.endswith("нн") and len(word) - 2 >= rv else word
+    if word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def preprocess_text(text, stem: bool = False):
+    """
+    Нормализует текст вопроса для лексического поиска и сравнения.
+
+    HTML-сущности (&#xA;) раскрываются, регистр понижается, "ё" заменяется на "е",
+    пунктуация удаляется, пробелы схлопываются. При stem=True каждое слово
+    дополнительно приводится к основе стеммером Snowball для русского.
+    """
+    text = html.unescape(str(text)).lower().replace("ё", "е")
+    words = _NON_WORD.sub(" ", text).split()
+    if stem:
+        words = [stem_russian(word) for word in words]
+    return " ".join(words)
 
 
 def encode_categorical_features(
@@ -1,10 +1,45 @@
-from fastapi import FastAPI
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from classification.classify import classify_text
+from classification.classify import (
+    aclassify_batch,
+    aclassify_batch_iter,
+    aclassify_text,
+    answer_cache,
+    category_vote,
+    embedder,
+    get_index_stats,
+    llm_router,
+    question_batcher,
+)
+from data.index_registry import UnknownIndexError, index_registry
+from data.knowledge_base import UnknownCategoryError
+from utils.config import (
+    BATCH_REQUEST_TIMEOUT,
+    MAX_BATCH_QUESTIONS,
+    MAX_CONCURRENT_REQUESTS,
+    REQUEST_TIMEOUT,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Загружает базу знаний по умолчанию при старте; остальные базы — при первом запросе."""
+    index_registry.snapshot()
+    yield
+    # Отложенные обновления времени обращения к кэшу эмбеддингов
+    if embedder.cache is not None:
+        embedder.cache.flush()
+
 
 # Создаем экземпляр приложения FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,9 +50,51 @@ app.add_middleware(
 )
 
 
-# Модель запроса
+# Ограничение одновременно обрабатываемых классификаций в воркере
+request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+
+async def _classify_limited(
+    question: str, index: Optional[str], main_category: Optional[str]
+):
+    async with request_semaphore:
+        return await aclassify_text(question, index, main_category)
+
+
+def _resolve_index(index: Optional[str]) -> str:
+    try:
+        return index_registry.resolve(index)
+    except UnknownIndexError:
+        raise HTTPException(status_code=404, detail=f"База знаний '{index}' не найдена")
+
+
+async def _check_category(index: str, main_category: Optional[str]):
+    if main_category is None:
+        return
+    loop = asyncio.get_running_loop()
+    snapshot = await loop.run_in_executor(None, index_registry.snapshot, index)
+    try:
+        snapshot.category_label(main_category)
+    except UnknownCategoryError:
+        raise HTTPException(
+            status_code=404, detail=f"Категория '{main_category}' не найдена"
+        )
+
+
+# Модель запроса; index — имя базы знаний (по умолчанию DEFAULT_INDEX),
+# main_category — искать ответ только в этой основной категории
 class RequestModel(BaseModel):
     question: str
+    index: Optional[str] = None
+    main_category: Optional[str] = None
+
+
+# Модель пакетного запроса
+class BatchRequestModel(BaseModel):
+    questions: List[str]
+    stream: bool = False
+    index: Optional[str] = None
+    main_category: Optional[str] = None
 
 
 # Модель ответа
@@ -28,25 +105,146 @@ class ResponseModel(BaseModel):
     sub_category: str
 
 
+def _to_response(response) -> ResponseModel:
+    return ResponseModel(
+        score=response[3],
+        offered_responce=response[2],
+        main_category=response[0],
+        sub_category=response[1],
+    )
+
+
 @app.post("/process", response_model=ResponseModel)
 async def process_string(request: RequestModel):
     """
     Обрабатывает входную строку и возвращает обработанную строку.
 
     Args:
-        request (RequestModel): Модель запроса, содержащая входную строку.
+        request (RequestModel): Вопрос, необязательные имя базы знаний (index)
+            и фильтр по основной категории (main_category); неизвестная база
+            или категория — ответ 404.
 
     Returns:
         ResponseModel: Модель ответа, содержащая обработанную строку.
     """
-    # Логика обработки строки
-    # В данном примере строка преобразуется в верхний регистр
-    response = classify_text(request.question)
+    index = _resolve_index(request.index)
+    await _check_category(index, request.main_category)
+    # Классификация полностью асинхронная; ожидание очереди входит в таймаут
+    try:
+        response = await asyncio.wait_for(
+            _classify_limited(request.question, index, request.main_category),
+            timeout=REQUEST_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Превышено время обработки запроса")
 
     # Возвращаем модель ответа с обработанной строкой
-    return ResponseModel(
-        score=response[3],
-        offered_responce=response[2],
-        main_category=response[0],
-        sub_category=response[1],
-    )
+    return _to_response(response)
+
+
+@app.post("/process_batch", response_model=List[Optional[ResponseModel]])
+async def process_batch(request: BatchRequestModel):
+    """
+    Классифицирует список вопросов пакетными эмбеддингами и одним матричным поиском на блок.
+
+    Args:
+        request (BatchRequestModel): Список вопросов; stream=True включает ответ в NDJSON,
+            main_category ограничивает поиск основной категорией.
+
+    Returns:
+        List[Optional[ResponseModel]]: Ответы в порядке вопросов (null, если похожих нет).
+            При stream=True — строки NDJSON {"index": i, "result": ...} по мере готовности блоков;
+            если BATCH_REQUEST_TIMEOUT истек, последняя строка — {"error": ...}.
+    """
+    if len(request.questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Не больше {MAX_BATCH_QUESTIONS} вопросов в одном запросе",
+        )
+    index_name = _resolve_index(request.index)
+    await _check_category(index_name, request.main_category)
+
+    if request.stream:
+
+        async def lines():
+            # Заголовки 200 уже отправлены, поэтому превышение срока — последняя строка
+            timeout_line = json.dumps(
+                {"error": "Превышено время обработки запроса"}, ensure_ascii=False
+            ) + "\n"
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + BATCH_REQUEST_TIMEOUT
+            try:
+                await asyncio.wait_for(request_semaphore.acquire(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                yield timeout_line
+                return
+            chunks = aclassify_batch_iter(
+                request.questions, index=index_name, main_category=request.main_category
+            )
+            try:
+                while True:
+                    # Каждый блок ждем не дольше, чем осталось до срока всего пакета
+                    try:
+                        chunk = await asyncio.wait_for(
+                            chunks.__anext__(), max(deadline - loop.time(), 0)
+                        )
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        yield timeout_line
+                        return
+                    for index, response in chunk:
+                        result = (
+                            _to_response(response).model_dump() if response else None
+                        )
+                        yield json.dumps(
+                            {"index": index, "result": result}, ensure_ascii=False
+                        ) + "\n"
+            finally:
+                await chunks.aclose()
+                request_semaphore.release()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def classify_all():
+        async with request_semaphore:
+            return await aclassify_batch(
+                request.questions, index=index_name, main_category=request.main_category
+            )
+
+    try:
+        responses = await asyncio.wait_for(classify_all(), timeout=BATCH_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Превышено время обработки запроса")
+
+    return [_to_response(response) if response else None for response in responses]
+
+
+@app.get("/stats")
+async def get_stats():
+    """
+    Возвращает статистику кэшей, базы знаний по умолчанию и каждой базы из реестра.
+    """
+    # Снимок может перезагрузить базу, а статистика кэша эмбеддингов читает SQLite
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _collect_stats)
+
+
+def _collect_stats():
+    snapshot = index_registry.snapshot()
+    return {
+        "knowledge_base": {
+            "version": snapshot.version,
+            **snapshot.vector_db.get_stats(),
+            "lexical_index": (
+                snapshot.lexical_index.get_stats() if snapshot.lexical_index else None
+            ),
+        },
+        "answer_cache": answer_cache.get_stats(),
+        "embedder": embedder.get_stats(),
+        "embedding_cache": embedder.cache.get_stats() if embedder.cache else None,
+        "micro_batcher": question_batcher.get_stats(),
+        "category_vote": category_vote.get_stats(),
+        "llm_router": llm_router.get_stats(),
+        "indexes": get_index_stats(),
+    }
@@ -0,0 +1,69 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Тесты не ходят в сеть: локальные эмбеддинги, без кэша эмбеддингов и без LLM.
+# Окружение задается до импорта utils.config, который читает его и создает клиентов API
+os.environ.setdefault("API_KEY", "test")
+os.environ["EMBEDDING_BACKEND"] = "hashed"
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+os.environ["LLM_ROUTING"] = "0"
+# База знаний по умолчанию — маленький FAQ, который собирает фикстура knowledge_base
+DATA_DIR = tempfile.mkdtemp(prefix="support-tests-")
+os.environ["FAQ_PATH"] = os.path.join(DATA_DIR, "faq.faq.json")
+os.environ["VECTOR_DB_PATH"] = os.path.join(DATA_DIR, "kb")
+
+# Импорты проекта — относительно backend/, как у сервиса
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+FAQ_ROWS = [
+    ("Продукты - Вклады", "Рублевые", "Как открыть вклад в приложении?",
+     "Вклад открывается в приложении."),
+    ("Продукты - Вклады", "Рублевые", "Можно ли пополнить вклад?",
+     "Пополнение зависит от условий вклада."),
+    ("Продукты - Карты", "Кредитные", "Как оформить кредитную карту?",
+     "Кредитную карту можно оформить онлайн."),
+    ("Продукты - Карты", "Дебетовые", "Как заблокировать карту?",
+     "Карту можно заблокировать в приложении."),
+    ("Сервис", "Банкоматы", "Где ближайший банкомат?",
+     "Адреса банкоматов есть на сайте."),
+    ("Сервис", "Курсы", "Какой сегодня курс валют?",
+     "Курсы валют опубликованы на сайте."),
+]
+
+
+def build_knowledge_base(faq_path: str, db_path: str, rows=FAQ_ROWS, embed_rows=None):
+    """
+    Компилирует FAQ из rows и строит для него векторную базу локальными эмбеддингами.
+
+    embed_rows — номера строк, попадающих в векторную базу (None — все).
+    """
+    import pandas as pd
+
+    from data.faq_store import FaqStore, store_path_for
+    from vector_db.vector_db import VectorDB
+    from vectorization.registry import get_embedder
+
+    frame = pd.DataFrame(
+        rows,
+        columns=["Основная категория", "Подкатегория", "Пример вопроса", "Шаблонный ответ"],
+    )
+    FaqStore.from_frame(frame).save(store_path_for(faq_path))
+    embedder = get_embedder()
+    if embed_rows is None:
+        embed_rows = range(len(rows))
+    questions = [rows[row][2] for row in embed_rows]
+    db = VectorDB(embedder.get_embedding_dimension(), embedder)
+    metadata = [{"row": row} for row in embed_rows]
+    db.add_batch(embedder.encode_batch(questions), questions, metadata)
+    db.save(db_path)
+
+
+@pytest.fixture(scope="session")
+def knowledge_base():
+    """База знаний по умолчанию (FAQ_PATH, VECTOR_DB_PATH) из FAQ_ROWS."""
+    build_knowledge_base(os.environ["FAQ_PATH"], os.environ["VECTOR_DB_PATH"])
+    return FAQ_ROWS
@@ -0,0 +1,56 @@
+# tests/test_answer_cache.py
+import time
+
+from classification.answer_cache import AnswerCache, normalize_question
+
+
+def test_normalize_question_ignores_case_spaces_and_edge_punctuation():
+    assert normalize_question("  Как  ОТКРЫТЬ вклад?! ") == "как открыть вклад"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = AnswerCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = AnswerCache(max_size=10, ttl=0.05)
+    cache.put("a", 1)
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1 and stats["misses"] == 1 and stats["size"] == 0
+
+
+def test_put_from_previous_generation_is_dropped():
+    cache = AnswerCache(max_size=10, ttl=60)
+    generation = cache.generation
+    cache.clear()
+    cache.put("a", 1, generation)
+    assert cache.get("a") is None
+
+    cache.put("a", 2, cache.generation)
+    assert cache.get("a") == 2
+
+
+def test_uncounted_lookup_keeps_hit_ratio():
+    cache = AnswerCache(max_size=10, ttl=60)
+    cache.get("a", count=False)
+    cache.put("a", 1)
+    cache.get("a", count=False)
+    stats = cache.get_stats()
+    assert stats["hits"] == 0 and stats["misses"] == 0
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = AnswerCache(max_size=0, ttl=60)
+    cache.put("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,78 @@
+# tests/test_batcher.py
+import asyncio
+
+import pytest
+
+from classification.batcher import MicroBatcher
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_items_share_one_batch():
+    calls = []
+
+    async def process(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(process, max_batch_size=10, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        return batcher, results
+
+    batcher, results = _run(scenario())
+    assert results == [0, 10, 20]
+    assert calls == [[0, 1, 2]]
+    assert batcher.get_stats()["batch_size_histogram"] == {3: 1}
+
+
+def test_full_batch_flushes_without_waiting():
+    calls = []
+
+    async def process(items):
+        calls.append(list(items))
+        return items
+
+    async def scenario():
+        # Таймер на минуту: результат может прийти только от сброса по размеру
+        batcher = MicroBatcher(process, max_batch_size=2, max_wait_ms=60000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1
+        )
+
+    assert _run(scenario()) == [0, 1, 2, 3]
+    assert calls == [[0, 1], [2, 3]]
+
+
+def test_batch_error_reaches_every_caller():
+    async def process(items):
+        raise RuntimeError("сбой")
+
+    async def scenario():
+        batcher = MicroBatcher(process, max_batch_size=10, max_wait_ms=1)
+        return await asyncio.gather(
+            *(batcher.submit(i) for i in range(2)), return_exceptions=True
+        )
+
+    errors = _run(scenario())
+    assert len(errors) == 2 and all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_cancelled_caller_does_not_break_the_batch():
+    async def process(items):
+        await asyncio.sleep(0.05)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(process, max_batch_size=10, max_wait_ms=1)
+        slow = asyncio.ensure_future(batcher.submit("a"))
+        other = asyncio.ensure_future(batcher.submit("b"))
+        await asyncio.sleep(0.01)
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        return await other
+
+    assert _run(scenario()) == "b"
@@ -0,0 +1,60 @@
+# tests/test_bm25_index.py
+import numpy as np
+import pytest
+
+from vector_db.bm25_index import BM25Index, reciprocal_rank_fusion
+
+CORPUS = [
+    "как открыть вклад в приложении",
+    "как закрыть кредитную карту",
+    "где ближайший банкомат",
+    "как оформить кредитную карту онлайн",
+    "курс валют на сегодня",
+]
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.build(CORPUS)
+    return index
+
+
+def test_search_ranks_matching_documents(index):
+    results = index.search("оформить кредитную карту", top_k=3)
+    docs = [doc for _, doc in results]
+    assert docs[:2] == [3, 1]
+    scores = [score for score, _ in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_matches_word_forms(index):
+    # "вклады" и "вклад" приводятся к одной основе
+    assert index.search("вклады", top_k=1)[0][1] == 0
+
+
+def test_search_skips_unmatched_documents(index):
+    assert [doc for _, doc in index.search("банкомат", top_k=5)] == [2]
+    assert index.search("ипотека", top_k=5) == []
+
+
+def test_search_mask(index):
+    mask = np.zeros(len(CORPUS), dtype=bool)
+    mask[1] = True
+    assert [doc for _, doc in index.search("кредитную карту", top_k=5, mask=mask)] == [1]
+
+
+def test_best_match_exact(index):
+    assert index.best_match("Где ближайший банкомат?") == (1.0, 2)
+    assert index.best_match("ипотека") is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [item for _, item in fused] == [1, 3, 2, 4]
+    assert fused[0][0] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[-1][0] == pytest.approx(1 / 63)
+
+
+def test_reciprocal_rank_fusion_ties_keep_first_list_order():
+    assert [item for _, item in reciprocal_rank_fusion([[7], [8]])] == [7, 8]
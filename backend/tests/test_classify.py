@@ -0,0 +1,87 @@
+# tests/test_classify.py
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def classify(knowledge_base):
+    from classification import classify
+
+    for cache in classify.answer_caches.values():
+        cache.clear()
+    return classify
+
+
+def test_classify_text_exact_question(classify):
+    main, sub, answer, score = classify.classify_text("как оформить кредитную карту")
+    assert (main, sub) == ("Продукты - Карты", "Кредитные")
+    assert score == pytest.approx(1.0)
+
+
+def test_microbatched_miss_counted_once(classify):
+    cache = classify.answer_cache
+    before = cache.get_stats()
+    answer = asyncio.run(classify.aclassify_text("хочу открыть вклад"))
+    after = cache.get_stats()
+    assert answer[0] == "Продукты - Вклады"
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] == before["hits"]
+
+    asyncio.run(classify.aclassify_text("хочу открыть вклад"))
+    assert cache.get_stats()["hits"] - after["hits"] == 1
+
+
+def test_category_vote_moves_close_group_first():
+    from classification.classify import CategoryVote
+
+    results = [
+        {"Основная категория": "A", "Подкатегория": "-", "Score": 0.90},
+        {"Основная категория": "B", "Подкатегория": "-", "Score": 0.89},
+        {"Основная категория": "B", "Подкатегория": "-", "Score": 0.89},
+    ]
+    vote = CategoryVote(temperature=0.05)
+    ordered, share = vote.vote(results)
+    assert [r["Основная категория"] for r in ordered] == ["B", "B", "A"]
+    assert share > 0.5
+    assert vote.get_stats()["overrides"] == 1
+    # Статистика уходит в JSON /stats: счетчики — обычные int
+    assert type(vote.get_stats()["overrides"]) is int
+
+
+def test_category_vote_disabled_keeps_order():
+    from classification.classify import CategoryVote
+
+    results = [{"Основная категория": "A", "Подкатегория": "-", "Score": 0.9}] * 2
+    assert CategoryVote(temperature=0).vote(results) == (results, None)
+
+
+def test_hybrid_score_is_cosine_with_separate_fused_and_lexical(classify, tmp_path):
+    from conftest import FAQ_ROWS, build_knowledge_base
+    from data.knowledge_base import KnowledgeBase
+
+    faq_path, db_path = str(tmp_path / "faq.faq.json"), str(tmp_path / "kb")
+    # Вопрос о банкомате (строка 4) не векторизован
+    build_knowledge_base(faq_path, db_path, embed_rows=[0, 1, 2, 3, 5])
+    snapshot = KnowledgeBase(faq_path, db_path).load()
+    question = "банкомат карту заблокировать"
+    vector = classify.embedder.encode(question)
+
+    results = classify._hybrid_patterns(snapshot, question, vector, top_k=6)
+    rows = [r["Пример вопроса"] for r in results]
+    assert FAQ_ROWS[4][2] not in rows
+    row_numbers = [[row[2] for row in FAQ_ROWS].index(q) for q in rows]
+    cosines = snapshot.vector_db.similarities(vector, snapshot.row_vectors[row_numbers])
+    assert [r["Score"] for r in results] == pytest.approx(cosines.tolist(), abs=1e-6)
+    assert all(r["Fused"] > 0 for r in results)
+    card = results[rows.index(FAQ_ROWS[3][2])]
+    assert card["Lexical"] is not None and card["Lexical"] > 0
+
+
+def test_unknown_category_is_rejected(classify):
+    from data.knowledge_base import UnknownCategoryError
+
+    with pytest.raises(UnknownCategoryError):
+        classify.classify_text("вопрос", main_category="Нет такой категории")
+    with pytest.raises(UnknownCategoryError):
+        classify.find_solve_pattern("вопрос", main_category="Нет такой категории")
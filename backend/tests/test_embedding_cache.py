@@ -0,0 +1,68 @@
+# tests/test_embedding_cache.py
+import time
+
+import numpy as np
+import pytest
+
+from vectorization import embedding_cache
+from vectorization.backends import HashedNgramBackend
+from vectorization.embedding_cache import EmbeddingCache
+from vectorization.vectorizer import Embedder
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite")
+
+
+def test_round_trip_by_model_and_normalized_text(cache_path):
+    cache = EmbeddingCache(cache_path)
+    cache.put("m1", "как  открыть вклад ", [0.5, -1.0])
+
+    assert cache.get("m1", "как открыть вклад") == [0.5, -1.0]
+    assert cache.get("m2", "как открыть вклад") is None
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_entries_survive_reopening(cache_path):
+    EmbeddingCache(cache_path).put_many("m", ["а", "б"], [[1.0], [2.0]])
+    assert EmbeddingCache(cache_path).get_many("m", ["б", "в", "а"]) == [[2.0], None, [1.0]]
+
+
+def test_eviction_keeps_recently_read_entries(cache_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "EVICT_CHECK_EVERY", 1)
+    cache = EmbeddingCache(cache_path, max_entries=2)
+    cache.put("m", "а", [1.0])
+    time.sleep(0.01)
+    cache.put("m", "б", [2.0])
+    time.sleep(0.01)
+    # Попадание пока только отложено в памяти; вытеснение учитывает и его
+    assert cache.get("m", "а") == [1.0]
+    time.sleep(0.01)
+    cache.put("m", "в", [3.0])
+
+    assert cache.get_many("m", ["а", "б", "в"]) == [[1.0], None, [3.0]]
+    assert cache.get_stats()["evictions"] == 1
+
+
+class _CountingBackend(HashedNgramBackend):
+    def __init__(self):
+        super().__init__(dimension=16)
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return super().embed(texts)
+
+
+def test_embedder_reads_cached_vectors_instead_of_calling_backend(cache_path):
+    backend = _CountingBackend()
+    embedder = Embedder(backend=backend)
+    embedder.cache = EmbeddingCache(cache_path)
+    texts = ["как открыть вклад", "где банкомат"]
+
+    first = embedder.encode_batch(texts)
+    np.testing.assert_allclose(embedder.encode_batch(texts), first, atol=1e-6)
+    np.testing.assert_allclose(embedder.encode(texts[0]), first[0], atol=1e-6)
+    assert backend.calls == 1
@@ -0,0 +1,48 @@
+# tests/test_faq_store.py
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import FAQ_ROWS
+from data.faq_store import FaqStore, load_faq, store_path_for
+
+COLUMNS = ["Основная категория", "Подкатегория", "Пример вопроса", "Шаблонный ответ"]
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame(FAQ_ROWS, columns=COLUMNS)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(tmp_path, mmap):
+    store_path = str(tmp_path / "faq.faq")
+    FaqStore.from_frame(_frame()).save(store_path)
+
+    store = FaqStore.load(store_path, mmap=mmap)
+    assert len(store) == len(FAQ_ROWS)
+    assert store.record(2) == dict(zip(COLUMNS, FAQ_ROWS[2]))
+    assert store.column("Пример вопроса") == [row[2] for row in FAQ_ROWS]
+    categories = store.categories("Основная категория")
+    assert [categories[code] for code in store.codes("Основная категория")] == [
+        row[0] for row in FAQ_ROWS
+    ]
+
+
+def test_store_path_for():
+    assert store_path_for("data/faq.xlsx") == "data/faq.faq"
+    assert store_path_for("data/faq.faq.json") == "data/faq.faq"
+
+
+def test_load_faq_compiles_excel_once_and_recompiles_when_it_changes(tmp_path):
+    faq_path = str(tmp_path / "faq.xlsx")
+    _frame().to_excel(faq_path, index=False)
+
+    assert load_faq(faq_path).column("Пример вопроса") == [row[2] for row in FAQ_ROWS]
+    manifest_path = store_path_for(faq_path) + ".json"
+    compiled_at = os.path.getmtime(manifest_path)
+    load_faq(faq_path)
+    assert os.path.getmtime(manifest_path) == compiled_at
+
+    _frame().iloc[:2].to_excel(faq_path, index=False)
+    assert len(load_faq(faq_path)) == 2
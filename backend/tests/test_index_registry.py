@@ -0,0 +1,91 @@
+# tests/test_index_registry.py
+import os
+import threading
+
+from conftest import build_knowledge_base
+from data.index_registry import IndexRegistry
+from data.knowledge_base import KnowledgeBase
+
+
+class _GateLock:
+    """Блокировка, которая один раз выполняет before() перед захватом — имитирует поток-соперник."""
+
+    def __init__(self, before):
+        self._lock = threading.Lock()
+        self.before = before
+
+    def __enter__(self):
+        before, self.before = self.before, None
+        if before is not None:
+            before()
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def _registry(tmp_path, budget_mb: float, names=("a", "b")) -> IndexRegistry:
+    registry = IndexRegistry(default=names[0], memory_budget_mb=budget_mb)
+    for name in names:
+        faq_path = os.path.join(tmp_path, f"{name}.faq.json")
+        db_path = os.path.join(tmp_path, name)
+        build_knowledge_base(faq_path, db_path)
+        registry.register(name, KnowledgeBase(faq_path, db_path, reload_interval=0))
+    return registry
+
+
+def test_lru_base_evicted_over_budget(tmp_path):
+    registry = _registry(tmp_path, budget_mb=1e-6)
+    registry.snapshot("a")
+    registry.snapshot("b")
+
+    stats = registry.get_stats()["indexes"]
+    assert stats["a"]["loaded"] is False and stats["a"]["evictions"] == 1
+    assert stats["b"]["loaded"] is True and stats["b"]["evictions"] == 0
+
+
+def test_unlimited_budget_keeps_all_bases(tmp_path):
+    registry = _registry(tmp_path, budget_mb=0)
+    registry.snapshot("a")
+    registry.snapshot("b")
+
+    stats = registry.get_stats()["indexes"]
+    assert stats["a"]["loaded"] and stats["b"]["loaded"]
+
+
+def test_get_reloads_base_evicted_while_waiting_for_lock(tmp_path):
+    registry = _registry(tmp_path, budget_mb=1e-6)
+    base = registry.get("a")
+    first = registry.snapshot("a")
+    # Пока get() базы "a" ждет блокировку, запрос к "b" выгружает "a"
+    base._lock = _GateLock(before=lambda: registry.snapshot("b"))
+
+    snapshot = registry.snapshot("a")
+
+    assert snapshot is not None
+    assert snapshot is base.loaded
+    assert snapshot.version > first.version
+    assert registry.get_stats()["indexes"]["a"]["evictions"] == 1
+
+
+def test_concurrent_eviction_never_returns_none(tmp_path):
+    registry = _registry(tmp_path, budget_mb=1e-6)
+    results, errors = [], []
+
+    def worker(name):
+        try:
+            for _ in range(10):
+                results.append(registry.snapshot(name))
+        except Exception as e:  # pragma: no cover - сообщение в assert ниже
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("a", "b") * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(results) == 40
+    assert all(snapshot is not None for snapshot in results)
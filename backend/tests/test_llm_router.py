@@ -0,0 +1,91 @@
+# tests/test_llm_router.py
+import pytest
+
+from classification.llm_router import LLMRouter
+
+
+def _result(category: str, score: float) -> dict:
+    return {
+        "Основная категория": category,
+        "Подкатегория": "-",
+        "Шаблонный ответ": f"Ответ {category}",
+        "Score": score,
+    }
+
+
+@pytest.fixture
+def router():
+    return LLMRouter(enabled=True, score_threshold=0.75, margin_threshold=0.02, vote_share=0.6)
+
+
+def test_low_score_needs_llm(router):
+    assert router.needs_llm([_result("A", 0.5), _result("B", 0.1)], share=1.0)
+
+
+def test_wide_margin_skips_llm_even_with_low_share(router):
+    assert not router.needs_llm([_result("A", 0.9), _result("B", 0.8)], share=0.3)
+
+
+def test_narrow_margin_needs_llm_only_with_low_share(router):
+    results = [_result("A", 0.9), _result("B", 0.89)]
+    assert router.needs_llm(results, share=0.5)
+    assert not router.needs_llm(results, share=0.8)
+
+
+def test_narrow_margin_without_vote_needs_llm(router):
+    assert router.needs_llm([_result("A", 0.9), _result("B", 0.89)], share=None)
+
+
+def test_same_category_candidates_skip_llm(router):
+    assert not router.needs_llm([_result("A", 0.9), _result("A", 0.9)], share=None)
+
+
+def test_disabled_router_never_needs_llm():
+    router = LLMRouter(enabled=False)
+    assert not router.needs_llm([_result("A", 0.1), _result("B", 0.1)])
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    from classification import llm_router
+
+    calls = []
+
+    def fake_llm(question, results, timeout):
+        calls.append(question)
+        return llm_router.fallback_answer(results[1:]), True
+
+    monkeypatch.setattr(llm_router, "figuare_diffficults", fake_llm)
+    return calls
+
+
+def test_uncertain_answer_is_decided_once_per_scope(router, llm_calls):
+    results = [_result("A", 0.5), _result("B", 0.4)]
+    answer, final = router.decide("вопрос", results, scope=("kb", 1))
+    assert final and answer[0] == "B"
+    assert router.decide("Вопрос?", results, scope=("kb", 1)) == (answer, True)
+    assert len(llm_calls) == 1
+
+    router.decide("вопрос", results, scope=("kb", 2))
+    assert len(llm_calls) == 2
+
+
+def test_confident_answer_skips_llm(router, llm_calls):
+    answer, final = router.decide("вопрос", [_result("A", 0.9), _result("B", 0.5)])
+    assert final and answer[0] == "A"
+    assert llm_calls == []
+
+
+def test_exhausted_budget_falls_back_without_caching(llm_calls):
+    router = LLMRouter(enabled=True, concurrency=1)
+    results = [_result("A", 0.5), _result("B", 0.4)]
+    router._slots.acquire()
+    try:
+        answer, final = router.decide("вопрос", results)
+    finally:
+        router._slots.release()
+    assert not final and answer[0] == "A"
+    assert llm_calls == []
+    assert router.get_stats()["skipped_budget"] == 1
+
+    assert router.decide("вопрос", results) == (("B", "-", "Ответ B", 0.4), True)
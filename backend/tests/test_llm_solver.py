@@ -0,0 +1,90 @@
+# tests/test_llm_solver.py
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from classification import llm_solver
+
+DATA = [
+    {"Основная категория": "A", "Подкатегория": "1", "Пример вопроса": "Вопрос A",
+     "Шаблонный ответ": "Ответ A", "Score": 0.8},
+    {"Основная категория": "B", "Подкатегория": "2", "Пример вопроса": "Вопрос B",
+     "Шаблонный ответ": "Ответ B", "Score": 0.7},
+]
+
+
+class _SlowStream:
+    """Поток LLM, который отдает чанки text с паузой delay перед каждым."""
+
+    def __init__(self, parts, delay):
+        self.parts = parts
+        self.delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        for part in self.parts:
+            time.sleep(self.delay)
+            if self.closed:
+                return
+            delta = SimpleNamespace(content=part)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def stream_client(monkeypatch):
+    def install(stream):
+        create = lambda **kwargs: stream  # noqa: E731
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(llm_solver, "_llm_client", client)
+        monkeypatch.setattr(llm_solver, "LLM_STREAM", True)
+        return stream
+
+    return install
+
+
+def test_stream_stops_at_parsed_index(stream_client):
+    stream = stream_client(_SlowStream(['{"ind', 'ex": 2', "}", " лишнее"], delay=0))
+    answer, answered = llm_solver.figuare_diffficults("вопрос", DATA, timeout=1)
+    assert answered and answer[0] == "B"
+    assert stream.closed
+
+
+def test_slow_chunk_does_not_outlive_deadline(stream_client):
+    # Первый чанк приходит позже всего срока вызова
+    stream = stream_client(_SlowStream(['{"index": 2}'], delay=1.0))
+    timeouts = llm_solver.llm_metrics.get_stats()["outcomes"].get("timeout", 0)
+    started = time.monotonic()
+    answer, answered = llm_solver.figuare_diffficults("вопрос", DATA, timeout=0.1)
+    assert time.monotonic() - started < 0.5
+    assert not answered and answer[0] == "A"
+    assert stream.closed
+    assert llm_solver.llm_metrics.get_stats()["outcomes"]["timeout"] == timeouts + 1
+
+
+def test_trickling_stream_does_not_outlive_deadline(stream_client):
+    stream_client(_SlowStream([" "] * 100, delay=0.02))
+    started = time.monotonic()
+    answer, answered = llm_solver.figuare_diffficults("вопрос", DATA, timeout=0.2)
+    assert time.monotonic() - started < 0.6
+    assert not answered
+
+
+@pytest.mark.parametrize(
+    "content, expected, answered",
+    [
+        ('{"index": 2}', "B", True),
+        ('{"index": "1"}', "A", True),
+        ('Ответ: {"index": 2}.', "B", True),
+        ("Кандидат 2", "B", True),
+        ('{"index": 5}', "A", False),
+        ("не знаю", "A", False),
+        ("", "A", False),
+    ],
+)
+def test_parse_response(content, expected, answered):
+    answer, ok = llm_solver._parse_response(content, DATA)
+    assert (answer[0], ok) == (expected, answered)
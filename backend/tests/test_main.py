@@ -0,0 +1,96 @@
+# tests/test_main.py
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def main(knowledge_base):
+    import main
+    from classification.classify import answer_caches
+
+    for cache in answer_caches.values():
+        cache.clear()
+    return main
+
+
+@pytest.fixture
+def client(main):
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_process_batch_keeps_question_order(client):
+    questions = ["Где ближайший банкомат?", "Как заблокировать карту?"]
+    response = client.post("/process_batch", json={"questions": questions})
+    assert response.status_code == 200
+    assert [r["sub_category"] for r in response.json()] == ["Банкоматы", "Дебетовые"]
+
+
+def test_process_batch_stream_returns_every_index(client, main):
+    free = main.request_semaphore._value
+    questions = ["Где ближайший банкомат?", "Как заблокировать карту?", "Какой курс валют?"]
+    response = client.post("/process_batch", json={"questions": questions, "stream": True})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert main.request_semaphore._value == free
+
+
+def test_process_batch_stream_stops_at_deadline(client, main, monkeypatch):
+    async def slow_chunks(questions, **kwargs):
+        yield [(0, None)]
+        await asyncio.sleep(10)
+        yield [(1, None)]
+
+    monkeypatch.setattr(main, "BATCH_REQUEST_TIMEOUT", 0.2)
+    monkeypatch.setattr(main, "aclassify_batch_iter", slow_chunks)
+    free = main.request_semaphore._value
+    response = client.post("/process_batch", json={"questions": ["а", "б"], "stream": True})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"index": 0, "result": None}
+    assert "error" in lines[-1] and len(lines) == 2
+    assert main.request_semaphore._value == free
+
+
+def test_process_batch_rejects_too_many_questions(client, main, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_QUESTIONS", 1)
+    response = client.post("/process_batch", json={"questions": ["а", "б"]})
+    assert response.status_code == 413
+
+
+def test_process_answers_known_question(client):
+    response = client.post("/process", json={"question": "Как оформить кредитную карту?"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["main_category"], body["sub_category"]) == ("Продукты - Карты", "Кредитные")
+    assert body["score"] == pytest.approx(1.0)
+
+
+def test_process_filters_by_main_category(client):
+    response = client.post(
+        "/process", json={"question": "Как открыть карту?", "main_category": "Сервис"}
+    )
+    assert response.status_code == 200
+    assert response.json()["main_category"] == "Сервис"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"question": "вопрос", "index": "нет такой базы"},
+        {"question": "вопрос", "main_category": "Нет такой категории"},
+    ],
+)
+def test_process_unknown_index_or_category_is_404(client, payload):
+    assert client.post("/process", json=payload).status_code == 404
+
+
+def test_stats_reports_every_section(client):
+    client.post("/process", json={"question": "Где ближайший банкомат?"})
+    stats = client.get("/stats").json()
+    assert stats["knowledge_base"]["version"] >= 1
+    assert stats["answer_cache"]["misses"] >= 1
+    for section in ("embedder", "micro_batcher", "category_vote", "llm_router", "indexes"):
+        assert section in stats
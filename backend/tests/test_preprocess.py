@@ -0,0 +1,33 @@
+# tests/test_preprocess.py
+import pytest
+
+from data.preprocess_data import preprocess_text, stem_russian
+
+
+@pytest.mark.parametrize(
+    "word, stem",
+    [
+        ("кредитная", "кредитн"),
+        ("кредитной", "кредитн"),
+        ("кредиты", "кредит"),
+        ("вкладов", "вклад"),
+        ("платежи", "платеж"),
+        ("карточками", "карточк"),
+        ("банковский", "банковск"),
+        ("оформить", "оформ"),
+        ("оформление", "оформлен"),
+        ("открыла", "откр"),
+    ],
+)
+def test_stem_russian(word, stem):
+    assert stem_russian(word) == stem
+
+
+def test_word_forms_share_stem():
+    assert preprocess_text("Кредитную карту", stem=True) == preprocess_text(
+        "кредитной карты", stem=True
+    )
+
+
+def test_preprocess_without_stem():
+    assert preprocess_text("Как оформить кредитную карту?") == "как оформить кредитную карту"
@@ -0,0 +1,68 @@
+# tests/test_vector_builder.py
+import os
+
+import numpy as np
+
+from vector_db.vector_builder import VectorDatabaseBuilder, row_fingerprint
+from vector_db.vector_db import VectorDB
+
+QUESTIONS = ["как открыть вклад", "как закрыть карту", "где банкомат", "курс валют"]
+
+
+def _sync(texts, base_path, **kwargs):
+    return VectorDatabaseBuilder().sync_from_texts(texts, base_path, **kwargs)
+
+
+def _rows(base_path):
+    """Живые векторы базы: вопрос -> metadata["row"]."""
+    db = VectorDB.load(base_path)
+    return {
+        text: metadata["row"]
+        for i, (text, metadata) in enumerate(zip(db.texts, db.metadata))
+        if i not in db.tombstones
+    }
+
+
+def test_row_fingerprint_depends_on_text_only():
+    assert row_fingerprint("курс валют") == row_fingerprint("курс валют")
+    assert row_fingerprint("курс валют") != row_fingerprint("курс валют ")
+
+
+def test_sync_add_update_delete(tmp_path):
+    base_path = os.path.join(tmp_path, "db")
+    stats = _sync(QUESTIONS, base_path)
+    assert stats == {"added": 4, "reused": 0, "deleted": 0, "compacted": 0, "total": 4}
+    db = VectorDB.load(base_path)
+    vectors = {text: np.array(vector) for text, vector in zip(db.texts, db.vectors)}
+
+    # Строка 1 удалена, строка 0 изменена, добавлен новый вопрос, порядок строк другой
+    texts = ["курс валют", "как открыть вклад онлайн", "где банкомат", "новый вопрос"]
+    stats = _sync(texts, base_path, compact_ratio=1.0)
+    assert stats == {"added": 2, "reused": 2, "deleted": 2, "compacted": 0, "total": 4}
+    assert _rows(base_path) == {text: row for row, text in enumerate(texts)}
+
+    # Векторы неизмененных вопросов переиспользуются без повторной векторизации
+    db = VectorDB.load(base_path)
+    for text in ("курс валют", "где банкомат"):
+        assert (db.vectors[db.texts.index(text)] == vectors[text]).all()
+    assert len(db.tombstones) == 2
+
+    assert _sync(texts, base_path)["added"] == 0
+
+
+def test_sync_restores_deleted_question(tmp_path):
+    base_path = os.path.join(tmp_path, "db")
+    _sync(QUESTIONS, base_path)
+    _sync(QUESTIONS[:3], base_path, compact_ratio=1.0)
+    stats = _sync(QUESTIONS, base_path, compact_ratio=1.0)
+    assert stats["added"] == 0
+    assert _rows(base_path) == {text: row for row, text in enumerate(QUESTIONS)}
+
+
+def test_sync_compacts_tombstones(tmp_path):
+    base_path = os.path.join(tmp_path, "db")
+    _sync(QUESTIONS, base_path)
+    stats = _sync(QUESTIONS[:2], base_path, compact_ratio=0.5)
+    assert stats["compacted"] == 2
+    db = VectorDB.load(base_path)
+    assert not db.tombstones and db.texts == QUESTIONS[:2]
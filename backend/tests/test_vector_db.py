@@ -0,0 +1,181 @@
+# tests/test_vector_db.py
+import numpy as np
+import pytest
+
+from vector_db.quantization import ProductQuantizer, ScalarQuantizer
+from vector_db.vector_db import VectorDB
+from vectorization.backends import HashedNgramBackend
+from vectorization.vectorizer import Embedder
+
+DIMENSION = 32
+
+
+def _clustered(rng, count, clusters=20):
+    """Векторы вокруг clusters центров, как у вопросов близких тем."""
+    centers = rng.standard_normal((clusters, DIMENSION)).astype("float32")
+    noise = 0.3 * rng.standard_normal((count, DIMENSION)).astype("float32")
+    return centers[rng.integers(0, clusters, count)] + noise
+
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _db(vectors):
+    db = VectorDB(DIMENSION, Embedder(backend=HashedNgramBackend(dimension=DIMENSION)))
+    db.add_batch(vectors, [f"вопрос {i}" for i in range(len(vectors))])
+    return db
+
+
+def _ids(db, results):
+    return [db.texts.index(text) for _, text, _ in results]
+
+
+def test_search_is_cosine_top_k():
+    rng = np.random.default_rng(0)
+    vectors = _clustered(rng, 200)
+    db = _db(vectors)
+    query = rng.standard_normal(DIMENSION).astype("float32")
+    cosines = _unit(vectors) @ (query / np.linalg.norm(query))
+    expected = np.argsort(-cosines)[:5]
+    results = db.search(query, top_k=5)
+    assert _ids(db, results) == list(expected)
+    assert [score for score, _, _ in results] == pytest.approx(cosines[expected], abs=1e-5)
+
+
+def test_ivf_recall_against_brute_force():
+    rng = np.random.default_rng(1)
+    vectors = _clustered(rng, 2000)
+    queries = _clustered(np.random.default_rng(2), 50)
+    db = _db(vectors)
+    exact = [set(_ids(db, db.search(q, top_k=10))) for q in queries]
+
+    db.build_index("ivf", n_lists=32, nprobe=8)
+    approximate = [set(_ids(db, db.search(q, top_k=10))) for q in queries]
+    recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+    assert recall >= 0.9
+
+    # Все списки — точный перебор
+    full = [set(_ids(db, db.search(q, top_k=10, nprobe=32))) for q in queries]
+    assert full == exact
+
+
+def test_int8_round_trip_error():
+    vectors = _unit(_clustered(np.random.default_rng(3), 500))
+    quantizer = ScalarQuantizer()
+    quantizer.fit(vectors)
+    decoded = quantizer.lo + quantizer.codes.astype("float32") * quantizer.scale
+    # Ошибка округления — не больше половины шага шкалы по каждой координате
+    assert np.all(np.abs(decoded - vectors) <= quantizer.scale / 2 + 1e-6)
+    query = vectors[0]
+    assert np.max(np.abs(quantizer.scores(query) - vectors @ query)) < 0.05
+
+
+def test_pq_round_trip_error():
+    vectors = _unit(_clustered(np.random.default_rng(4), 1000))
+    quantizer = ProductQuantizer(m=8)
+    quantizer.fit(vectors)
+    decoded = np.concatenate(
+        [quantizer.codebooks[j, quantizer.codes[:, j]] for j in range(8)], axis=1
+    )
+    assert decoded.shape == vectors.shape
+    relative = np.linalg.norm(decoded - vectors, axis=1) / np.linalg.norm(vectors, axis=1)
+    assert np.mean(relative) < 0.25
+    # ADC-оценка — скалярное произведение с восстановленным вектором
+    query = vectors[0]
+    np.testing.assert_allclose(quantizer.scores(query), decoded @ query, atol=1e-4)
+
+
+@pytest.mark.parametrize("mode, params", [("int8", {}), ("pq", {"m": 8})])
+def test_quantized_search_keeps_top_hit(mode, params):
+    rng = np.random.default_rng(5)
+    vectors = _clustered(rng, 1000)
+    db = _db(vectors)
+    queries = vectors[:20] + 0.01 * rng.standard_normal((20, DIMENSION)).astype("float32")
+    db.quantize(mode, **params)
+    # Шорт-лист квантованного поиска пересчитывается по float32
+    assert [_ids(db, db.search(q, top_k=10))[0] for q in queries] == list(range(20))
+
+
+def test_quantizer_requires_all_abstract_methods():
+    from vector_db.quantization import _Quantizer
+
+    with pytest.raises(TypeError):
+        _Quantizer()
+
+
+def test_prepared_quantization_is_saved_and_not_retrained(tmp_path):
+    rng = np.random.default_rng(6)
+    db = _db(_clustered(rng, 200))
+    assert db.prepare_search(index="", quantization="int8")
+    assert not db.prepare_search(index="", quantization="int8")
+    base_path = str(tmp_path / "db")
+    db.save(base_path)
+
+    loaded = VectorDB.load(base_path)
+    assert loaded.quantizer is not None and loaded.quantizer.kind == "int8"
+    np.testing.assert_array_equal(loaded.quantizer.scale, db.quantizer.scale)
+    np.testing.assert_array_equal(loaded.quantizer.codes, db.quantizer.codes)
+    assert not loaded.prepare_search(index="", quantization="int8")
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(tmp_path, mmap):
+    rng = np.random.default_rng(7)
+    vectors = _clustered(rng, 300)
+    db = _db(vectors)
+    db.delete([3, 5])
+    db.build_index("ivf", n_lists=8, nprobe=8)
+    base_path = str(tmp_path / "db")
+    db.save(base_path)
+
+    loaded = VectorDB.load(base_path, mmap=mmap, embedder=db.embedder)
+    np.testing.assert_array_equal(np.asarray(loaded.vectors), vectors)
+    assert loaded.texts == db.texts and loaded.metadata == db.metadata
+    assert loaded.tombstones == {3, 5}
+    assert loaded.index is not None and loaded.index.kind == "ivf"
+    query = vectors[10]
+    assert _ids(loaded, loaded.search(query, top_k=5)) == _ids(db, db.search(query, top_k=5))
+
+
+def test_migrate_legacy_pickle(tmp_path):
+    import pickle
+
+    from vector_db.vector_db import migrate_legacy
+
+    rng = np.random.default_rng(8)
+    vectors = _clustered(rng, 50)
+    base_path = str(tmp_path / "legacy")
+    with open(f"{base_path}.pkl", "wb") as f:
+        pickle.dump(
+            {
+                "dimension": DIMENSION,
+                "vectors": vectors.tolist(),
+                "texts": [f"вопрос {i}" for i in range(50)],
+                "metadata": [{"row": i} for i in range(50)],
+            },
+            f,
+        )
+    assert VectorDB.source_path(base_path) == f"{base_path}.pkl"
+
+    migrate_legacy(base_path)
+    assert VectorDB.source_path(base_path) == f"{base_path}.json"
+    loaded = VectorDB.load(base_path)
+    np.testing.assert_allclose(np.asarray(loaded.vectors), vectors)
+    assert loaded.metadata[49] == {"row": 49}
+
+
+@pytest.mark.parametrize("top_k", [0, -1])
+def test_non_positive_top_k_returns_nothing(top_k):
+    rng = np.random.default_rng(9)
+    vectors = _clustered(rng, 200)
+    db = _db(vectors)
+    db.build_index("ivf", n_lists=8, nprobe=2)
+    db.quantize("int8")
+
+    def scan(*args, **kwargs):
+        raise AssertionError("пустой запрос не должен считать оценки")
+
+    db.index.candidates = db.quantizer.scores = scan
+    assert db.search(vectors[0], top_k=top_k) == []
+    assert db.search_many(vectors[:2], top_k=top_k) == [[], []]
@@ -0,0 +1,52 @@
+# tests/test_vectorizer.py
+import asyncio
+
+from vectorization.backends import EmbeddingBackend, OpenAIBackend
+from vectorization.vectorizer import Embedder
+
+
+class _FailingBackend(EmbeddingBackend):
+    name = "failing"
+    remote = False
+
+    @property
+    def model_id(self) -> str:
+        return "failing"
+
+    @property
+    def dimension(self):
+        return 4
+
+    def embed(self, texts):
+        raise RuntimeError("сбой")
+
+    async def aembed(self, texts):
+        raise RuntimeError("сбой")
+
+
+def test_failed_texts_counted_in_stats():
+    embedder = Embedder(backend=_FailingBackend())
+    vectors = embedder.encode_batch(["а", "б"])
+    assert vectors == [[0.0] * 4, [0.0] * 4]
+    assert asyncio.run(embedder.aencode_batch(["в"])) == [None]
+
+    stats = embedder.get_stats()
+    assert stats["failed_batches"] == 2
+    assert stats["failed_texts"] == 3
+
+
+def test_openai_async_client_has_no_sdk_retries():
+    assert OpenAIBackend().async_client.max_retries == 0
+
+
+def test_progress_output_is_opt_in(capsys):
+    from vectorization.backends import HashedNgramBackend
+
+    embedder = Embedder(backend=HashedNgramBackend(dimension=8))
+    embedder.encode_batch(["а", "б", "в"], batch_size=2)
+    asyncio.run(embedder.aencode_batch(["а", "б", "в"], batch_size=2))
+    assert capsys.readouterr().out == ""
+
+    calls = []
+    embedder.encode_batch(["а", "б", "в"], batch_size=2, progress=lambda *p: calls.append(p))
+    assert calls == [(2, 3), (3, 3)]
@@ -1,6 +1,131 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+import httpx
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("API_KEY"), base_url=os.getenv("BASE_URL"))
+
+# Пул HTTP-соединений к API: максимум соединений, сколько держать открытыми и сколько (с)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Таймауты запросов к API (с): установка соединения, ожидание свободного соединения из пула, чтение
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+
+http_limits = httpx.Limits(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+)
+http_timeout = httpx.Timeout(
+    HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT
+)
+
+# Единственные на процесс клиенты API: все эмбеддинги и вызовы LLM идут через их пулы
+client = OpenAI(
+    api_key=os.getenv("API_KEY"),
+    base_url=os.getenv("BASE_URL"),
+    timeout=http_timeout,
+    http_client=DefaultHttpxClient(limits=http_limits, timeout=http_timeout),
+)
+async_client = AsyncOpenAI(
+    api_key=os.getenv("API_KEY"),
+    base_url=os.getenv("BASE_URL"),
+    timeout=http_timeout,
+    http_client=DefaultAsyncHttpxClient(limits=http_limits, timeout=http_timeout),
+)
+
+# Источники базы знаний; FAQ_PATH — Excel-файл или манифест скомпилированного FAQ (.json)
+FAQ_PATH = os.getenv("FAQ_PATH", "smart_support_vtb_belarus_faq_final.xlsx")
+# Открывать колонки скомпилированного FAQ через np.memmap
+FAQ_STORE_MMAP = os.getenv("FAQ_STORE_MMAP", "1") == "1"
+VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "my_vector_db")
+# Открывать матрицу векторов через np.memmap (общая копия в page cache для всех воркеров)
+VECTOR_DB_MMAP = os.getenv("VECTOR_DB_MMAP", "1") == "1"
+# ANN-индекс ("ivf" или пусто — точный перебор); строится, если векторов не меньше ANN_MIN_VECTORS
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "")
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "10000"))
+IVF_NLISTS = int(os.getenv("IVF_NLISTS", "0"))  # 0 — около sqrt(N)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+# Квантование векторов ("int8", "pq" или пусто); PQ_SUBSPACES — число подпространств PQ
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "")
+PQ_SUBSPACES = int(os.getenv("PQ_SUBSPACES", "64"))
+QUANT_RESCORE = os.getenv("QUANT_RESCORE", "1") == "1"
+# Во сколько раз шорт-лист для пересчета по float32 больше top_k
+QUANT_RESCORE_FACTOR = int(os.getenv("QUANT_RESCORE_FACTOR", "4"))
+# Как часто (в секундах) проверять mtime файлов базы знаний
+KB_RELOAD_INTERVAL = float(os.getenv("KB_RELOAD_INTERVAL", "5"))
+# Дополнительные именованные базы знаний (JSON):
+# {"retail": {"faq_path": "faq_retail.xlsx", "db_path": "db_retail"}, ...}.
+# База DEFAULT_INDEX всегда собирается из FAQ_PATH и VECTOR_DB_PATH
+KB_INDEXES = os.getenv("KB_INDEXES", "")
+DEFAULT_INDEX = os.getenv("DEFAULT_INDEX", "default")
+# Бюджет памяти загруженных баз (МБ, 0 — без ограничения): сверх него выгружаются давно не используемые
+KB_MEMORY_BUDGET_MB = float(os.getenv("KB_MEMORY_BUDGET_MB", "0"))
+
+# Батчинг эмбеддингов: максимум текстов и суммарный объем символов в одном запросе
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_BATCH_CHARS = int(os.getenv("EMBED_MAX_BATCH_CHARS", "32000"))
+# Асинхронное построение базы: батчей в полете одновременно и повторы при rate limit
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+
+# Постоянный кэш эмбеддингов (SQLite); пустой путь отключает кэш
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Кэш ответов classify_text: максимум записей и время жизни в секундах
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "10000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+# Обработка запросов /process: одновременных классификаций, таймаут (с), потоков для поиска
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", "4"))
+# /process_batch: максимум вопросов, размер блока (эмбеддинг + поиск) и таймаут без стриминга
+MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "10000"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+BATCH_REQUEST_TIMEOUT = float(os.getenv("BATCH_REQUEST_TIMEOUT", "600"))
+# Микробатчинг /process: окно ожидания попутчиков (мс, 0 — выключено) и максимум пакета
+MICROBATCH_WAIT_MS = float(os.getenv("MICROBATCH_WAIT_MS", "5"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+
+# LLM-фолбэк для неуверенных ответов: включение, пороги косинуса и отрыва от другой категории
+LLM_ROUTING = os.getenv("LLM_ROUTING", "1") == "1"
+LLM_SCORE_THRESHOLD = float(os.getenv("LLM_SCORE_THRESHOLD", "0.75"))
+LLM_MARGIN_THRESHOLD = float(os.getenv("LLM_MARGIN_THRESHOLD", "0.02"))
+# Бюджет LLM: одновременных вызовов, таймаут вызова (с) и размер кэша решений
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "8"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+# Голосование категорий среди кандидатов: вес кандидата exp((Score - лучший Score) / T),
+# T = CATEGORY_VOTE_TEMPERATURE (0 — выключено). При отрыве меньше LLM_MARGIN_THRESHOLD
+# категория с долей веса не ниже CATEGORY_VOTE_SHARE все равно выбирается без LLM
+CATEGORY_VOTE_TEMPERATURE = float(os.getenv("CATEGORY_VOTE_TEMPERATURE", "0.05"))
+CATEGORY_VOTE_SHARE = float(os.getenv("CATEGORY_VOTE_SHARE", "0.6"))
+# Декодирование LLM: предел токенов ответа ({"index": N}) и JSON-схема через response_format
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "16"))
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") == "1"
+# Стриминг ответа LLM с ранним разбором JSON (срок вызова — LLM_TIMEOUT)
+LLM_STREAM = os.getenv("LLM_STREAM", "1") == "1"
+
+# Гибридный поиск: BM25 по "Пример вопроса" + векторы, объединение через RRF
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+# Уверенность лексического совпадения (0..1), при которой эмбеддинг не запрашивается
+LEXICAL_SKIP_THRESHOLD = float(os.getenv("LEXICAL_SKIP_THRESHOLD", "0.9"))
+RRF_K = float(os.getenv("RRF_K", "60"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+LEXICAL_STEMMING = os.getenv("LEXICAL_STEMMING", "1") == "1"
+
+# Бэкенд эмбеддингов: "openai" (удаленный API) или "hashed" (локальные символьные n-граммы).
+# При смене бэкенда векторную базу нужно пересоздать.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+LOCAL_EMBED_DIMENSION = int(os.getenv("LOCAL_EMBED_DIMENSION", "1024"))
+LOCAL_EMBED_NGRAM_MIN = int(os.getenv("LOCAL_EMBED_NGRAM_MIN", "2"))
+LOCAL_EMBED_NGRAM_MAX = int(os.getenv("LOCAL_EMBED_NGRAM_MAX", "4"))
+
+# Инкрементальная синхронизация базы с FAQ: доля удаленных строк, после которой база уплотняется
+SYNC_COMPACT_RATIO = float(os.getenv("SYNC_COMPACT_RATIO", "0.2"))
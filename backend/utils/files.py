@@ -0,0 +1,12 @@
+# utils/files.py
+import os
+
+
+def atomic_write(path: str, write):
+    """Пишет файл во временный и переименовывает его, чтобы читатели не видели частичной записи."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
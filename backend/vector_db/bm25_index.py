@@ -0,0 +1,241 @@
+# vector_db/bm25_index.py
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.preprocess_data import preprocess_text
+
+
+class BM25Index:
+    """
+    Инвертированный индекс BM25 на NumPy для коротких текстов (вопросов FAQ).
+
+    Постинги хранятся в CSR-виде: для каждого терма — номера документов и
+    заранее посчитанные веса idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)),
+    так что оценка запроса — это сумма весов его термов через np.bincount.
+    Документы нормализуются preprocess_text (регистр, пунктуация, стемминг).
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, stem: bool = True):
+        """
+        Summary: Инициализирует пустой индекс.
+        Input:
+            k1 (float): Насыщение частоты терма.
+            b (float): Сила нормализации по длине документа.
+            stem (bool): Приводить слова к основе при индексации и поиске.
+        Output:
+            None
+        """
+        self.k1 = k1
+        self.b = b
+        self.stem = stem
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.empty(0, dtype="float32")
+        self._offsets = np.zeros(1, dtype="int64")
+        self._docs = np.empty(0, dtype="int32")
+        self._weights = np.empty(0, dtype="float32")
+        # Множества термов документов для оценки уверенности совпадения
+        self._doc_terms: List[np.ndarray] = []
+        # Нормализованный текст -> первый документ с таким текстом
+        self._exact: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    @property
+    def nbytes(self) -> int:
+        """Память постингов, idf и множеств термов документов (без словаря)."""
+        arrays = [self.idf, self._offsets, self._docs, self._weights, *self._doc_terms]
+        return sum(int(array.nbytes) for array in arrays)
+
+    def tokenize(self, text: Any) -> List[str]:
+        """Нормализованные слова текста."""
+        return preprocess_text(text, stem=self.stem).split()
+
+    def build(self, texts: Iterable[Any]):
+        """
+        Summary: Строит индекс; номер документа — позиция текста в texts.
+        Input:
+            texts (Iterable[Any]): Тексты документов.
+        Output:
+            None
+        """
+        vocabulary: Dict[str, int] = {}
+        doc_terms: List[np.ndarray] = []
+        doc_lengths: List[int] = []
+        pairs: List[Tuple[int, int, int]] = []
+        exact: Dict[str, int] = {}
+
+        for doc, text in enumerate(texts):
+            tokens = self.tokenize(text)
+            exact.setdefault(" ".join(tokens), doc)
+            counts: Dict[int, int] = {}
+            for token in tokens:
+                term = vocabulary.setdefault(token, len(vocabulary))
+                counts[term] = counts.get(term, 0) + 1
+            pairs.extend((term, doc, tf) for term, tf in counts.items())
+            doc_terms.append(np.fromiter(counts, dtype="int32", count=len(counts)))
+            doc_lengths.append(len(tokens))
+
+        n_docs = len(doc_terms)
+        lengths = np.asarray(doc_lengths, dtype="float32")
+        avg_length = float(lengths.mean()) if n_docs and lengths.sum() else 1.0
+        data = np.asarray(pairs, dtype="int64").reshape(-1, 3)
+        terms, docs, tf = data[:, 0], data[:, 1], data[:, 2].astype("float32")
+
+        df = np.bincount(terms, minlength=len(vocabulary)).astype("float32")
+        # Вариант idf из Lucene: всегда положительный
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype("float32")
+        norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+        weights = idf[terms] * tf * (self.k1 + 1) / (tf + norm)
+
+        order = np.argsort(terms, kind="stable")
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self._offsets = np.concatenate([[0], np.cumsum(df)]).astype("int64")
+        self._docs = docs[order].astype("int32")
+        self._weights = weights[order].astype("float32")
+        self._doc_terms = doc_terms
+        self._exact = exact
+
+    def _query_terms(self, text: Any) -> Tuple[str, np.ndarray]:
+        """Нормализованный запрос и номера его известных индексу термов (без повторов)."""
+        tokens = self.tokenize(text)
+        terms = {self.vocabulary[t] for t in tokens if t in self.vocabulary}
+        return " ".join(tokens), np.fromiter(terms, dtype="int64", count=len(terms))
+
+    def scores(self, text: Any) -> np.ndarray:
+        """
+        Summary: BM25-оценки запроса по всем документам.
+        Input:
+            text (Any): Текст запроса.
+        Output:
+            np.ndarray: Оценки float32 длиной len(self).
+        """
+        _, terms = self._query_terms(text)
+        return self._scores(terms)
+
+    def _scores(self, terms: np.ndarray) -> np.ndarray:
+        if len(terms) == 0:
+            return np.zeros(len(self), dtype="float32")
+        spans = [(self._offsets[t], self._offsets[t + 1]) for t in terms]
+        docs = np.concatenate([self._docs[s:e] for s, e in spans])
+        weights = np.concatenate([self._weights[s:e] for s, e in spans])
+        return np.bincount(docs, weights=weights, minlength=len(self)).astype("float32")
+
+    def search(
+        self, text: Any, top_k: int = 5, mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        Summary: Находит top_k документов с ненулевой BM25-оценкой.
+        Input:
+            text (Any): Текст запроса.
+            top_k (int): Количество результатов.
+            mask (Optional[np.ndarray]): Булев фильтр документов (True — искать среди них).
+        Output:
+            List[Tuple[float, int]]: Пары (оценка, номер документа) по убыванию оценки.
+        """
+        scores = self.scores(text)
+        if mask is not None:
+            scores[~mask] = 0.0
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[doc]), int(doc)) for doc in top]
+
+    def best_match(
+        self, text: Any, mask: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[float, int]]:
+        """
+        Summary: Лучший по BM25 документ и уверенность лексического совпадения с ним.
+        Input:
+            text (Any): Текст запроса.
+            mask (Optional[np.ndarray]): Булев фильтр документов (True — искать среди них).
+        Output:
+            Optional[Tuple[float, int]]: (уверенность, номер документа) или None.
+        """
+        normalized, terms = self._query_terms(text)
+        if not normalized:
+            return None
+        # Быстрый путь: нормализованный запрос совпал с документом целиком
+        exact = self._exact.get(normalized)
+        if exact is not None and (mask is None or mask[exact]):
+            return 1.0, exact
+
+        scores = self._scores(terms)
+        if mask is not None:
+            scores[~mask] = 0.0
+        if not scores.any():
+            return None
+        doc = int(np.argmax(scores))
+        return float(self._confidence(normalized, terms, [doc])[0]), doc
+
+    def confidences(self, text: Any, docs: Sequence[int]) -> np.ndarray:
+        """
+        Summary: Уверенность лексического совпадения запроса с каждым из docs.
+
+        Уверенность — коэффициент Дайса множеств термов, взвешенный по idf:
+        1.0, если нормализованные слова совпадают, около 0 без общих редких слов.
+        Слова запроса, неизвестные индексу, считаются редкими и уменьшают ее.
+        Input:
+            text (Any): Текст запроса.
+            docs (Sequence[int]): Номера документов.
+        Output:
+            np.ndarray: Уверенность float32 от 0 до 1 в порядке docs.
+        """
+        normalized, terms = self._query_terms(text)
+        return self._confidence(normalized, terms, docs)
+
+    def _confidence(
+        self, normalized: str, terms: np.ndarray, docs: Sequence[int]
+    ) -> np.ndarray:
+        unknown = len(set(normalized.split())) - len(terms)
+        max_idf = float(self.idf.max()) if len(self.idf) else 0.0
+        query_mass = float(self.idf[terms].sum()) + unknown * max_idf
+        result = np.zeros(len(docs), dtype="float32")
+        for i, doc in enumerate(docs):
+            doc_terms = self._doc_terms[doc]
+            total = query_mass + float(self.idf[doc_terms].sum())
+            if total:
+                common = float(self.idf[np.intersect1d(terms, doc_terms)].sum())
+                result[i] = 2 * common / total
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает размеры индекса.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Число документов, термов, постингов и параметры.
+        """
+        return {
+            "documents": len(self),
+            "terms": len(self.vocabulary),
+            "postings": int(len(self._docs)),
+            "memory_bytes": self.nbytes,
+            "k1": self.k1,
+            "b": self.b,
+            "stem": self.stem,
+        }
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], k: float = 60.0
+) -> List[Tuple[float, int]]:
+    """
+    Summary: Объединяет ранжированные списки методом RRF: score = сумма 1 / (k + ранг).
+    Input:
+        rankings (Sequence[Sequence[int]]): Списки идентификаторов по убыванию релевантности.
+        k (float): Сглаживающая константа RRF.
+    Output:
+        List[Tuple[float, int]]: Пары (RRF-оценка, идентификатор) по убыванию оценки.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    # При равенстве сохраняем порядок первого появления (приоритет первого списка)
+    return sorted(((score, item) for item, score in fused.items()), key=lambda p: -p[0])
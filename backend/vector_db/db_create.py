@@ -1,11 +1,29 @@
+import asyncio
+from typing import Optional
+
 from vector_db.vector_builder import VectorDatabaseBuilder
 
 
-def create_db(data):
+def create_db(data, concurrency: Optional[int] = None):
+
+    # Номер строки FAQ сохраняем в метаданных, чтобы ответ находился без поиска по тексту
+    metadata_list = [{"row": row} for row in range(len(data))]
 
-    # Создаем базу
+    # Создаем базу; при заданном concurrency батчи эмбеддингов идут параллельно
     builder = VectorDatabaseBuilder()
-    vector_db = builder.build_from_texts(data)
+    if concurrency:
+        vector_db = asyncio.run(
+            builder.abuild_from_texts(data, metadata_list, concurrency=concurrency)
+        )
+    else:
+        vector_db = builder.build_from_texts(data, metadata_list)
     builder.save_database("my_vector_db")
 
     return vector_db
+
+
+def sync_db(data, base_path: str = "my_vector_db", concurrency: Optional[int] = None):
+
+    # Векторизуются только новые и измененные вопросы; удаленные помечаются tombstone
+    builder = VectorDatabaseBuilder()
+    return builder.sync_from_texts(data, base_path, concurrency=concurrency)
@@ -0,0 +1,196 @@
+# vector_db/ivf_index.py
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Размер блока строк при назначении кластеров, чтобы не создавать матрицу N x n_lists целиком
+ASSIGN_CHUNK = 8192
+
+
+class IVFIndex:
+    """
+    Приближенный поиск соседей (IVF) на NumPy без FAISS.
+
+    Грубый квантователь — сферический k-means по нормированным векторам.
+    Каждый вектор попадает в список ближайшего центроида; при поиске
+    просматриваются только nprobe ближайших к запросу списков, а найденные
+    кандидаты VectorDB пересчитывает точно. Больше nprobe — выше recall
+    и медленнее поиск.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        nprobe: int = 8,
+        n_iter: int = 20,
+        seed: int = 0,
+    ):
+        """
+        Summary: Инициализирует пустой индекс.
+        Input:
+            n_lists (Optional[int]): Число кластеров; None — около sqrt(N) при построении.
+            nprobe (int): Сколько ближайших кластеров просматривать при поиске.
+            n_iter (int): Число итераций k-means.
+            seed (int): Зерно генератора для воспроизводимости.
+        Output:
+            None
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = np.empty((0, 0), dtype="float32")
+        self.assignments = np.empty(0, dtype="int32")
+        # Идентификаторы векторов, упорядоченные по спискам, и границы списков
+        self._order = np.empty(0, dtype="int64")
+        self._offsets = np.zeros(1, dtype="int64")
+        self._dirty = False
+
+    def build(self, vectors: np.ndarray, inv_norms: np.ndarray):
+        """
+        Summary: Обучает центроиды и распределяет все векторы по спискам.
+
+        Ближайший центроид по скалярному произведению не зависит от длины
+        вектора, поэтому нормируется только обучающая выборка, а не вся матрица.
+        Input:
+            vectors (np.ndarray): Векторы базы (N, dimension), можно memmap.
+            inv_norms (np.ndarray): 1 / ||v|| для каждой строки.
+        Output:
+            None
+        """
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("Нельзя построить индекс по пустой базе")
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        self.n_lists = n_lists
+
+        rng = np.random.default_rng(self.seed)
+        # Для обучения достаточно выборки: ~256 точек на кластер
+        train_size = min(n, 256 * n_lists)
+        sample = np.sort(rng.choice(n, size=train_size, replace=False))
+        train = np.ascontiguousarray(
+            vectors[sample] * inv_norms[sample, None], dtype="float32"
+        )
+
+        centroids = train[rng.choice(train_size, size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            labels = _nearest(train, centroids)
+            counts = np.bincount(labels, minlength=n_lists)
+            # Суммы по кластерам: сортировка по метке + reduceat вместо медленного np.add.at
+            order = np.argsort(labels, kind="stable")
+            nonempty = np.flatnonzero(counts)
+            starts = (np.cumsum(counts) - counts)[nonempty]
+            sums = np.zeros_like(centroids)
+            sums[nonempty] = np.add.reduceat(train[order], starts, axis=0)
+            # Пустые кластеры переинициализируем случайными точками
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = train[rng.choice(train_size, size=len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        self.centroids = centroids.astype("float32")
+        self.assignments = _nearest(vectors, self.centroids).astype("int32")
+        self._dirty = True
+
+    def add(self, vectors: np.ndarray):
+        """
+        Summary: Добавляет новые векторы в конец, относя каждый к ближайшему центроиду.
+        Input:
+            vectors (np.ndarray): Векторы (n, dimension).
+        Output:
+            None
+        """
+        if len(vectors) == 0:
+            return
+        labels = _nearest(vectors, self.centroids).astype("int32")
+        self.assignments = np.concatenate([self.assignments, labels])
+        self._dirty = True
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Summary: Возвращает идентификаторы векторов из nprobe ближайших к запросу списков.
+        Input:
+            query (np.ndarray): Вектор запроса (dimension,).
+            nprobe (Optional[int]): Переопределяет nprobe индекса.
+        Output:
+            np.ndarray: Идентификаторы кандидатов.
+        """
+        self._ensure_lists()
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        scores = self.centroids @ query
+        if nprobe < len(scores):
+            probes = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(len(scores))
+        return np.concatenate(
+            [self._order[self._offsets[p] : self._offsets[p + 1]] for p in probes]
+        )
+
+    def _ensure_lists(self):
+        """Перестраивает инвертированные списки после build/add."""
+        if not self._dirty:
+            return
+        self._order = np.argsort(self.assignments, kind="stable")
+        counts = np.bincount(self.assignments, minlength=self.n_lists)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype("int64")
+        self._dirty = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает параметры и заполненность индекса.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Тип, число списков, nprobe и размеры списков.
+        """
+        counts = np.bincount(self.assignments, minlength=self.n_lists or 0)
+        return {
+            "type": self.kind,
+            "n_lists": self.n_lists,
+            "nprobe": self.nprobe,
+            "max_list_size": int(counts.max()) if len(counts) else 0,
+            "mean_list_size": float(counts.mean()) if len(counts) else 0.0,
+        }
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Массивы для сохранения рядом с базой."""
+        return {"centroids": self.centroids, "assignments": self.assignments}
+
+    def params(self) -> Dict[str, Any]:
+        """Параметры для манифеста базы."""
+        return {"n_lists": self.n_lists, "nprobe": self.nprobe, "n_iter": self.n_iter}
+
+    @classmethod
+    def from_state(
+        cls, params: Dict[str, Any], state: Dict[str, np.ndarray]
+    ) -> "IVFIndex":
+        """
+        Summary: Восстанавливает индекс из сохраненных параметров и массивов.
+        Input:
+            params (Dict[str, Any]): Параметры из манифеста.
+            state (Dict[str, np.ndarray]): Массивы centroids и assignments.
+        Output:
+            IVFIndex: Готовый к поиску индекс.
+        """
+        index = cls(**params)
+        index.centroids = np.asarray(state["centroids"], dtype="float32")
+        index.assignments = np.asarray(state["assignments"], dtype="int32")
+        index._dirty = True
+        return index
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Номер ближайшего (по скалярному произведению) центроида для каждой строки."""
+    labels = np.empty(len(vectors), dtype="int64")
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start : start + ASSIGN_CHUNK], dtype="float32")
+        labels[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+# Доступные типы индексов для VectorDB.build_index и загрузки с диска
+INDEX_TYPES = {IVFIndex.kind: IVFIndex}
@@ -0,0 +1,10 @@
+# vector_db/migrate.py
+# Перевод базы из {base}.pkl в бинарный формат: python -m vector_db.migrate [base_path]
+import sys
+
+from utils.config import VECTOR_DB_PATH
+from vector_db.vector_db import migrate_legacy
+
+
+if __name__ == "__main__":
+    migrate_legacy(sys.argv[1] if len(sys.argv) > 1 else VECTOR_DB_PATH)
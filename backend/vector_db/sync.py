@@ -0,0 +1,16 @@
+# vector_db/sync.py
+# Инкрементальная синхронизация базы с FAQ: python -m vector_db.sync [faq_path] [base_path]
+import sys
+
+from data.knowledge_base import QUESTION_COLUMN
+from data.faq_store import load_faq
+from utils.config import EMBED_CONCURRENCY, FAQ_PATH, VECTOR_DB_PATH
+from vector_db.db_create import sync_db
+
+
+if __name__ == "__main__":
+    faq_path = sys.argv[1] if len(sys.argv) > 1 else FAQ_PATH
+    base_path = sys.argv[2] if len(sys.argv) > 2 else VECTOR_DB_PATH
+    # Заодно пересобирает скомпилированный FAQ, если Excel изменился
+    questions = load_faq(faq_path).column(QUESTION_COLUMN)
+    sync_db(questions, base_path, concurrency=EMBED_CONCURRENCY)
@@ -1,10 +1,25 @@
 # vector_builder.py
-from vectorization.vectorizer import Embedder
+from vectorization.registry import get_embedder
+from vectorization.vectorizer import print_progress
 from vector_db.vector_db import VectorDB
-from typing import List, Dict, Optional
+from utils.config import EMBED_CONCURRENCY, SYNC_COMPACT_RATIO
+from typing import Any, List, Dict, Optional
+import asyncio
+import hashlib
+import os
 import time
 
 
+def row_fingerprint(text: Any) -> str:
+    """
+    Отпечаток строки FAQ для синхронизации: хэш текста, который векторизуется.
+
+    Правки ответа или категорий не меняют эмбеддинг (они читаются из Excel
+    при загрузке базы знаний), поэтому в отпечаток входит только вопрос.
+    """
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
 class VectorDatabaseBuilder:
     """
     Фабрика для создания векторной базы без FAISS.
@@ -18,7 +33,7 @@ class VectorDatabaseBuilder:
         Output:
             None
         """
-        self.embedder = Embedder(model_name)
+        self.embedder = get_embedder(model_name)
         self.vector_db = None
 
     def build_from_texts(
@@ -43,14 +58,219 @@ class VectorDatabaseBuilder:
         print(f"✅ Размерность эмбеддингов: {dimension}")
 
         # Создаем векторную базу
-        self.vector_db = VectorDB(dimension)
+        # База ищет и подписывается тем же бэкендом, которым построена
+        self.vector_db = VectorDB(dimension, self.embedder)
 
         # Векторизуем и добавляем в базу
         print("🔧 Векторизация текстов...")
         start_time = time.time()
 
-        vectors = self.embedder.encode_batch(texts)
+        vectors = self.embedder.encode_batch(texts, progress=print_progress)
+        valid_count = self._add_valid(vectors, texts, metadata_list)
+
+        elapsed_time = time.time() - start_time
+        print(
+            f"✅ Векторная база создана! Обработано {valid_count}/{len(texts)} текстов"
+        )
+        print(f"⏱️ Время выполнения: {elapsed_time:.2f} секунд")
+
+        return self.vector_db
+
+    async def abuild_from_texts(
+        self,
+        texts: List[str],
+        metadata_list: Optional[List[Dict]] = None,
+        concurrency: int = EMBED_CONCURRENCY,
+    ) -> VectorDB:
+        """
+        Summary: Асинхронно создает векторную базу, держа до concurrency батчей в полете.
+        Input:
+            texts (List[str]): Список текстов для векторизации.
+            metadata_list (Optional[List[Dict]]): Список метаданных для текстов.
+            concurrency (int): Максимальное число одновременных запросов к API.
+        Output:
+            VectorDB: Созданная векторная база.
+        """
+        if metadata_list is None:
+            metadata_list = [{} for _ in texts]
+
+        print(
+            f"🚀 Начало асинхронного построения векторной базы для {len(texts)} текстов "
+            f"(параллельно {concurrency} батчей)..."
+        )
+        start_time = time.time()
+
+        vectors = await self.embedder.aencode_batch(
+            texts, concurrency=concurrency, progress=print_progress
+        )
+
+        # Размерность уже известна по полученным эмбеддингам
+        dimension = self.embedder.get_embedding_dimension()
+        print(f"✅ Размерность эмбеддингов: {dimension}")
+        self.vector_db = VectorDB(dimension, self.embedder)
+        valid_count = self._add_valid(vectors, texts, metadata_list)
+
+        elapsed_time = time.time() - start_time
+        print(
+            f"✅ Векторная база создана! Обработано {valid_count}/{len(texts)} текстов"
+        )
+        print(f"⏱️ Время выполнения: {elapsed_time:.2f} секунд")
+
+        return self.vector_db
+
+    def sync_from_texts(
+        self,
+        texts: List[str],
+        base_path: str,
+        concurrency: Optional[int] = None,
+        compact_ratio: float = SYNC_COMPACT_RATIO,
+    ) -> Dict[str, int]:
+        """
+        Summary: Инкрементально приводит сохраненную базу к текущему списку вопросов.
+
+        Векторы неизмененных вопросов переиспользуются (обновляется только
+        metadata["row"]), векторизуются лишь новые и измененные вопросы,
+        векторы исчезнувших помечаются tombstone. Когда доля tombstone
+        достигает compact_ratio, база уплотняется. Новая версия пишется
+        атомарно рядом со старой (VectorDB.save), и серверы подхватывают ее
+        по mtime манифеста. Если базы нет или она построена другой моделью,
+        выполняется полная сборка.
+        Input:
+            texts (List[str]): Вопросы FAQ; номер в списке — номер строки.
+            base_path (str): Путь к базе (без расширения).
+            concurrency (Optional[int]): Параллельных батчей эмбеддингов; None — синхронно.
+            compact_ratio (float): Доля tombstone, при которой выполняется compact().
+        Output:
+            Dict[str, int]: Счетчики added, reused, deleted, compacted и total.
+        """
+        start_time = time.time()
+        db = self._load_for_sync(base_path)
+        if db is None:
+            metadata_list = [{"row": row} for row in range(len(texts))]
+            if concurrency:
+                asyncio.run(self.abuild_from_texts(texts, metadata_list, concurrency))
+            else:
+                self.build_from_texts(texts, metadata_list)
+            self.save_database(base_path)
+            total = self.vector_db.live_count
+            return {"added": total, "reused": 0, "deleted": 0, "compacted": 0, "total": total}
+
+        self.vector_db = db
+
+        # Векторы по отпечатку; pop() отдает вектор с меньшим номером.
+        # Удаленные, но еще не уплотненные векторы возвращаются без повторной векторизации
+        available: Dict[str, List[int]] = {}
+        deleted: Dict[str, List[int]] = {}
+        for i in reversed(range(len(db.texts))):
+            pool = deleted if i in db.tombstones else available
+            pool.setdefault(row_fingerprint(db.texts[i]), []).append(i)
+
+        reused = moved = 0
+        # Строки-дубликаты уже сопоставленного вопроса получают копию его вектора
+        assigned: Dict[str, int] = {}
+        copies: List[tuple] = []
+        to_embed: Dict[str, List[int]] = {}
+        for row, text in enumerate(texts):
+            fingerprint = row_fingerprint(text)
+            ids = available.get(fingerprint) or deleted.get(fingerprint)
+            if ids:
+                i = ids.pop()
+                if i in db.tombstones:
+                    db.restore([i])
+                    moved += 1
+                if db.metadata[i].get("row") != row:
+                    db.metadata[i] = {**db.metadata[i], "row": row}
+                    moved += 1
+                assigned[fingerprint] = i
+                reused += 1
+            elif fingerprint in assigned:
+                copies.append((row, assigned[fingerprint]))
+            else:
+                to_embed.setdefault(fingerprint, []).append(row)
+
+        stale = [i for ids in available.values() for i in ids]
+        db.delete(stale)
+
+        if copies:
+            db.add_batch(
+                [db.vectors[i] for _, i in copies],
+                [texts[row] for row, _ in copies],
+                [{"row": row} for row, _ in copies],
+            )
+
+        added = 0
+        if to_embed:
+            rows_by_text = list(to_embed.values())
+            new_texts = [texts[rows[0]] for rows in rows_by_text]
+            print(f"🔧 Векторизация {len(new_texts)} новых или измененных вопросов...")
+            if concurrency:
+                vectors = asyncio.run(
+                    self.embedder.aencode_batch(
+                        new_texts, concurrency=concurrency, progress=print_progress
+                    )
+                )
+            else:
+                vectors = self.embedder.encode_batch(new_texts, progress=print_progress)
+            expanded_vectors, expanded_texts, metadata_list = [], [], []
+            for vector, rows in zip(vectors, rows_by_text):
+                for row in rows:
+                    expanded_vectors.append(vector)
+                    expanded_texts.append(texts[row])
+                    metadata_list.append({"row": row})
+            added = self._add_valid(expanded_vectors, expanded_texts, metadata_list)
 
+        compacted = 0
+        if db.tombstones and len(db.tombstones) >= compact_ratio * len(db.texts):
+            compacted = db.compact()
+            print(f"🧹 База уплотнена: удалено {compacted} строк")
+
+        stats = {
+            "added": added + len(copies),
+            "reused": reused,
+            "deleted": len(stale),
+            "compacted": compacted,
+            "total": db.live_count,
+        }
+        # База, сохраненная без индекса или квантования из настроек, пересохраняется с ними
+        if stats["added"] or stale or moved or compacted or db.prepare_search():
+            self.save_database(base_path)
+        else:
+            print("✅ База уже соответствует FAQ, сохранять нечего")
+        print(f"🔄 Синхронизация: {stats}, {time.time() - start_time:.2f} с")
+        return stats
+
+    def _load_for_sync(self, base_path: str) -> Optional[VectorDB]:
+        """
+        Summary: Загружает базу для синхронизации, если ее векторы совместимы с текущим эмбеддером.
+        Input:
+            base_path (str): Путь к базе (без расширения).
+        Output:
+            Optional[VectorDB]: База или None, если нужна полная сборка.
+        """
+        if not os.path.exists(VectorDB.source_path(base_path)):
+            return None
+        db = VectorDB.load(base_path, embedder=self.embedder)
+        # У базы в старом формате модель не записана; считаем ее совместимой
+        if db.embedding_model and db.embedding_model != self.embedder.model_name:
+            print("⚠️ База построена другой моделью эмбеддингов, выполняется полная сборка")
+            return None
+        if db.texts and db.dimension != self.embedder.get_embedding_dimension():
+            print("⚠️ Размерность базы не совпадает с эмбеддером, выполняется полная сборка")
+            return None
+        return db
+
+    def _add_valid(
+        self, vectors: List[List[float]], texts: List[str], metadata_list: List[Dict]
+    ) -> int:
+        """
+        Summary: Добавляет в базу только успешно векторизованные тексты.
+        Input:
+            vectors (List[List[float]]): Векторы в порядке texts.
+            texts (List[str]): Исходные тексты.
+            metadata_list (List[Dict]): Метаданные для текстов.
+        Output:
+            int: Количество добавленных векторов.
+        """
         # Фильтруем успешные векторизации
         valid_data = []
         for i, (vector, text, metadata) in enumerate(
@@ -70,13 +290,7 @@ class VectorDatabaseBuilder:
                 list(vectors_valid), list(texts_valid), list(metadata_valid)
             )
 
-        elapsed_time = time.time() - start_time
-        print(
-            f"✅ Векторная база создана! Обработано {len(valid_data)}/{len(texts)} текстов"
-        )
-        print(f"⏱️ Время выполнения: {elapsed_time:.2f} секунд")
-
-        return self.vector_db
+        return len(valid_data)
 
     def save_database(self, base_path: str):
         """
@@ -87,7 +301,9 @@ class VectorDatabaseBuilder:
             None
         """
         if self.vector_db:
+            # Индекс и квантование обучаются один раз здесь и сохраняются вместе с базой
+            self.vector_db.prepare_search()
             self.vector_db.save(base_path)
-            print(f"💾 Векторная база сохранена: {base_path}.pkl")
+            print(f"💾 Векторная база сохранена: {base_path}.json")
         else:
             raise ValueError("Векторная база не создана")
@@ -1,25 +1,70 @@
 # db/vector_db.py
+import json
+import os
+import uuid
 import numpy as np
 import pickle
-from typing import List, Tuple, Dict, Any, Optional
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import List, Tuple, Dict, Any, Optional, Sequence, Set
+from utils.config import (
+    ANN_MIN_VECTORS,
+    IVF_NLISTS,
+    IVF_NPROBE,
+    PQ_SUBSPACES,
+    QUANT_RESCORE,
+    QUANT_RESCORE_FACTOR,
+    VECTOR_DB_MMAP,
+    VECTOR_INDEX,
+    VECTOR_QUANTIZATION,
+)
+from utils.files import atomic_write
+from vector_db.ivf_index import INDEX_TYPES
+from vector_db.quantization import QUANTIZER_TYPES
+from vectorization.registry import get_embedder
 from vectorization.vectorizer import Embedder
 
 
+# Версия бинарного формата: манифест {base}.json + матрица float32 в .npy
+FORMAT_VERSION = 1
+
+# Начальная емкость буфера векторов; дальше емкость удваивается
+INITIAL_CAPACITY = 16
+
+
 class VectorDB:
-    def __init__(self, dimension: int):
+    def __init__(self, dimension: int, embedder: Optional[Embedder] = None):
         """
         Summary: Инициализирует векторную базу данных с заданной размерностью.
         Input:
             dimension (int): Размерность векторов в базе данных.
+            embedder (Optional[Embedder]): Эмбеддер для search_by_text и метки модели;
+                None — общий эмбеддер процесса (get_embedder).
         Output:
             None
         """
         self.dimension = dimension
-        self.vectors = np.array([], dtype="float32").reshape(0, dimension)
+        # Векторы хранятся в предвыделенном буфере; занято первых _size строк
+        self._buffer = np.empty((0, dimension), dtype="float32")
+        # 1 / ||v|| для каждой строки: косинус считается одним матрично-векторным произведением
+        self._norm_buffer = np.empty(0, dtype="float32")
+        self._size = 0
+        # Необязательный ANN-индекс (например, IVFIndex); None — точный перебор
+        self.index = None
+        # Необязательное квантование (int8 или PQ) и пересчет шорт-листа по float32
+        self.quantizer = None
+        self.rescore = True
         self.texts: List[str] = []
+        # Записи могут разделять один dict, поэтому их не меняют на месте, а заменяют новыми
         self.metadata: List[Dict] = []
-        self.embedder = Embedder()
+        # Удаленные строки (tombstones): остаются в буфере до compact(), но не находятся поиском
+        self.tombstones: Set[int] = set()
+        # Модель, которой построена загруженная с диска база (из манифеста)
+        self.embedding_model: Optional[str] = None
+        # Необязательные метки строк (коды категорий, -1 — без метки) для фильтрации поиска;
+        # _label_order/_label_offsets группируют строки по меткам (CSR)
+        self.labels: Optional[np.ndarray] = None
+        self._label_order = np.empty(0, dtype="int64")
+        self._label_offsets = np.zeros(1, dtype="int64")
+        self.embedder = embedder if embedder is not None else get_embedder()
 
     def add_vector(
         self, vector: List[float], text: str, metadata: Optional[Dict] = None
@@ -38,13 +83,7 @@ class VectorDB:
                 f"Размерность вектора {len(vector)} не совпадает с размерностью базы {self.dimension}"
             )
 
-        vector_array = np.array(vector, dtype="float32").reshape(1, -1)
-
-        if self.vectors.size == 0:
-            self.vectors = vector_array
-        else:
-            self.vectors = np.vstack([self.vectors, vector_array])
-
+        self._append(np.asarray(vector, dtype="float32").reshape(1, -1))
         self.texts.append(text)
         self.metadata.append(metadata or {})
 
@@ -55,7 +94,7 @@ class VectorDB:
         metadata_list: Optional[List[Dict]] = None,
     ):
         """
-        Summary: Добавляет батч векторов в базу данных.
+        Summary: Добавляет батч векторов в базу данных одной векторизованной операцией.
         Input:
             vectors (List[List[float]]): Список векторов для добавления.
             texts (List[str]): Список текстов, связанных с векторами.
@@ -67,10 +106,217 @@ class VectorDB:
             raise ValueError("Количество векторов и текстов должно совпадать")
 
         if metadata_list is None:
-            metadata_list = [{}] * len(vectors)
+            metadata_list = [{} for _ in texts]
+        elif len(metadata_list) != len(texts):
+            raise ValueError("Количество метаданных и текстов должно совпадать")
+
+        if len(texts) == 0:
+            return
+
+        try:
+            batch = np.asarray(vectors, dtype="float32")
+        except ValueError:
+            raise ValueError("Векторы в батче имеют разную размерность")
+        if batch.ndim != 2 or batch.shape[1] != self.dimension:
+            raise ValueError(
+                f"Размерность векторов {batch.shape[1:]} не совпадает с размерностью базы {self.dimension}"
+            )
+
+        self._append(batch)
+        self.texts.extend(texts)
+        self.metadata.extend(metadata or {} for metadata in metadata_list)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Занятая часть буфера: матрица (N, dimension) float32 без копирования."""
+        return self._buffer[: self._size]
+
+    @vectors.setter
+    def vectors(self, value: np.ndarray):
+        array = np.ascontiguousarray(value, dtype="float32").reshape(-1, self.dimension)
+        self._buffer = array
+        self._norm_buffer = _inverse_norms(array)
+        self._size = len(array)
+        self.index = None
+        self.quantizer = None
+        self.tombstones = set()
+        self.labels = None
+
+    @property
+    def _inv_norms(self) -> np.ndarray:
+        return self._norm_buffer[: self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """Оценка памяти базы: буферы векторов и норм, ANN-индекс и квантованные коды."""
+        parts = (self, self.index, self.quantizer)
+        return sum(_array_bytes(part) for part in parts if part is not None)
+
+    @property
+    def capacity(self) -> int:
+        """Число строк, под которые уже выделена память."""
+        return len(self._buffer)
+
+    def _reserve(self, required: int):
+        """
+        Summary: Гарантирует емкость буфера не меньше required строк, удваивая ее при росте.
+        Input:
+            required (int): Необходимое число строк.
+        Output:
+            None
+        """
+        if required <= self.capacity:
+            return
+        capacity = max(required, self.capacity * 2, INITIAL_CAPACITY)
+        buffer = np.empty((capacity, self.dimension), dtype="float32")
+        buffer[: self._size] = self._buffer[: self._size]
+        norm_buffer = np.empty(capacity, dtype="float32")
+        norm_buffer[: self._size] = self._norm_buffer[: self._size]
+        self._buffer = buffer
+        self._norm_buffer = norm_buffer
+
+    def _append(self, batch: np.ndarray):
+        """
+        Summary: Дописывает матрицу векторов в конец буфера (амортизированно O(1) на вектор).
+        Input:
+            batch (np.ndarray): Матрица (n, dimension) float32.
+        Output:
+            None
+        """
+        end = self._size + len(batch)
+        self._reserve(end)
+        self._buffer[self._size : end] = batch
+        self._norm_buffer[self._size : end] = _inverse_norms(batch)
+        self._size = end
+        self.labels = None
+        if self.index is not None:
+            self.index.add(batch)
+        if self.quantizer is not None:
+            self.quantizer.add(_normalize_rows(batch))
+
+    def trim(self):
+        """
+        Summary: Освобождает неиспользуемую емкость буфера, копируя занятые строки.
+        Input:
+            None
+        Output:
+            None
+        """
+        if self.capacity > self._size:
+            self._buffer = self._buffer[: self._size].copy()
+            self._norm_buffer = self._norm_buffer[: self._size].copy()
+
+    def delete(self, ids: List[int]):
+        """
+        Summary: Помечает строки удаленными (tombstone) без перестройки буфера.
+
+        Обратная норма удаленной строки обнуляется, поэтому ее косинус
+        с любым запросом равен 0 и она отсеивается при выборе top_k.
+        Input:
+            ids (List[int]): Номера удаляемых строк.
+        Output:
+            None
+        """
+        ids = [int(i) for i in ids if 0 <= int(i) < self._size]
+        self.tombstones.update(ids)
+        self._norm_buffer[ids] = 0.0
+        self.labels = None
+        for i in ids:
+            # Номер строки FAQ удаленному вектору больше не принадлежит
+            metadata = {k: v for k, v in self.metadata[i].items() if k != "row"}
+            self.metadata[i] = {**metadata, "deleted": True}
+
+    def restore(self, ids: List[int]):
+        """
+        Summary: Снимает tombstone со строк, которые еще не удалены compact().
+        Input:
+            ids (List[int]): Номера восстанавливаемых строк.
+        Output:
+            None
+        """
+        ids = [int(i) for i in ids if int(i) in self.tombstones]
+        if not ids:
+            return
+        self.tombstones.difference_update(ids)
+        self._norm_buffer[ids] = _inverse_norms(np.asarray(self.vectors[ids]))
+        self.labels = None
+        for i in ids:
+            self.metadata[i] = {k: v for k, v in self.metadata[i].items() if k != "deleted"}
+
+    @property
+    def live_count(self) -> int:
+        """Число неудаленных строк."""
+        return self._size - len(self.tombstones)
+
+    def compact(self) -> int:
+        """
+        Summary: Физически удаляет tombstone-строки; индекс и квантование перестраиваются.
+        Input:
+            None
+        Output:
+            int: Число удаленных строк.
+        """
+        removed = len(self.tombstones)
+        if not removed:
+            return 0
+        keep = np.setdiff1d(
+            np.arange(self._size), np.fromiter(self.tombstones, dtype="int64")
+        )
+        index, quantizer, rescore = self.index, self.quantizer, self.rescore
+        texts = [self.texts[i] for i in keep]
+        metadata = [self.metadata[i] for i in keep]
+        # Сеттер копирует строки в новый буфер и сбрасывает индекс, квантование и tombstones
+        self.vectors = self.vectors[keep]
+        self.texts, self.metadata = texts, metadata
+        if index is not None:
+            self.build_index(index.kind, **index.params())
+        if quantizer is not None:
+            self.quantize(quantizer.kind, rescore=rescore, **quantizer.params())
+        return removed
+
+    def set_labels(self, labels: Sequence[int]):
+        """
+        Summary: Задает метку каждой строке (например, код категории) для фильтрации поиска.
+
+        Строки группируются по меткам один раз, поэтому search(labels=...)
+        просматривает только строки нужных меток. Удаленные строки получают -1.
+        Любое изменение базы (добавление, удаление) сбрасывает метки.
+        Input:
+            labels (Sequence[int]): Метка для каждой строки; -1 — строка без метки.
+        Output:
+            None
+        """
+        labels = np.array(labels, dtype="int32").reshape(-1)
+        if len(labels) != self._size:
+            raise ValueError(f"Меток {len(labels)}, а строк в базе {self._size}")
+        if self.tombstones:
+            labels[np.fromiter(self.tombstones, dtype="int64")] = -1
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels[labels >= 0])
+        # Строки без метки (-1) идут в начале порядка и в группы не входят
+        self._label_order = order[self._size - int(counts.sum()) :]
+        self._label_offsets = np.concatenate([[0], np.cumsum(counts)]).astype("int64")
+        self.labels = labels
 
-        for vector, text, metadata in zip(vectors, texts, metadata_list):
-            self.add_vector(vector, text, metadata)
+    def label_ids(self, labels: Sequence[int]) -> np.ndarray:
+        """
+        Summary: Номера строк с любой из меток (по возрастанию).
+        Input:
+            labels (Sequence[int]): Метки.
+        Output:
+            np.ndarray: Номера строк int64.
+        """
+        if self.labels is None:
+            raise ValueError("Метки строк не заданы: вызовите set_labels")
+        offsets = self._label_offsets
+        spans = [
+            self._label_order[offsets[label] : offsets[label + 1]]
+            for label in labels
+            if 0 <= label < len(offsets) - 1
+        ]
+        if not spans:
+            return np.empty(0, dtype="int64")
+        return np.sort(np.concatenate(spans))
 
     def get_vectors_by_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
         """
@@ -98,38 +344,223 @@ class VectorDB:
 
         return result_vectors
 
+    def build_index(self, kind: str = "ivf", **params):
+        """
+        Summary: Строит ANN-индекс поверх текущих векторов; поиск затем идет по кандидатам.
+        Input:
+            kind (str): Тип индекса из INDEX_TYPES (сейчас "ivf").
+            **params: Параметры индекса, например n_lists и nprobe для IVF.
+        Output:
+            None
+        """
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Неизвестный тип индекса: {kind}")
+        index = INDEX_TYPES[kind](**params)
+        index.build(self.vectors, self._inv_norms)
+        self.index = index
+
+    def drop_index(self):
+        """Удаляет ANN-индекс: поиск снова идет точным перебором."""
+        self.index = None
+
+    def quantize(self, mode: str = "int8", rescore: bool = True, **params):
+        """
+        Summary: Включает поиск по квантованным кодам (int8 или PQ) с асимметричными оценками.
+
+        Коды занимают 1 байт на координату (int8) или m байт на вектор (PQ)
+        и держатся в памяти; полные float32-векторы при этом могут оставаться
+        в memmap и читаться только для пересчета шорт-листа (rescore).
+        Input:
+            mode (str): "int8" или "pq".
+            rescore (bool): Пересчитывать top_k * QUANT_RESCORE_FACTOR кандидатов по float32.
+            **params: Параметры квантователя, например m для PQ.
+        Output:
+            None
+        """
+        if mode not in QUANTIZER_TYPES:
+            raise ValueError(f"Неизвестный режим квантования: {mode}")
+        quantizer = QUANTIZER_TYPES[mode](**params)
+        quantizer.fit(_normalize_rows(self.vectors))
+        self.quantizer = quantizer
+        self.rescore = rescore
+
+    def drop_quantization(self):
+        """Отключает квантование: оценки снова считаются по float32."""
+        self.quantizer = None
+
+    def prepare_search(
+        self,
+        index: str = VECTOR_INDEX,
+        quantization: str = VECTOR_QUANTIZATION,
+        min_vectors: int = ANN_MIN_VECTORS,
+    ) -> bool:
+        """
+        Summary: Строит недостающие ANN-индекс и квантование по настройкам сервиса.
+
+        Вызывается перед сохранением базы, чтобы обученные структуры попали
+        в .npz рядом с векторами и серверу не приходилось обучать их при загрузке.
+        Input:
+            index (str): Тип индекса ("ivf" или пусто — без индекса).
+            quantization (str): Режим квантования ("int8", "pq" или пусто).
+            min_vectors (int): Индекс строится, только если векторов не меньше.
+        Output:
+            bool: True, если что-то было построено.
+        """
+        built = False
+        if index and self.index is None and len(self.texts) >= min_vectors:
+            self.build_index(index, n_lists=IVF_NLISTS or None, nprobe=IVF_NPROBE)
+            built = True
+        if quantization and self.quantizer is None and self.texts:
+            params = {"m": PQ_SUBSPACES} if quantization == "pq" else {}
+            self.quantize(quantization, rescore=QUANT_RESCORE, **params)
+            built = True
+        return built
+
     def search(
-        self, query_vector: List[float], top_k: int = 5
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        labels: Optional[Sequence[int]] = None,
     ) -> List[Tuple[float, str, Dict]]:
         """
         Summary: Ищет ближайшие векторы, используя косинусное сходство.
+
+        С ANN-индексом точное сходство считается только для кандидатов
+        из nprobe ближайших списков (точный пересчет шорт-листа).
+        С labels поиск идет только по строкам этих меток (точно, по float32).
         Input:
             query_vector (List[float]): Вектор для поиска.
             top_k (int): Количество ближайших векторов для возврата.
+            nprobe (Optional[int]): Число просматриваемых списков индекса (больше — точнее).
+            labels (Optional[Sequence[int]]): Метки строк (set_labels), среди которых искать.
         Output:
             List[Tuple[float, str, Dict]]: Список кортежей с косинусным сходством, текстом и метаданными.
         """
-        if self.vectors.size == 0:
+        if self.vectors.size == 0 or top_k <= 0:
+            return []
+
+        query = _normalize_rows(np.asarray(query_vector, dtype="float32").reshape(1, -1))
+        if labels is not None:
+            ids = self.label_ids(labels)
+            similarities = (self.vectors[ids] @ query[0]) * self._inv_norms[ids]
+            return self._collect(similarities, top_k, ids)
+        return self._search_one(query[0], top_k, nprobe)
+
+    def similarities(self, query_vector: List[float], ids: List[int]) -> np.ndarray:
+        """
+        Summary: Точное косинусное сходство запроса с заданными строками базы.
+        Input:
+            query_vector (List[float]): Вектор запроса.
+            ids (List[int]): Номера строк базы.
+        Output:
+            np.ndarray: Сходство float32 в порядке ids.
+        """
+        ids = np.asarray(ids, dtype="int64")
+        if len(ids) == 0:
+            return np.empty(0, dtype="float32")
+        query = _normalize_rows(np.asarray(query_vector, dtype="float32").reshape(1, -1))[0]
+        return (self.vectors[ids] @ query) * self._inv_norms[ids]
+
+    def _search_one(
+        self, query: np.ndarray, top_k: int, nprobe: Optional[int] = None
+    ) -> List[Tuple[float, str, Dict]]:
+        ids = None
+        if self.index is not None:
+            ids = self.index.candidates(query, nprobe)
+            # Если кандидатов меньше top_k, честнее пройти всю базу
+            if len(ids) < top_k:
+                ids = None
+
+        if self.quantizer is not None:
+            approx = self.quantizer.scores(query, ids)
+            if not self.rescore:
+                return self._collect(approx, top_k, ids)
+            # Шорт-лист по приближенным оценкам, затем точный пересчет по float32
+            shortlist = min(top_k * QUANT_RESCORE_FACTOR, len(approx))
+            positions = np.argpartition(-approx, shortlist - 1)[:shortlist]
+            ids = np.sort(ids[positions] if ids is not None else positions)
+
+        if ids is not None:
+            similarities = (self.vectors[ids] @ query) * self._inv_norms[ids]
+            return self._collect(similarities, top_k, ids)
+
+        # Косинусное сходство: (V @ q / ||q||) / ||v||, нормы строк посчитаны заранее
+        similarities = (self.vectors @ query) * self._inv_norms
+
+        return self._collect(similarities, top_k)
+
+    def search_many(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        labels: Optional[Sequence[int]] = None,
+    ) -> List[List[Tuple[float, str, Dict]]]:
+        """
+        Summary: Ищет ближайшие векторы сразу для нескольких запросов одним матричным произведением.
+        Input:
+            query_vectors (List[List[float]]): Векторы запросов.
+            top_k (int): Количество ближайших векторов для каждого запроса.
+            nprobe (Optional[int]): Число просматриваемых списков ANN-индекса.
+            labels (Optional[Sequence[int]]): Метки строк (set_labels), среди которых искать.
+        Output:
+            List[List[Tuple[float, str, Dict]]]: Результаты search для каждого запроса.
+        """
+        if len(query_vectors) == 0:
             return []
+        if self.vectors.size == 0 or top_k <= 0:
+            return [[] for _ in query_vectors]
 
-        query_array = np.array(query_vector, dtype="float32").reshape(1, -1)
+        queries = _normalize_rows(
+            np.asarray(query_vectors, dtype="float32").reshape(len(query_vectors), -1)
+        )
+        if labels is not None:
+            ids = self.label_ids(labels)
+            similarities = (queries @ self.vectors[ids].T) * self._inv_norms[ids]
+            return [self._collect(row, top_k, ids) for row in similarities]
+        if self.index is not None or self.quantizer is not None:
+            # У каждого запроса свой набор кандидатов
+            return [self._search_one(query, top_k, nprobe) for query in queries]
 
-        # Вычисляем косинусное сходство
-        similarities = cosine_similarity(query_array, self.vectors)[0]
+        similarities = (queries @ self.vectors.T) * self._inv_norms
 
-        # Получаем индексы top_k наиболее похожих
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        return [self._collect(row, top_k) for row in similarities]
+
+    def _collect(
+        self, similarities: np.ndarray, top_k: int, ids: Optional[np.ndarray] = None
+    ) -> List[Tuple[float, str, Dict]]:
+        """
+        Summary: Выбирает top_k по убыванию сходства без полной сортировки.
+        Input:
+            similarities (np.ndarray): Сходство запроса с векторами базы (или с кандидатами).
+            top_k (int): Количество результатов.
+            ids (Optional[np.ndarray]): Номера строк кандидатов, если similarities не по всей базе.
+        Output:
+            List[Tuple[float, str, Dict]]: Список кортежей с косинусным сходством, текстом и метаданными.
+        """
+        k = min(top_k, len(similarities))
+        if k <= 0:
+            return []
+        if k < len(similarities):
+            top_indices = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top_indices = np.arange(len(similarities))
+        top_indices = top_indices[np.argsort(-similarities[top_indices], kind="stable")]
 
         results = []
         for idx in top_indices:
-            if similarities[idx] > 0:  # фильтруем совсем непохожие
+            row = int(ids[idx]) if ids is not None else idx
+            # фильтруем совсем непохожие; удаленные строки без пересчета
+            # по float32 могут получить ненулевую приближенную оценку
+            if similarities[idx] > 0 and row not in self.tombstones:
                 results.append(
                     (
                         float(
                             similarities[idx]
                         ),  # косинусное сходство (1.0 = идентичные)
-                        self.texts[idx],
-                        self.metadata[idx],
+                        self.texts[row],
+                        self.metadata[row],
                     )
                 )
 
@@ -161,44 +592,249 @@ class VectorDB:
         """
         return {
             "total_vectors": len(self.texts),
+            "live_vectors": self.live_count,
+            "tombstones": len(self.tombstones),
             "dimension": self.dimension,
+            "capacity": self.capacity,
+            "memory_bytes": self.nbytes,
             "texts_count": len(self.texts),
             "metadata_count": len(self.metadata),
+            "index": self.index.get_stats() if self.index is not None else None,
+            "quantization": (
+                {**self.quantizer.get_stats(), "rescore": self.rescore}
+                if self.quantizer is not None
+                else None
+            ),
         }
 
     def save(self, base_path: str):
         """
-        Summary: Сохраняет всю векторную базу на диск.
+        Summary: Сохраняет всю векторную базу на диск в бинарном формате.
+
+        Векторы пишутся в новый файл {base}.<id>.npy, затем атомарно заменяется
+        манифест {base}.json со ссылкой на него. Читатели видят либо старую,
+        либо новую версию целиком. Файлы предыдущей версии остаются на диске
+        до следующего сохранения, чтобы сервер, прочитавший старый манифест,
+        успел их открыть; удаляются файлы версии, бывшей перед ней.
         Input:
-            base_path (str): Путь для сохранения файла.
+            base_path (str): Путь для сохранения (без расширения).
         Output:
             None
         """
-        data = {
-            "vectors": self.vectors.tolist(),
+        manifest_path = f"{base_path}.json"
+        previous = _read_manifest(manifest_path) if os.path.exists(manifest_path) else None
+
+        directory = os.path.dirname(base_path)
+        file_id = f"{os.path.basename(base_path)}.{uuid.uuid4().hex[:12]}"
+        vectors_file = f"{file_id}.npy"
+        atomic_write(
+            os.path.join(directory, vectors_file), lambda f: np.save(f, self.vectors)
+        )
+
+        index_info = None
+        if self.index is not None:
+            index_file = f"{file_id}.{self.index.kind}.npz"
+            state = self.index.state()
+            atomic_write(
+                os.path.join(directory, index_file), lambda f: np.savez(f, **state)
+            )
+            index_info = {
+                "type": self.index.kind,
+                "params": self.index.params(),
+                "file": index_file,
+            }
+
+        quantizer_info = None
+        if self.quantizer is not None:
+            quantizer_file = f"{file_id}.{self.quantizer.kind}.npz"
+            quantizer_state = self.quantizer.state()
+            atomic_write(
+                os.path.join(directory, quantizer_file),
+                lambda f: np.savez(f, **quantizer_state),
+            )
+            quantizer_info = {
+                "type": self.quantizer.kind,
+                "params": self.quantizer.params(),
+                "rescore": self.rescore,
+                "file": quantizer_file,
+            }
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "dimension": self.dimension,
+            "embedding_model": self.embedder.model_name,
+            "count": len(self.texts),
+            "vectors_file": vectors_file,
+            "index": index_info,
+            "quantizer": quantizer_info,
+            "tombstones": sorted(self.tombstones),
+            "previous_files": _data_files(previous) if previous else [],
             "texts": self.texts,
             "metadata": self.metadata,
-            "dimension": self.dimension,
         }
+        atomic_write(
+            manifest_path,
+            lambda f: f.write(json.dumps(manifest, ensure_ascii=False).encode("utf-8")),
+        )
 
-        with open(f"{base_path}.pkl", "wb") as f:
-            pickle.dump(data, f)
+        if previous:
+            for old_file in previous.get("previous_files", []):
+                try:
+                    os.remove(os.path.join(directory, old_file))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def source_path(base_path: str) -> str:
+        """
+        Summary: Возвращает файл, изменение которого означает новую версию базы.
+        Input:
+            base_path (str): Путь к базе (без расширения).
+        Output:
+            str: Манифест {base}.json или устаревший {base}.pkl, если манифеста нет.
+        """
+        manifest_path = f"{base_path}.json"
+        if os.path.exists(manifest_path):
+            return manifest_path
+        return f"{base_path}.pkl"
 
     @classmethod
-    def load(cls, base_path: str):
+    def load(
+        cls,
+        base_path: str,
+        mmap: bool = VECTOR_DB_MMAP,
+        embedder: Optional[Embedder] = None,
+    ):
         """
         Summary: Загружает векторную базу с диска.
+
+        Бинарный формат открывается через np.memmap (mmap=True): несколько
+        процессов разделяют одну копию в page cache. Если манифеста нет,
+        читается устаревший {base}.pkl.
         Input:
-            base_path (str): Путь к файлу для загрузки.
+            base_path (str): Путь к файлу для загрузки (без расширения).
+            mmap (bool): Отображать матрицу векторов в память вместо чтения.
+            embedder (Optional[Embedder]): Эмбеддер базы; None — общий эмбеддер процесса.
+        Output:
+            VectorDB: Экземпляр класса VectorDB с загруженными данными.
+        """
+        manifest_path = f"{base_path}.json"
+        if not os.path.exists(manifest_path):
+            return cls.load_legacy(base_path, embedder)
+
+        manifest = _read_manifest(manifest_path)
+        vectors_path = os.path.join(os.path.dirname(base_path), manifest["vectors_file"])
+        # Пустой файл нельзя отобразить в память
+        use_mmap = mmap and manifest["count"] > 0
+        vectors = np.load(vectors_path, mmap_mode="r" if use_mmap else None)
+        if vectors.shape != (manifest["count"], manifest["dimension"]):
+            raise ValueError(
+                f"Файл {vectors_path} не соответствует манифесту: {vectors.shape}"
+            )
+
+        db = cls(manifest["dimension"], embedder)
+        model = manifest.get("embedding_model")
+        db.embedding_model = model
+        if model and model != db.embedder.model_name:
+            print(
+                f"⚠️ База {base_path} построена моделью '{model}', "
+                f"а текущий бэкенд эмбеддингов — '{db.embedder.model_name}': пересоздайте базу"
+            )
+        db.vectors = vectors
+        db.texts = manifest["texts"]
+        db.metadata = manifest["metadata"]
+        db.delete(manifest.get("tombstones", []))
+
+        index_info = manifest.get("index")
+        if index_info:
+            index_path = os.path.join(os.path.dirname(base_path), index_info["file"])
+            with np.load(index_path) as state:
+                db.index = INDEX_TYPES[index_info["type"]].from_state(
+                    index_info["params"], dict(state)
+                )
+
+        quantizer_info = manifest.get("quantizer")
+        if quantizer_info:
+            quantizer_path = os.path.join(
+                os.path.dirname(base_path), quantizer_info["file"]
+            )
+            with np.load(quantizer_path) as state:
+                db.quantizer = QUANTIZER_TYPES[quantizer_info["type"]].from_state(
+                    quantizer_info["params"], dict(state)
+                )
+            db.rescore = quantizer_info["rescore"]
+
+        return db
+
+    @classmethod
+    def load_legacy(cls, base_path: str, embedder: Optional[Embedder] = None):
+        """
+        Summary: Загружает базу из устаревшего формата {base}.pkl.
+        Input:
+            base_path (str): Путь к файлу для загрузки (без расширения).
+            embedder (Optional[Embedder]): Эмбеддер базы; None — общий эмбеддер процесса.
         Output:
             VectorDB: Экземпляр класса VectorDB с загруженными данными.
         """
         with open(f"{base_path}.pkl", "rb") as f:
             data = pickle.load(f)
 
-        db = cls(data["dimension"])
+        db = cls(data["dimension"], embedder)
         db.vectors = np.array(data["vectors"], dtype="float32")
         db.texts = data["texts"]
         db.metadata = data["metadata"]
 
         return db
+
+
+def migrate_legacy(base_path: str) -> VectorDB:
+    """
+    Summary: Переводит {base}.pkl в бинарный формат ({base}.json + .npy).
+    Input:
+        base_path (str): Путь к базе (без расширения).
+    Output:
+        VectorDB: Загруженная база.
+    """
+    db = VectorDB.load_legacy(base_path)
+    db.save(base_path)
+    print(f"💾 База {base_path}.pkl переведена в формат v{FORMAT_VERSION}: {base_path}.json")
+    return db
+
+
+def _read_manifest(manifest_path: str) -> Dict[str, Any]:
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Неподдерживаемая версия формата базы: {manifest.get('format_version')}"
+        )
+    return manifest
+
+
+def _data_files(manifest: Dict[str, Any]) -> List[str]:
+    """Файлы данных, на которые ссылается манифест."""
+    files = [manifest["vectors_file"]]
+    for extra in ("index", "quantizer"):
+        if manifest.get(extra):
+            files.append(manifest[extra]["file"])
+    return files
+
+
+def _array_bytes(obj: Any) -> int:
+    """Суммарный размер массивов NumPy среди атрибутов объекта."""
+    return sum(
+        int(value.nbytes) for value in vars(obj).values() if isinstance(value, np.ndarray)
+    )
+
+
+def _inverse_norms(vectors: np.ndarray) -> np.ndarray:
+    """Возвращает 1 / ||v|| для каждой строки (0 для нулевых строк)."""
+    norms = np.linalg.norm(vectors, axis=1)
+    inv = np.zeros(len(norms), dtype="float32")
+    np.divide(1.0, norms, out=inv, where=norms > 0)
+    return inv
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-нормирует строки матрицы; нулевые строки остаются нулевыми."""
+    return vectors * _inverse_norms(vectors)[:, None]
@@ -0,0 +1,206 @@
+# vectorization/backends.py
+import asyncio
+import random
+from abc import ABC, abstractmethod
+import zlib
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+from openai import RateLimitError
+
+from data.preprocess_data import preprocess_text
+from utils.config import (
+    client,
+    async_client,
+    EMBED_MAX_RETRIES,
+    EMBEDDING_BACKEND,
+    LOCAL_EMBED_DIMENSION,
+    LOCAL_EMBED_NGRAM_MAX,
+    LOCAL_EMBED_NGRAM_MIN,
+)
+
+# Больше текстов за вызов локальный бэкенд считает в отдельном потоке, а не в event loop
+LOCAL_INLINE_TEXTS = 32
+
+
+class EmbeddingBackend(ABC):
+    """
+    Источник эмбеддингов для Embedder: удаленный API или локальная модель.
+
+    Кэширование, батчинг и обработку ошибок делает Embedder; бэкенд только
+    превращает список текстов в список векторов (того же размера и порядка).
+    """
+
+    name = ""
+    # Удаленным бэкендам нужен кэш эмбеддингов и батчинг запросов
+    remote = True
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """Идентификатор модели: ключ кэша и метка векторной базы."""
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """Размерность векторов, если известна без запроса к модели."""
+        return None
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Векторы texts в том же порядке."""
+
+    @abstractmethod
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Асинхронная версия embed."""
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """Эмбеддинги через OpenAI-совместимый API (client из utils/config.py)."""
+
+    name = "openai"
+
+    def __init__(self, model_name: str = "bge-m3"):
+        """
+        Summary: Инициализирует бэкенд.
+        Input:
+            model_name (str): Имя модели эмбеддингов на сервере.
+        Output:
+            None
+        """
+        self.model_name = model_name
+        self.client = client
+        # Повторы при rate limit делает aembed; повторы SDK умножали бы число попыток
+        self.async_client = async_client.with_options(max_retries=0)
+
+    @property
+    def model_id(self) -> str:
+        return self.model_name
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(model=self.model_name, input=texts)
+        return _ordered_embeddings(response, len(texts))
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Запрос эмбеддингов с экспоненциальной задержкой при превышении rate limit.
+        """
+        delay = 1.0
+        attempts = max(EMBED_MAX_RETRIES, 1)
+        for attempt in range(attempts):
+            try:
+                response = await self.async_client.embeddings.create(
+                    model=self.model_name,
+                    input=texts,
+                )
+                return _ordered_embeddings(response, len(texts))
+            except RateLimitError:
+                if attempt == attempts - 1:
+                    raise
+                print(f"⏳ Rate limit, повтор через {delay:.1f} с")
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay *= 2
+
+
+class HashedNgramBackend(EmbeddingBackend):
+    """
+    Локальные эмбеддинги без скачивания моделей: хэшированные символьные n-граммы.
+
+    Текст нормализуется preprocess_text, каждое слово обрамляется пробелами,
+    n-граммы длины ngram_min..ngram_max хэшируются (crc32) в dimension корзин
+    со знаком из отдельного бита хэша, частоты сглаживаются 1 + log(tf),
+    вектор L2-нормируется. Косинус таких векторов — мера символьного сходства,
+    устойчивая к опечаткам и словоформам. Модель детерминирована и не зависит
+    от корпуса, поэтому векторы базы и запросов всегда согласованы.
+    """
+
+    name = "hashed"
+    remote = False
+
+    def __init__(
+        self,
+        dimension: int = LOCAL_EMBED_DIMENSION,
+        ngram_min: int = LOCAL_EMBED_NGRAM_MIN,
+        ngram_max: int = LOCAL_EMBED_NGRAM_MAX,
+    ):
+        """
+        Summary: Инициализирует локальный бэкенд.
+        Input:
+            dimension (int): Размерность векторов (число корзин хэширования).
+            ngram_min (int): Минимальная длина символьной n-граммы.
+            ngram_max (int): Максимальная длина символьной n-граммы.
+        Output:
+            None
+        """
+        self._dimension = dimension
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    @property
+    def model_id(self) -> str:
+        return f"hashed-char{self.ngram_min}-{self.ngram_max}-d{self._dimension}"
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._dimension
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text).tolist() for text in texts]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) <= LOCAL_INLINE_TEXTS:
+            return self.embed(texts)
+        return await asyncio.to_thread(self.embed, texts)
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        counts: Dict[int, int] = {}
+        for word in preprocess_text(text).split():
+            padded = f" {word} "
+            for n in range(self.ngram_min, self.ngram_max + 1):
+                for start in range(len(padded) - n + 1):
+                    h = zlib.crc32(padded[start : start + n].encode("utf-8"))
+                    counts[h] = counts.get(h, 0) + 1
+
+        vector = np.zeros(self._dimension, dtype="float32")
+        if not counts:
+            return vector
+        hashes = np.fromiter(counts, dtype="uint32", count=len(counts))
+        tf = np.fromiter(counts.values(), dtype="float32", count=len(counts))
+        # Старший бит хэша задает знак: коллизии взаимно гасятся, а не копятся
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype("float32")
+        np.add.at(vector, hashes % self._dimension, signs * (1.0 + np.log(tf)))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+def _ordered_embeddings(response, expected: int) -> List[List[float]]:
+    """Векторы ответа API в порядке входных текстов (по полю index)."""
+    items = sorted(response.data, key=lambda item: item.index)
+    embeddings = [item.embedding for item in items]
+    if len(embeddings) != expected:
+        raise ValueError(f"Получено {len(embeddings)} эмбеддингов вместо {expected}")
+    return embeddings
+
+
+# Доступные бэкенды эмбеддингов (выбираются переменной EMBEDDING_BACKEND)
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    OpenAIBackend.name: OpenAIBackend,
+    HashedNgramBackend.name: HashedNgramBackend,
+}
+
+
+def create_backend(name: str = EMBEDDING_BACKEND, model_name: str = "bge-m3") -> EmbeddingBackend:
+    """
+    Summary: Создает бэкенд эмбеддингов по имени.
+    Input:
+        name (str): Имя бэкенда из EMBEDDING_BACKENDS.
+        model_name (str): Имя модели для удаленного бэкенда.
+    Output:
+        EmbeddingBackend: Готовый бэкенд.
+    """
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Неизвестный бэкенд эмбеддингов '{name}', доступны: {sorted(EMBEDDING_BACKENDS)}"
+        )
+    if name == OpenAIBackend.name:
+        return OpenAIBackend(model_name)
+    return EMBEDDING_BACKENDS[name]()
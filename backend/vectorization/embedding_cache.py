@@ -0,0 +1,252 @@
+# vectorization/embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.config import EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_PATH
+
+# Как часто (в количестве записей) проверять превышение размера кэша
+EVICT_CHECK_EVERY = 256
+# Сколько отложенных обновлений last_used копить перед одной записью в SQLite
+TOUCH_FLUSH_EVERY = 256
+
+
+def normalize_cache_text(text: str) -> str:
+    """Нормализует текст для ключа кэша: схлопывает пробелы по краям и внутри."""
+    return " ".join(str(text).split())
+
+
+class EmbeddingCache:
+    """
+    Постоянный кэш эмбеддингов в SQLite с ключом (модель, хэш нормализованного текста).
+
+    Векторы хранятся как float32 BLOB, вытеснение — по времени последнего
+    обращения (LRU), когда записей становится больше max_entries. Один файл
+    можно разделять между процессами: SQLite работает в режиме WAL.
+
+    Время обращения при попадании не пишется сразу: оно копится в памяти и
+    записывается одним UPDATE раз в TOUCH_FLUSH_EVERY попаданий, перед
+    вытеснением и в flush(). Чтение попадания — только SELECT, без коммита.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        """
+        Summary: Открывает (или создает) файл кэша.
+        Input:
+            path (str): Путь к файлу SQLite.
+            max_entries (int): Максимальное число хранимых эмбеддингов.
+        Output:
+            None
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts_since_check = 0
+        # Отложенные обновления last_used: ключ -> время последнего попадания
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+        )
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """Ключ записи: sha256 от имени модели и нормализованного текста."""
+        payload = f"{model_name}\0{normalize_cache_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        """
+        Summary: Возвращает эмбеддинг из кэша.
+        Input:
+            model_name (str): Имя модели эмбеддингов.
+            text (str): Исходный текст.
+        Output:
+            Optional[List[float]]: Вектор или None при промахе.
+        """
+        return self.get_many(model_name, [text])[0]
+
+    def get_many(
+        self, model_name: str, texts: Sequence[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Summary: Возвращает эмбеддинги для списка текстов, None — для промахов.
+        Input:
+            model_name (str): Имя модели эмбеддингов.
+            texts (Sequence[str]): Исходные тексты.
+        Output:
+            List[Optional[List[float]]]: Векторы в порядке texts.
+        """
+        keys = [self.make_key(model_name, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # Ограничение SQLite на число параметров в одном запросе
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="float32").tolist()
+            if found:
+                now = time.time()
+                for key in found:
+                    self._touched[key] = now
+                if len(self._touched) >= TOUCH_FLUSH_EVERY:
+                    self._flush_touched_locked()
+            result = [found.get(key) for key in keys]
+            hits = sum(vector is not None for vector in result)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return result
+
+    def put(self, model_name: str, text: str, vector: Sequence[float]):
+        """
+        Summary: Сохраняет эмбеддинг в кэш.
+        Input:
+            model_name (str): Имя модели эмбеддингов.
+            text (str): Исходный текст.
+            vector (Sequence[float]): Эмбеддинг.
+        Output:
+            None
+        """
+        self.put_many(model_name, [text], [vector])
+
+    def put_many(
+        self,
+        model_name: str,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ):
+        """
+        Summary: Сохраняет эмбеддинги для списка текстов.
+        Input:
+            model_name (str): Имя модели эмбеддингов.
+            texts (Sequence[str]): Исходные тексты.
+            vectors (Sequence[Sequence[float]]): Эмбеддинги в порядке texts.
+        Output:
+            None
+        """
+        now = time.time()
+        rows = [
+            (
+                self.make_key(model_name, text),
+                np.asarray(vector, dtype="float32").tobytes(),
+                now,
+            )
+            for text, vector in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            self._puts_since_check += len(rows)
+            if self._puts_since_check >= EVICT_CHECK_EVERY:
+                self._puts_since_check = 0
+                self._evict_locked()
+
+    def flush(self):
+        """
+        Summary: Записывает отложенные обновления времени последнего обращения.
+        Input:
+            None
+        Output:
+            None
+        """
+        with self._lock:
+            self._flush_touched_locked()
+
+    def _flush_touched_locked(self):
+        if not self._touched:
+            return
+        # Одна транзакция на всю пачку: в режиме autocommit каждый UPDATE коммитился бы отдельно
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key, now in self._touched.items()],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._touched.clear()
+
+    def _evict_locked(self):
+        # Вытеснение по LRU учитывает и еще не записанные обращения
+        self._flush_touched_locked()
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Summary: Возвращает статистику кэша.
+        Input:
+            None
+        Output:
+            Dict[str, Any]: Попадания, промахи, вытеснения и размер кэша.
+        """
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[EmbeddingCache]:
+    """
+    Summary: Возвращает общий для процесса кэш эмбеддингов.
+    Input:
+        None
+    Output:
+        Optional[EmbeddingCache]: Кэш или None, если EMBEDDING_CACHE_PATH пуст.
+    """
+    global _default_cache
+    if not EMBEDDING_CACHE_PATH:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
@@ -0,0 +1,35 @@
+# vectorization/registry.py
+import threading
+from typing import Dict, Optional, Tuple
+
+from utils.config import EMBEDDING_BACKEND
+from vectorization.backends import create_backend
+from vectorization.vectorizer import Embedder
+
+# Один Embedder на (бэкенд, модель) на процесс: векторные базы, классификатор
+# и сборщик базы делят его кэш, размерность и HTTP-клиенты из utils/config.py
+_embedders: Dict[Tuple[str, str], Embedder] = {}
+_lock = threading.Lock()
+
+
+def get_embedder(
+    model_name: str = "bge-m3", backend_name: Optional[str] = None
+) -> Embedder:
+    """
+    Summary: Возвращает общий для процесса Embedder, создавая его при первом обращении.
+    Input:
+        model_name (str): Имя модели для удаленного бэкенда.
+        backend_name (Optional[str]): Имя бэкенда; None — EMBEDDING_BACKEND.
+    Output:
+        Embedder: Общий экземпляр для этой пары бэкенда и модели.
+    """
+    key = (backend_name or EMBEDDING_BACKEND, model_name)
+    embedder = _embedders.get(key)
+    if embedder is not None:
+        return embedder
+    with _lock:
+        if key not in _embedders:
+            backend = create_backend(key[0], model_name=model_name)
+            _embedders[key] = Embedder(model_name, backend=backend)
+        return _embedders[key]
+
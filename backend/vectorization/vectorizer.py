@@ -1,56 +1,294 @@
 # vectorization/vectorizer.py
-from utils.config import client
-from typing import List, Optional
+from utils.config import (
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_BATCH_CHARS,
+    EMBED_CONCURRENCY,
+)
+from vectorization.backends import EmbeddingBackend, create_backend
+from vectorization.embedding_cache import EmbeddingCache, get_default_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import threading
+
+
+def print_progress(done: int, total: int):
+    """Печатает прогресс векторизации; передается как progress в encode_batch и aencode_batch."""
+    print(f"Векторизовано {done}/{total} текстов")
 
 
 class Embedder:
-    def __init__(self, model_name: str = "bge-m3"):
-        self.client = client
-        self.model_name = model_name
-        self._dimension: Optional[int] = None
+    def __init__(
+        self,
+        model_name: str = "bge-m3",
+        use_cache: bool = True,
+        backend: Optional[EmbeddingBackend] = None,
+    ):
+        # Бэкенд по умолчанию выбирается переменной EMBEDDING_BACKEND
+        self.backend = backend if backend is not None else create_backend(model_name=model_name)
+        # Идентификатор модели бэкенда: ключ кэша и метка векторной базы
+        self.model_name = self.backend.model_id
+        self._dimension: Optional[int] = self.backend.dimension
+        # Общий постоянный кэш эмбеддингов (None, если отключен);
+        # локальный бэкенд считает вектор быстрее, чем читает его из SQLite
+        use_cache = use_cache and self.backend.remote
+        self.cache: Optional[EmbeddingCache] = get_default_cache() if use_cache else None
+        # Счетчики сбоев: запросы батчей и тексты, оставшиеся без вектора
+        self._stats_lock = threading.Lock()
+        self.failed_batches = 0
+        self.failed_texts = 0
 
     def encode(self, text: str) -> Optional[List[float]]:
         """
-        Преобразует текст в вектор.
+        Преобразует текст в вектор, сначала проверяя кэш.
+        """
+        cached = self._cache_get([text])
+        if cached[0] is not None:
+            return cached[0]
+        vector = self._encode_remote(text)
+        if vector is not None:
+            self._cache_put([text], [vector])
+        return vector
+
+    def _encode_remote(self, text: str) -> Optional[List[float]]:
+        """
+        Преобразует текст в вектор через бэкенд (запросом к API для удаленного).
         """
         try:
-            response = self.client.embeddings.create(
-                model=self.model_name,
-                input=[text],
-            )
-            embedding = response.data[0].embedding
+            embedding = self.backend.embed([text])[0]
             # Кэшируем размерность при первом вызове
             if self._dimension is None:
                 self._dimension = len(embedding)
             return embedding
         except Exception as e:
             print(f"Ошибка при векторизации текста '{text[:50]}...': {e}")
+            self._count_failure(texts=1)
             return None
 
-    def encode_batch(self, texts: List[str], batch_size: int = 10) -> List[List[float]]:
+    def encode_batch(
+        self,
+        texts: List[str],
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_batch_chars: int = EMBED_MAX_BATCH_CHARS,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[List[float]]:
         """
-        Векторизует список текстов с батчингом.
+        Векторизует список текстов с батчингом: один запрос к API на батч.
+        В API уходят только тексты, которых нет в кэше. progress(done, total)
+        вызывается после кэша и после каждого батча (например, print_progress);
+        без него прогресс не выводится.
         """
+        vectors = self._cache_get(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        missing_texts = [texts[i] for i in missing]
+        done = len(texts) - len(missing)
+        if progress is not None and done:
+            progress(done, len(texts))
+
+        batches = plan_batches(missing_texts, batch_size, max_batch_chars)
+        for start, end in batches:
+            chunk = self._encode_chunk(missing_texts[start:end])
+            for i, vector in zip(missing[start:end], chunk):
+                vectors[i] = vector
+            self._cache_put_valid(missing_texts[start:end], chunk)
+            done += end - start
+            if progress is not None:
+                progress(done, len(texts))
+
+        return vectors
+
+    def _encode_chunk(self, batch: List[str]) -> List[List[float]]:
+        """
+        Векторизует один батч; при ошибке повторяет запросы по одному тексту.
+        """
+        try:
+            # Порядок восстанавливает бэкенд (по index, а не по порядку в ответе)
+            embeddings = self.backend.embed(batch)
+            if self._dimension is None and embeddings:
+                self._dimension = len(embeddings[0])
+            return embeddings
+        except Exception as e:
+            print(f"Ошибка при векторизации батча из {len(batch)} текстов: {e}")
+            self._count_failure(batches=1)
+
         vectors = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
-            print(
-                f"Векторизация батча {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1}"
-            )
-
-            for text in batch:
-                vector = self.encode(text)
-                if vector is not None:
-                    vectors.append(vector)
-                else:
-                    # Добавляем нулевой вектор для пропущенных текстов
-                    vectors.append([0.0] * self.get_embedding_dimension())
+        for text in batch:
+            vector = self._encode_remote(text)
+            if vector is not None:
+                vectors.append(vector)
+            else:
+                # Добавляем нулевой вектор для пропущенных текстов
+                vectors.append([0.0] * self.get_embedding_dimension())
+        return vectors
+
+    async def aencode(self, text: str) -> Optional[List[float]]:
+        """
+        Асинхронно преобразует текст в вектор, сначала проверяя кэш.
+        """
+        cached = await self._acache_get([text])
+        if cached[0] is not None:
+            return cached[0]
+        vector = await self._aencode_remote(text)
+        if vector is not None:
+            await self._acache_put_valid([text], [vector])
+        return vector
+
+    async def _aencode_remote(self, text: str) -> Optional[List[float]]:
+        """
+        Асинхронно преобразует текст в вектор через бэкенд.
+        """
+        try:
+            embedding = (await self.backend.aembed([text]))[0]
+            if self._dimension is None:
+                self._dimension = len(embedding)
+            return embedding
+        except Exception as e:
+            print(f"Ошибка при векторизации текста '{text[:50]}...': {e}")
+            self._count_failure(texts=1)
+            return None
+
+    async def aencode_batch(
+        self,
+        texts: List[str],
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_batch_chars: int = EMBED_MAX_BATCH_CHARS,
+        concurrency: int = EMBED_CONCURRENCY,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Optional[List[float]]]:
+        """
+        Асинхронно векторизует список текстов: до concurrency батчей одновременно.
+
+        Порядок результата совпадает с порядком texts, независимо от того,
+        в каком порядке завершились запросы. progress(done, total) вызывается
+        после каждого батча; без него прогресс не выводится. Для текстов,
+        которые не удалось векторизовать, возвращается None: нулевой вектор
+        потребовал бы размерность, а при недоступном API ее не узнать без еще
+        одного запроса к нему.
+        """
+        cached = await self._acache_get(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        missing_texts = [texts[i] for i in missing]
+        batches = plan_batches(missing_texts, batch_size, max_batch_chars)
+        semaphore = asyncio.Semaphore(concurrency)
+        done = len(texts) - len(missing)
 
+        async def run(start: int, end: int):
+            nonlocal done
+            chunk = await self._aencode_chunk(missing_texts[start:end], semaphore)
+            for i, vector in zip(missing[start:end], chunk):
+                cached[i] = vector
+            await self._acache_put_valid(missing_texts[start:end], chunk)
+            done += end - start
+            if progress is not None:
+                progress(done, len(texts))
+
+        await asyncio.gather(*(run(start, end) for start, end in batches))
+        return cached
+
+    async def _aencode_chunk(
+        self, batch: List[str], semaphore: asyncio.Semaphore
+    ) -> List[Optional[List[float]]]:
+        """
+        Асинхронно векторизует один батч; при ошибке повторяет запросы по одному тексту.
+        Батч и каждый повторный запрос занимают свой слот semaphore, так что
+        повторы не превышают ограничение на одновременные запросы.
+        """
+        async with semaphore:
+            try:
+                embeddings = await self.backend.aembed(batch)
+                if self._dimension is None and embeddings:
+                    self._dimension = len(embeddings[0])
+                return embeddings
+            except Exception as e:
+                print(f"Ошибка при векторизации батча из {len(batch)} текстов: {e}")
+                self._count_failure(batches=1)
+
+        async def retry(text: str) -> Optional[List[float]]:
+            async with semaphore:
+                return await self._aencode_remote(text)
+
+        return list(await asyncio.gather(*(retry(text) for text in batch)))
+
+    def _count_failure(self, batches: int = 0, texts: int = 0):
+        with self._stats_lock:
+            self.failed_batches += batches
+            self.failed_texts += texts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Статистика эмбеддера: модель и число сбоев.
+        failed_texts — тексты, получившие None (или нулевой вектор в encode_batch).
+        """
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "failed_batches": self.failed_batches,
+                "failed_texts": self.failed_texts,
+            }
+
+    def _cache_get(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Возвращает векторы из кэша (None для промахов или при отключенном кэше).
+        """
+        if self.cache is None:
+            return [None] * len(texts)
+        try:
+            vectors = self.cache.get_many(self.model_name, texts)
+        except Exception as e:
+            print(f"⚠️ Ошибка чтения кэша эмбеддингов: {e}")
+            return [None] * len(texts)
+        if self._dimension is None:
+            for vector in vectors:
+                if vector is not None:
+                    self._dimension = len(vector)
+                    break
         return vectors
 
+    def _cache_put(self, texts: List[str], vectors: List[List[float]]):
+        """
+        Сохраняет векторы в кэш; ошибки кэша не прерывают векторизацию.
+        """
+        if self.cache is None or not texts:
+            return
+        try:
+            self.cache.put_many(self.model_name, texts, vectors)
+        except Exception as e:
+            print(f"⚠️ Ошибка записи в кэш эмбеддингов: {e}")
+
+    def _cache_put_valid(
+        self, texts: List[str], vectors: List[Optional[List[float]]]
+    ):
+        """
+        Сохраняет в кэш только успешно полученные (ненулевые) векторы.
+        """
+        valid = [
+            (text, vector)
+            for text, vector in zip(texts, vectors)
+            if vector and any(v != 0 for v in vector)
+        ]
+        if valid:
+            valid_texts, valid_vectors = zip(*valid)
+            self._cache_put(list(valid_texts), list(valid_vectors))
+
+    async def _acache_get(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        _cache_get в рабочем потоке: SQLite может ждать, пока другой процесс пишет в общий файл кэша.
+        """
+        if self.cache is None:
+            return [None] * len(texts)
+        return await asyncio.to_thread(self._cache_get, texts)
+
+    async def _acache_put_valid(
+        self, texts: List[str], vectors: List[Optional[List[float]]]
+    ):
+        """
+        _cache_put_valid в рабочем потоке.
+        """
+        if self.cache is not None:
+            await asyncio.to_thread(self._cache_put_valid, texts, vectors)
+
     def get_embedding_dimension(self) -> int:
         """
-        Определяет размерность эмбеддингов.
+        Определяет размерность эмбеддингов (у локального бэкенда она известна заранее).
         """
         if self._dimension is None:
             # Определяем размерность на тестовом тексте
@@ -60,3 +298,27 @@ class Embedder:
             else:
                 raise ValueError("Не удалось определить размерность эмбеддингов")
         return self._dimension
+
+
+def plan_batches(
+    texts: List[str], batch_size: int, max_batch_chars: int
+) -> List[Tuple[int, int]]:
+    """
+    Делит тексты на батчи [start, end) с ограничением по количеству и суммарной длине.
+
+    Длина в символах служит приближенной оценкой числа токенов; текст длиннее
+    бюджета уходит отдельным батчем.
+    """
+    batches = []
+    start = 0
+    chars = 0
+    for i, text in enumerate(texts):
+        size = len(text)
+        if i > start and (i - start >= batch_size or chars + size > max_batch_chars):
+            batches.append((start, i))
+            start = i
+            chars = 0
+        chars += size
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches